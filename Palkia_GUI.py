@@ -1,17 +1,20 @@
 import sys
 import os
 import re
-from io import StringIO
+import itertools
+import threading
+import multiprocessing
+from collections import deque
 import subprocess # Para abrir PDFs localmente
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QMessageBox, QLabel, QLineEdit, QTextEdit,
-    QGroupBox, QTabWidget, QTableView, QCheckBox, QScrollArea, QProgressDialog
+    QGroupBox, QTabWidget, QTableView, QCheckBox, QScrollArea, QProgressDialog, QHeaderView, QProgressBar,
+    QTableWidget, QTableWidgetItem, QAbstractItemView
 )
-from PySide6.QtCore import QThread, QObject, Signal, QAbstractTableModel, Qt, QSize, QPropertyAnimation, QTimer
-from PySide6.QtGui import QFont, QMovie
-import pandas as pd
+from PySide6.QtCore import QThread, QObject, Signal, Qt, QPropertyAnimation, QTimer
+from PySide6.QtGui import QFont, QTextCursor, QTextCharFormat
 
 
 try:
@@ -21,35 +24,83 @@ except ImportError:
     ansi_converter = None
     print("AVISO: 'ansi2html' não está instalado. Os logs não serão coloridos.")
 
-# Tenta importar o script run.py principal coma  automação do ETL na pasta src
+# Importa o CSS 
 try:
-    import run as run_script
-
-    # Importa o CSS 
     from src.styles import APP_STYLES
-
-
 except ImportError as e:
-    print(f"ERRO CRÍTICO: Não foi possível importar 'run.py' ou styles. Verifique se ele está na mesma pasta. Detalhes: {e}")
+    print(f"ERRO CRÍTICO: Não foi possível importar styles. Verifique se ele está na mesma pasta. Detalhes: {e}")
     sys.exit(1)
 
-
-
-class PandasModel(QAbstractTableModel):
-    def __init__(self, data):
-        super().__init__()
-        self._data = data
-    def rowCount(self, parent=None): return self._data.shape[0]
-    def columnCount(self, parent=None): return self._data.shape[1]
-    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if index.isValid() and role == Qt.ItemDataRole.DisplayRole:
-            return str(self._data.iloc[index.row(), index.column()])
-        return None
-    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
-        if role == Qt.ItemDataRole.DisplayRole:
-            if orientation == Qt.Orientation.Horizontal: return str(self._data.columns[section])
-            if orientation == Qt.Orientation.Vertical: return str(self._data.index[section])
-        return None
+from services.progress import EtaEstimator, format_duration
+from services.background_writer import wait_for_pending_writes
+from services.task_process import start_task_process
+from services.pipeline_runner import UP_TO_DATE
+from services.task_scheduler import TaskScheduler, PENDING, RUNNING, DONE, FAILED
+
+# O script run.py (automação do ETL) e o pandas são pesados para importar (camelot, openpyxl...):
+# só são carregados quando a primeira tarefa é executada, não na abertura da janela.
+run_script = None
+pd = None
+
+
+def _load_etl_modules():
+    """Importa run.py e pandas na primeira utilização. Retorna False se não for possível."""
+    global run_script, pd
+    if run_script is not None and pd is not None:
+        return True
+    try:
+        import pandas
+        import run
+    except ImportError as e:
+        print(f"ERRO CRÍTICO: Não foi possível importar 'run.py'. Verifique se ele está na mesma pasta. Detalhes: {e}")
+        return False
+    run_script, pd = run, pandas
+    return True
+
+
+
+# Espera após a última tecla no filtro da tabela antes de refiltrar
+TABLE_FILTER_DELAY_MS = 250
+
+# O log recebe as linhas das tarefas em lotes, uma atualização por intervalo
+LOG_FLUSH_INTERVAL_MS = 100
+# Linhas mantidas no painel de log (as mais antigas são descartadas)
+LOG_MAX_LINES = 5000
+
+# Etapas da fila de tarefas: nome exibido e prefixo das linhas de cada uma no log
+TASK_LABELS = {
+    "extract_tables": "Extrair Tabelas",
+    "extract_text": "Extrair Anotações",
+    "consolidate": "Consolidar",
+    "load_database": "Carregar no Banco",
+}
+TASK_LOG_PREFIXES = {
+    "extract_tables": "[tabelas]",
+    "extract_text": "[anotações]",
+    "consolidate": "[consolidar]",
+    "load_database": "[banco]",
+}
+# Etapas executadas ao mesmo tempo (cada uma num processo)
+MAX_PARALLEL_TASKS = 2
+
+_ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+def _is_html_log_line(line):
+    return line.startswith('<font') or (ansi_converter is not None and '\x1b' in line)
+
+
+def _format_progress(event, remaining=None):
+    """Texto do ProgressEvent para a fila: PDF atual, páginas/tabelas, linhas e tempo restante."""
+    parts = [f"PDF {min(event.current + 1, event.total)} de {event.total}"]
+    if event.item and not event.finished:
+        parts[0] += f": {event.item}"
+    if event.step_total:
+        parts.append(f"{event.step_unit} {event.step_done} de {event.step_total}")
+    parts.append(f"{event.rows} linhas extraídas")
+    if remaining is not None:
+        parts.append(f"restante ~{format_duration(remaining)}")
+    return " | ".join(parts)
 
 class ExplanationWidget(QGroupBox):
     def __init__(self, parent=None):
@@ -67,75 +118,140 @@ class ExplanationWidget(QGroupBox):
         self.layout().addWidget(QLabel("   - Certifique-se de que os PDFs contêm essas tabelas para resultados precisos."))
 
 class Worker(QObject):
-    progress = Signal(str)
-    finished = Signal()
-    error = Signal(str)
-
-    def __init__(self, task_function, *args, **kwargs):
+    """
+    Acompanha, numa QThread, o processo de uma etapa (services/task_process.py) e repassa
+    à janela o log, o progresso e o resultado. Os sinais levam o id da tarefa na fila.
+    """
+    finished = Signal(int)
+    error = Signal(int, str)
+    cancelled = Signal(int)
+    progress_changed = Signal(int, object) # ProgressEvent
+    result_ready = Signal(int, object) # DataFrame devolvido pela etapa, antes de terminarem as gravações
+
+    def __init__(self, task_id, task_function, *args, **kwargs):
         super().__init__()
+        self.task_id = task_id
         self.task_function = task_function
         self.args = args
         self.kwargs = kwargs
+        # Linhas impressas pela tarefa, retiradas pela janela em lotes (drain_log).
+        # Buffer circular: se a janela não acompanhar, as linhas mais antigas são descartadas.
+        self.log_lines = deque(maxlen=LOG_MAX_LINES)
+        self._cancel_requested = threading.Event()
+
+    def drain_log(self):
+        """Retira as linhas acumuladas desde a última chamada (seguro entre threads)."""
+        lines = []
+        while True:
+            try:
+                lines.append(self.log_lines.popleft())
+            except IndexError:
+                return lines
+
+    def cancel(self):
+        """Pede a interrupção da etapa (chamado pela janela, em outra thread)."""
+        self._cancel_requested.set()
 
     def run(self):
-        old_stdout = sys.stdout
-        redirected_output = sys.stdout = StringIO()
         try:
-            self.progress.emit(f"▶️ Executando a função: {self.task_function.__name__}\n")
-            self.task_function(*self.args, **self.kwargs)
-            sys.stdout = old_stdout
-            output = redirected_output.getvalue()
-            for line in output.splitlines():
-                self.progress.emit(line)
-            self.finished.emit()
+            process = start_task_process(self.task_function, *self.args, **self.kwargs)
         except Exception as e:
-            sys.stdout = old_stdout
-            output = redirected_output.getvalue()
-            for line in output.splitlines(): self.progress.emit(line)
-            import traceback
-            error_details = f"❌ Erro na execução da tarefa: {e}\n{traceback.format_exc()}"
-            self.error.emit(error_details)
+            self.error.emit(self.task_id, f"❌ Não foi possível iniciar a tarefa: {e}")
+            return
+        while True:
+            if self._cancel_requested.is_set():
+                process.cancel()
+            message = process.poll()
+            if message is None:
+                continue
+            kind, payload = message
+            if kind == 'log':
+                self.log_lines.append(payload)
+            elif kind == 'progress':
+                self.progress_changed.emit(self.task_id, payload)
+            elif kind == 'result':
+                self.result_ready.emit(self.task_id, payload)
+            elif kind == 'done':
+                self.finished.emit(self.task_id)
+                return
+            elif kind == 'cancelled':
+                self.cancelled.emit(self.task_id)
+                return
+            else:
+                self.error.emit(self.task_id, payload)
+                return
 
 
-class LoadingOverlay(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setStyleSheet("background-color: rgba(0, 0, 0, 150);") # Fundo semi-transparente
-        
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignCenter)
-
-        self.loading_label = QLabel("Carregando... Por favor, aguarde.")
-        self.loading_label.setStyleSheet("color: white; font-size: 20px; font-weight: bold;")
-        self.loading_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(self.loading_label)
-
-        # Adiciona um GIF de loading (certifique-se de ter um arquivo 'loading.gif' na pasta ou ajuste o caminho)
-        self.movie_label = QLabel()
-        self.movie_label.setAlignment(Qt.AlignCenter)
-        self.movie = QMovie("assets/loading.gif") # Caminho para o GIF
-        if not self.movie.isValid():
-            print("AVISO: O arquivo 'assets/loading.gif' não foi encontrado ou é inválido.")
-            self.loading_label.setText("Carregando... (GIF não encontrado)")
-        else:
-            self.movie.setScaledSize(QSize(100, 100)) # Ajusta o tamanho do GIF
-            self.movie_label.setMovie(self.movie)
-            self.movie.start()
-            layout.addWidget(self.movie_label)
+class TaskQueuePanel(QGroupBox):
+    """Fila de tarefas: estado, progresso e detalhes de cada etapa, com cancelamento por tarefa."""
+    cancel_requested = Signal(int) # id da tarefa
+    cancel_all_requested = Signal()
 
-    def showEvent(self, event):
-        if self.movie.isValid():
-            self.movie.start()
-        super().showEvent(event)
+    COLUMNS = ("Tarefa", "Estado", "Progresso", "Detalhes", "")
 
-    def hideEvent(self, event):
-        if self.movie.isValid():
-            self.movie.stop()
-        super().hideEvent(event)
-
-    def set_message(self, message):
-        self.loading_label.setText(message)
+    def __init__(self, parent=None):
+        super().__init__("Fila de Tarefas", parent)
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.setMaximumHeight(150)
+        self.cancel_all_button = QPushButton("⏹ Cancelar Tudo")
+        self.cancel_all_button.clicked.connect(self.cancel_all_requested)
+        self.cancel_all_button.setEnabled(False)
+        layout.addWidget(self.table)
+        layout.addWidget(self.cancel_all_button, alignment=Qt.AlignRight)
+        self._rows = {} # id da tarefa -> linha
+        self._progress_bars = {}
+        self._cancel_buttons = {}
+
+    def clear(self):
+        self.table.setRowCount(0)
+        self._rows.clear()
+        self._progress_bars.clear()
+        self._cancel_buttons.clear()
+
+    def add_task(self, task):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(TASK_LABELS.get(task.name, task.name)))
+        self.table.setItem(row, 1, QTableWidgetItem())
+        self.table.setItem(row, 3, QTableWidgetItem())
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 1000)
+        progress_bar.setFormat("%p%")
+        cancel_button = QPushButton("Cancelar")
+        cancel_button.clicked.connect(lambda _=False, task_id=task.id: self.cancel_requested.emit(task_id))
+        self.table.setCellWidget(row, 2, progress_bar)
+        self.table.setCellWidget(row, 4, cancel_button)
+        self._rows[task.id] = row
+        self._progress_bars[task.id] = progress_bar
+        self._cancel_buttons[task.id] = cancel_button
+
+    def update_task(self, task, detail=""):
+        row = self._rows.get(task.id)
+        if row is None:
+            return
+        state = "cancelando..." if task.state == RUNNING and task.cancel_requested else task.state
+        self.table.item(row, 1).setText(state)
+        self.table.item(row, 3).setText(detail)
+        self.table.item(row, 3).setToolTip(detail)
+        if task.state == DONE:
+            self._progress_bars[task.id].setValue(1000)
+        self._cancel_buttons[task.id].setEnabled(task.is_active and not task.cancel_requested)
+        self.cancel_all_button.setEnabled(any(button.isEnabled() for button in self._cancel_buttons.values()))
+
+    def set_progress(self, task_id, fraction, detail):
+        row = self._rows.get(task_id)
+        if row is None:
+            return
+        self._progress_bars[task_id].setValue(int(fraction * 1000))
+        self.table.item(row, 3).setText(detail)
 
 
 class NotificationManager(QWidget):
@@ -224,12 +340,22 @@ class PalkiaWindowGUI(QMainWindow):
         self.run_text_button.clicked.connect(lambda: self.run_task("extract_text"))
         self.run_consolidate_button.clicked.connect(lambda: self.run_task("consolidate"))
         self.run_database_button.clicked.connect(lambda: self.run_task("load_database"))
+        self.run_pipeline_button = QPushButton("▶ Pipeline Completo")
+        self.run_pipeline_button.setObjectName("run_button")
+        self.run_pipeline_button.setToolTip("Tabelas e anotações em paralelo, depois consolidação e carga no banco.")
+        self.run_pipeline_button.clicked.connect(self.run_pipeline)
         actions_layout.addWidget(self.run_tables_button)
         actions_layout.addWidget(self.run_text_button)
         actions_layout.addWidget(self.run_consolidate_button)
         actions_layout.addWidget(self.run_database_button) # Adiciona o novo botão
+        actions_layout.addWidget(self.run_pipeline_button)
         main_layout.addWidget(actions_group)
 
+        self.task_queue_panel = TaskQueuePanel()
+        self.task_queue_panel.cancel_requested.connect(self.cancel_task)
+        self.task_queue_panel.cancel_all_requested.connect(self.cancel_all_tasks)
+        main_layout.addWidget(self.task_queue_panel)
+
         results_tabs = QTabWidget()
         main_layout.addWidget(results_tabs)
         log_widget = QWidget()
@@ -237,30 +363,46 @@ class PalkiaWindowGUI(QMainWindow):
         self.log_output = QTextEdit()
         self.log_output.setReadOnly(True)
         self.log_output.setFont(QFont("Courier New", 9))
+        self.log_output.document().setMaximumBlockCount(LOG_MAX_LINES)
+        self.pending_log = deque(maxlen=LOG_MAX_LINES) # linhas ainda não exibidas
+        self.log_timer = QTimer(self) # ativo enquanto há tarefas em execução ou linhas pendentes
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_log)
         log_layout.addWidget(self.log_output)
         results_tabs.addTab(log_widget, "📝 Log de Execução")
         table_widget = QWidget()
         table_layout = QVBoxLayout(table_widget)
+        self.table_filter_input = QLineEdit()
+        self.table_filter_input.setPlaceholderText("🔎 Filtrar tabela...")
+        self.table_filter_input.setClearButtonEnabled(True)
+        self.table_filter_timer = QTimer(self)
+        self.table_filter_timer.setSingleShot(True)
+        self.table_filter_timer.setInterval(TABLE_FILTER_DELAY_MS)
+        self.table_filter_timer.timeout.connect(self.apply_table_filter)
+        self.table_filter_input.textChanged.connect(self.table_filter_timer.start)
         self.table_view = QTableView()
+        self.table_view.setSortingEnabled(True)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        # Altura fixa das linhas: a view não mede cada linha de tabelas grandes
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table_proxy = None # DataFrameProxyModel, criado com a primeira tabela (numpy só carrega junto do pandas)
         self.export_button = QPushButton("📤 Exportar Tabela para .xlsx")
         self.export_button.setObjectName("export_excel")
         self.export_button.clicked.connect(self.export_table)
         self.export_button.setEnabled(False)
+        table_layout.addWidget(self.table_filter_input)
         table_layout.addWidget(self.table_view)
         table_layout.addWidget(self.export_button)
         results_tabs.addTab(table_widget, "📊 Resultado da Tabela")
 
         self.results_tabs = results_tabs
         self.input_folder = None
-        self.current_task_info = {}
-        self.thread = None
-        self.worker = None
+        self.task_result = None # DataFrame devolvido pela última tarefa
+        self.scheduler = TaskScheduler(max_parallel=MAX_PARALLEL_TASKS)
+        self.workers = {} # id da tarefa -> (QThread, Worker), das tarefas em execução
+        self.eta_estimators = {} # id da tarefa -> EtaEstimator
         self.pdf_widgets = {} # Dicionário para armazenar {"nome_pdf": {"checkbox": obj, "interval_input": obj}}
 
-        # Configuração do overlay de carregamento
-        self.loading_overlay = LoadingOverlay(self) # Instancia o overlay
-        self.loading_overlay.hide() # Começa oculto
-
         # Gerenciador de notificações
         self.notification_manager = NotificationManager(self)
         self.notification_manager.hide()
@@ -274,7 +416,7 @@ class PalkiaWindowGUI(QMainWindow):
         if folder:
             self.input_folder = folder
             self.folder_label.setText(f"Pasta de Entrada: ...{os.path.basename(folder)}")
-            self.log_output.clear()
+            self.clear_log()
             self.append_log(f"Pasta selecionada: {folder}\n")
             self.populate_pdf_list(folder) # Popula a nova área de listagem de PDFs
     def populate_pdf_list(self, folder):
@@ -335,142 +477,256 @@ class PalkiaWindowGUI(QMainWindow):
 
 
     def run_task(self, task_name):
+        # Botão de uma etapa: ela roda mesmo que suas saídas estejam em dia
+        self.enqueue_tasks(from_stage=task_name, to_stage=task_name)
+
+    def run_pipeline(self):
+        # Pipeline completo (run.build_must_pipeline): etapas em dia são puladas, como no make
+        self.enqueue_tasks()
+
+    def enqueue_tasks(self, from_stage=None, to_stage=None):
+        """
+        Põe na fila as etapas do pipeline que precisam rodar (Pipeline.plan). Cada uma espera
+        as etapas de que depende que estiverem na fila ou em execução; as independentes
+        rodam ao mesmo tempo.
+        """
         if not self.input_folder:
             QMessageBox.warning(self, "Aviso", "Por favor, selecione uma pasta de entrada primeiro.")
             return
-        self.log_output.clear()
-        self.set_buttons_enabled(False)
-        self.table_view.setModel(None)
-        self.export_button.setEnabled(False)
-        
-        # Mostra o overlay de carregamento
-        self.loading_overlay.show()
-        self.loading_overlay.set_message(f"Executando tarefa: {task_name.replace('_', ' ').title()}... Por favor, aguarde.")
+        if not _load_etl_modules():
+            QMessageBox.critical(self, "Erro Crítico", "Não foi possível importar o script 'run.py'. Veja o console para detalhes.")
+            return
+        selected_pdf_files, intervals_list_for_run = self.selected_pdfs()
+        pipeline = run_script.build_must_pipeline(self.input_folder, selected_pdf_files, intervals_list_for_run)
+        scheduled = [stage.name for stage in pipeline.stages if self.scheduler.active(stage.name) is not None]
+        plan = pipeline.plan(from_stage, to_stage, scheduled=scheduled)
+        to_run = [run for run in plan if run.will_run and run.stage.name not in scheduled]
+        if not to_run:
+            if any(run.will_run for run in plan):
+                QMessageBox.warning(self, "Aviso", "Essa tarefa já está na fila.")
+            else:
+                QMessageBox.information(self, "Pipeline em dia", "Todas as etapas estão em dia: as saídas são mais novas que as entradas.")
+            return
+        # Valida tudo antes de enfileirar: um PDF sem intervalo cancela o pipeline inteiro
+        if not self.validate_selection([run.stage.name for run in to_run], selected_pdf_files, intervals_list_for_run):
+            return
 
-        self.current_task_info = {"name": task_name, "input_folder": self.input_folder}
-        try:
-            run_script.input_folder = self.input_folder
+        if self.scheduler.is_idle():
+            # Nova rodada: limpa log, tabela e as tarefas da rodada anterior
+            self.clear_log()
+            self.set_table_data(None)
+            self.export_button.setEnabled(False)
+            self.task_result = None
+            self.scheduler.clear_finished()
+            self.task_queue_panel.clear()
             self.append_log(f"INFO: Pasta de entrada definida para: {self.input_folder}")
-        except Exception as e:
-            QMessageBox.critical(self, "Erro Crítico", f"Não foi possível definir a pasta no script 'run.py'. Erro: {e}")
-            self.set_buttons_enabled(True)
-            return
-        if task_name == "extract_tables":
-            try:
-                intervals_list_for_run = []
-                selected_pdf_files = []
-                for pdf_file, widgets in self.pdf_widgets.items():
-                    if widgets["checkbox"].isChecked():
-                        interval = widgets["interval_input"].text().strip()
-                        if not interval:
-                            QMessageBox.warning(self, "Aviso", f"Por favor, forneça os intervalos de páginas para o PDF selecionado: {pdf_file}")
-                            self.set_buttons_enabled(True)
-                            return
-                        selected_pdf_files.append(pdf_file)
-                        intervals_list_for_run.append(interval)
-
-                if not selected_pdf_files:
-                    QMessageBox.warning(self, "Aviso", "Por favor, selecione pelo menos um PDF para extrair tabelas.")
-                    self.set_buttons_enabled(True)
-                    return
-
-                # Atualiza run_script.pdf_files e run_script.intervalos_paginas com os valores selecionados
-                # Supondo que run_script.run_extract_PDF_tables pode aceitar uma lista de arquivos e uma lista de intervalos
-                # Pode ser necessário ajustar run.py para aceitar esses novos parâmetros.
-                run_script.pdf_files_to_process = selected_pdf_files # Novo atributo para run.py
-                run_script.intervalos_paginas_to_process = intervals_list_for_run # Novo atributo para run.py
-
-                target_function = run_script.run_extract_PDF_tables
-                args = (self.input_folder, selected_pdf_files, intervals_list_for_run, "folder") # Passa a lista de arquivos e intervalos
-            except Exception as e:
-                QMessageBox.critical(self, "Erro de Formato", f"Formato de intervalos inválido ou erro ao preparar a lista: {e}")
-                self.set_buttons_enabled(True)
-                return
-        elif task_name == "extract_text":
-            # Adaptação para extract_text_from_must_tables
-            selected_pdf_files = []
-            for pdf_file, widgets in self.pdf_widgets.items():
-                if widgets["checkbox"].isChecked():
-                    selected_pdf_files.append(pdf_file)
-            
+        for run in plan:
+            if run.status == UP_TO_DATE:
+                self.append_log(f"⏭️ {TASK_LABELS[run.stage.name]}: em dia, pulada ({run.reason})")
+        for run in to_run:
+            dependencies = [self.scheduler.active(name) for name in run.stage.depends_on]
+            task = self.scheduler.add(run.stage.name, [d for d in dependencies if d is not None], (pipeline, run.stage))
+            self.task_queue_panel.add_task(task)
+            self.update_task_row(task)
+        self.folder_button.setEnabled(False)
+        self.start_ready_tasks()
+
+    def selected_pdfs(self):
+        """PDFs marcados e o intervalo de páginas digitado para cada um (pode estar vazio)."""
+        selected_pdf_files = []
+        intervals_list_for_run = []
+        for pdf_file, widgets in self.pdf_widgets.items():
+            if widgets["checkbox"].isChecked():
+                selected_pdf_files.append(pdf_file)
+                intervals_list_for_run.append(widgets["interval_input"].text().strip())
+        return selected_pdf_files, intervals_list_for_run
+
+    def validate_selection(self, task_names, selected_pdf_files, intervals_list_for_run):
+        """Avisa o usuário e retorna False se a seleção de PDFs não serve para as etapas."""
+        if "extract_tables" in task_names:
             if not selected_pdf_files:
-                QMessageBox.warning(self, "Aviso", "Por favor, selecione pelo menos um PDF para extrair anotações.")
-                self.set_buttons_enabled(True)
-                return
-            
-            run_script.pdf_files_to_process = selected_pdf_files
-            target_function = run_script.extract_text_from_must_tables
-            args = (self.input_folder, selected_pdf_files, "folder",)
-        elif task_name == "consolidate":
-            if hasattr(run_script, 'consolidate_and_merge_results'):
-                target_function = run_script.consolidate_and_merge_results
-                args = (self.input_folder,)
-            else:
-                QMessageBox.critical(self, "Erro", "A função 'consolidate_and_merge_results' não foi encontrada em 'run.py'.")
-                self.set_buttons_enabled(True)
-                return
-        elif task_name == "load_database":
-            if hasattr(run_script, 'run_database_load_process'):
-                target_function = run_script.run_database_load_process
-                args = (self.input_folder,)
-            else:
-                QMessageBox.critical(self, "Erro", "A função 'run_database_load_process' não foi encontrada em 'run.py'.")
-                self.set_buttons_enabled(True)
-                return
+                QMessageBox.warning(self, "Aviso", "Por favor, selecione pelo menos um PDF para extrair tabelas.")
+                return False
+            for pdf_file, interval in zip(selected_pdf_files, intervals_list_for_run):
+                if not interval:
+                    QMessageBox.warning(self, "Aviso", f"Por favor, forneça os intervalos de páginas para o PDF selecionado: {pdf_file}")
+                    return False
+        if "extract_text" in task_names and not selected_pdf_files:
+            QMessageBox.warning(self, "Aviso", "Por favor, selecione pelo menos um PDF para extrair anotações.")
+            return False
+        return True
+
+    def start_ready_tasks(self):
+        """Inicia as tarefas da fila cujas dependências já terminaram."""
+        for task in self.scheduler.ready():
+            _, stage = task.payload
+            self.scheduler.mark_running(task)
+            thread = QThread()
+            worker = Worker(task.id, stage.function, *stage.args, **stage.call_kwargs)
+            worker.moveToThread(thread)
+            thread.started.connect(worker.run)
+            worker.finished.connect(self.on_task_finished)
+            worker.error.connect(self.on_task_error)
+            worker.cancelled.connect(self.on_task_cancelled)
+            worker.progress_changed.connect(self.on_task_progress)
+            worker.result_ready.connect(self.on_task_result)
+            self.workers[task.id] = (thread, worker)
+            self.eta_estimators[task.id] = EtaEstimator()
+            self.append_log(f"<font color=\"#9CCC65\">▶️ Iniciando: {TASK_LABELS[task.name]}</font>")
+            self.update_task_row(task)
+            thread.start()
+        if self.workers:
+            self.log_timer.start()
+
+    def update_task_row(self, task):
+        if task.state == PENDING:
+            waiting = [TASK_LABELS[t.name] for t in map(self.scheduler.get, task.depends_on) if t is not None and t.state != DONE]
+            detail = "aguardando: " + ", ".join(waiting) if waiting else "na fila"
+        elif task.state == RUNNING:
+            detail = "iniciando..."
+        elif task.state == DONE:
+            detail = f"concluída em {format_duration(task.elapsed)}"
+        elif task.state == FAILED:
+            detail = "erro (ver o log)"
         else:
-            self.set_buttons_enabled(True)
+            detail = task.error or ""
+        self.task_queue_panel.update_task(task, detail)
+
+    def cancel_task(self, task_id):
+        task = self.scheduler.get(task_id)
+        if task is None or not task.is_active:
             return
-        self.thread = QThread()
-        self.worker = Worker(target_function, *args)
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.on_task_finished)
-        self.worker.progress.connect(self.append_log)
-        self.worker.error.connect(self.on_task_error)
-        self.thread.start()
+        cancelled = self.scheduler.request_cancel(task)
+        for other in cancelled:
+            self.append_log(f"⏹️ {TASK_LABELS[other.name]}: {other.error}")
+            self.update_task_row(other)
+        if task.state == RUNNING:
+            self.append_log(f"⏹️ Cancelando {TASK_LABELS[task.name]}...")
+            self.workers[task.id][1].cancel()
+            self.update_task_row(task)
+        self.on_queue_changed()
+
+    def cancel_all_tasks(self):
+        # Pendentes primeiro, para nenhuma começar enquanto as em execução param
+        tasks = self.scheduler.tasks()
+        for task in [t for t in tasks if t.state == PENDING] + [t for t in tasks if t.state == RUNNING]:
+            self.cancel_task(task.id)
 
     def append_log(self, text):
+        """Enfileira o texto no log; ele aparece na próxima atualização em lote (flush_log)."""
         if text.startswith('<font'):
-            self.log_output.append(text)
-            return
-        if ansi_converter:
-            html_text = ansi_converter.convert(text, full=False)
-            self.log_output.append(html_text)
+            self.pending_log.append(text)
         else:
-            clean_text = re.sub(r'\x1B(?:[@-Z\-_]|\[0-?]*[ -/]*[@-~])', '', text)
-            self.log_output.append(clean_text)
+            self.pending_log.extend(text.split("\n"))
+        if not self.log_timer.isActive():
+            self.log_timer.start()
+
+    def clear_log(self):
+        self.pending_log.clear()
+        self.log_output.clear()
 
-    def on_task_finished(self):
-        self.append_log("\n✅ Tarefa concluída com sucesso!")
+    def flush_log(self):
+        """Acrescenta de uma vez ao painel as linhas pendentes e as impressas pelas tarefas."""
+        for task_id, (_, worker) in self.workers.items():
+            prefix = TASK_LOG_PREFIXES[self.scheduler.get(task_id).name]
+            self.pending_log.extend(f"{prefix} {line}" if line else line for line in worker.drain_log())
+        if not self.pending_log:
+            if not self.workers:
+                self.log_timer.stop()
+            return
+        lines = list(self.pending_log)
+        self.pending_log.clear()
+        scrollbar = self.log_output.verticalScrollBar()
+        follow = scrollbar.value() >= scrollbar.maximum() - 4 # só rola se já estava no fim
+        document = self.log_output.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        # Linhas de texto simples seguidas entram num único insertText (cada \n vira um bloco)
+        for is_html, group in itertools.groupby(lines, key=_is_html_log_line):
+            if not document.isEmpty():
+                cursor.insertBlock()
+            if is_html:
+                for i, line in enumerate(group):
+                    if i:
+                        cursor.insertBlock()
+                    cursor.insertHtml(line if line.startswith('<font') else ansi_converter.convert(line, full=False))
+            else:
+                cursor.setCharFormat(QTextCharFormat())
+                cursor.insertText(_ANSI_ESCAPE.sub('', "\n".join(group)))
+        cursor.endEditBlock()
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def on_task_progress(self, task_id, event):
+        estimator = self.eta_estimators.get(task_id)
+        remaining = estimator.remaining(event.fraction) if estimator is not None else None
+        self.task_queue_panel.set_progress(task_id, event.fraction, _format_progress(event, remaining))
+
+    def on_task_result(self, task_id, df):
+        # Exibe o resultado já em memória, enquanto a tarefa termina de gravar os arquivos
+        self.task_result = df
+        self.flush_log()
         self.display_results()
-        self.cleanup_thread()
-        self.loading_overlay.hide() # Oculta o overlay de carregamento
 
-    def on_task_error(self, error_message):
+    def on_task_finished(self, task_id):
+        task = self.scheduler.get(task_id)
+        pipeline, stage = task.payload
+        # As etapas registram seus erros no log e retornam: sem as saídas obrigatórias, a etapa falhou
+        missing = stage.missing_outputs()
+        if missing:
+            self.on_task_error(task_id, f"❌ {TASK_LABELS[task.name]}: saída não gerada: {missing[0]}")
+            return
+        self.flush_log() # últimas linhas da tarefa antes da mensagem de conclusão
+        self.cleanup_worker(task_id)
+        self.scheduler.mark_done(task)
+        pipeline.record(task.name, task.elapsed) # parâmetros e tempo da etapa, para a próxima execução
+        self.append_log(f"\n✅ {TASK_LABELS[task.name]}: tarefa concluída com sucesso em {format_duration(task.elapsed)}!")
+        self.update_task_row(task)
+        self.on_queue_changed()
+
+    def on_task_error(self, task_id, error_message):
+        task = self.scheduler.get(task_id)
+        self.flush_log()
+        self.cleanup_worker(task_id)
         self.append_log(f"\n{error_message}")
-        self.cleanup_thread()
-        self.loading_overlay.hide() # Oculta o overlay de carregamento
+        self.finish_unsuccessful_task(task, self.scheduler.mark_failed(task, error_message))
+
+    def on_task_cancelled(self, task_id):
+        task = self.scheduler.get(task_id)
+        self.flush_log()
+        self.cleanup_worker(task_id)
+        self.append_log(f"⏹️ {TASK_LABELS[task.name]}: tarefa cancelada.")
+        self.finish_unsuccessful_task(task, self.scheduler.mark_cancelled(task, "cancelada pelo usuário"))
+
+    def finish_unsuccessful_task(self, task, cancelled_dependents):
+        self.update_task_row(task)
+        for other in cancelled_dependents:
+            self.append_log(f"⏹️ {TASK_LABELS[other.name]}: {other.error}")
+            self.update_task_row(other)
+        self.on_queue_changed()
+
+    def on_queue_changed(self):
+        """Inicia o que ficou liberado; com a fila vazia, reabilita a troca de pasta."""
+        for task in self.scheduler.tasks():
+            if task.state == PENDING:
+                self.update_task_row(task)
+        self.start_ready_tasks()
+        if self.scheduler.is_idle():
+            self.folder_button.setEnabled(True)
+            if self.task_result is None:
+                self.display_results()
+            self.flush_log()
 
     def display_results(self):
-        task_name = self.current_task_info.get("name")
-        input_folder = self.current_task_info.get("input_folder")
-        if not pd: return
-        df_to_display = None
+        """Exibe o DataFrame devolvido pela tarefa (sem reler os arquivos gravados por ela)."""
+        df_to_display = self.task_result
         
         current_row_count = 0
         current_col_count = 0
 
-        if task_name == "extract_tables":
-            df_to_display = self.load_latest_excel(os.path.join(input_folder, "tabelas_extraidas"))
-        elif task_name == "extract_text":
-            df_to_display = self.consolidate_and_load_excel(os.path.join(input_folder, "anotacoes_extraidas"))
-        elif task_name == "consolidate":
-            final_excel_path = os.path.join(input_folder, "database", "must_tables_PDF_notes_merged.xlsx")
-            if os.path.exists(final_excel_path):
-                df_to_display = pd.read_excel(final_excel_path)
         if df_to_display is not None and not df_to_display.empty:
-            model = PandasModel(df_to_display)
-            self.table_view.setModel(model)
+            self.set_table_data(df_to_display)
             self.results_tabs.setCurrentIndex(1)
             self.export_button.setEnabled(True)
             self.append_log("✅ Tabela carregada com sucesso!")
@@ -487,69 +743,50 @@ class PalkiaWindowGUI(QMainWindow):
             self.last_row_count = current_row_count
             self.last_col_count = current_col_count
 
-    def load_latest_excel(self, output_folder):
-        latest_file_path = self.find_latest_file(output_folder, '.xlsx')
-        if not latest_file_path: return None
-        try:
-            self.append_log(f"\nCarregando resultado de: {os.path.basename(latest_file_path)}...")
-            return pd.read_excel(latest_file_path)
-        except Exception as e:
-            self.append_log(f"❌ Erro ao carregar o arquivo Excel: {e}")
-            return None
-
-    def consolidate_and_load_excel(self, output_folder):
-        self.append_log("\nIniciando consolidação...")
-        if not os.path.isdir(output_folder): return None
-        try:
-            all_files = [os.path.join(output_folder, f) for f in os.listdir(output_folder) if f.lower().endswith('.xlsx')]
-            if not all_files:
-                self.append_log("AVISO: Nenhum arquivo de anotações (.xlsx) encontrado para consolidar.")
-                return None
-            df_list = [pd.read_excel(f) for f in all_files]
-            consolidated_df = pd.concat(df_list, ignore_index=True)
-            self.append_log(f"✅ Consolidação concluída. Total de {consolidated_df.shape[0]} registros.")
-            return consolidated_df
-        except Exception as e:
-            self.append_log(f"❌ Erro durante a consolidação: {e}")
-            return None
-
-    def find_latest_file(self, folder, extension):
-        if not os.path.isdir(folder): return None
-        files = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(extension)]
-        if not files: return None
-        return max(files, key=os.path.getmtime)
+    def set_table_data(self, df):
+        """Exibe o DataFrame na tabela (None limpa). O proxy ordena/filtra sem copiar o DataFrame."""
+        if df is None:
+            self.table_view.setModel(None)
+            return
+        from src.views.dataframe_table import DataFrameModel, DataFrameProxyModel
+        if self.table_proxy is None:
+            self.table_proxy = DataFrameProxyModel(self)
+        old_model = self.table_proxy.sourceModel()
+        # Tabela nova começa na ordem do arquivo, mantendo o texto do filtro
+        self.table_proxy.sort(-1)
+        self.table_proxy.setSourceModel(DataFrameModel(df, self.table_proxy))
+        self.table_proxy.set_filter_text(self.table_filter_input.text())
+        self.table_view.setModel(self.table_proxy)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        if old_model is not None:
+            old_model.deleteLater()
+
+    def apply_table_filter(self):
+        if self.table_proxy is not None and self.table_view.model() is self.table_proxy:
+            self.table_proxy.set_filter_text(self.table_filter_input.text())
 
     def export_table(self):
-        model = self.table_view.model()
-        if not model or not isinstance(model, PandasModel):
+        model = self.table_proxy.sourceModel() if self.table_proxy is not None else None
+        if model is None or self.table_view.model() is not self.table_proxy:
             QMessageBox.warning(self, "Aviso", "Nenhuma tabela para exportar.")
             return
         filePath, _ = QFileDialog.getSaveFileName(self, "Salvar Tabela", "", "Excel Files (*.xlsx)")
         if filePath:
             try:
-                model._data.to_excel(filePath, index=False)
+                # Exporta as linhas exibidas, na ordem e com o filtro da tabela
+                model.dataframe.iloc[self.table_proxy.source_rows()].to_excel(filePath, index=False)
                 QMessageBox.information(self, "Sucesso", f"Tabela salva com sucesso em: {filePath}")
             except Exception as e:
                 QMessageBox.critical(self, "Erro", f"Não foi possível salvar o arquivo: {e}")
 
-    def cleanup_thread(self):
-        self.set_buttons_enabled(True)
-        if self.thread:
-            self.thread.quit()
-            self.thread.wait()
-        self.worker = None
-        self.thread = None
-
-    def set_buttons_enabled(self, enabled):
-        self.run_tables_button.setEnabled(enabled)
-        self.run_text_button.setEnabled(enabled)
-        self.run_consolidate_button.setEnabled(enabled)
-        self.run_database_button.setEnabled(enabled) # Habilita/desabilita o novo botão
-        self.folder_button.setEnabled(enabled)
+    def cleanup_worker(self, task_id):
+        thread, _ = self.workers.pop(task_id, (None, None))
+        self.eta_estimators.pop(task_id, None)
+        if thread:
+            thread.quit()
+            thread.wait()
 
     def resizeEvent(self, event):
-        # Redimensiona o overlay de carregamento para cobrir a janela toda
-        self.loading_overlay.resize(self.size())
         # Reposiciona a notificação no canto superior direito
         self.notification_manager.setGeometry(
             self.width() - self.notification_manager.width() - 20, # 20px de margem
@@ -560,13 +797,15 @@ class PalkiaWindowGUI(QMainWindow):
         super().resizeEvent(event)
 
     def closeEvent(self, event):
-        if self.thread and self.thread.isRunning():
-            QMessageBox.warning(self, "Aviso", "Uma tarefa está em execução.")
+        if not self.scheduler.is_idle():
+            QMessageBox.warning(self, "Aviso", "Há tarefas na fila ou em execução. Cancele-as antes de fechar.")
             event.ignore()
         else:
+            wait_for_pending_writes() # não deixa planilhas pela metade
             event.accept()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # as etapas rodam em processos próprios (executável congelado no Windows)
     app = QApplication(sys.argv)
     window = PalkiaWindowGUI()
     window.show()
@@ -1,41 +1,50 @@
 import sys
-import pyodbc
 import webbrowser
 import os
 from pathlib import Path
-import tempfile
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QLabel, QComboBox, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QComboBox, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTableView,
     QHeaderView, QScrollArea, QFrame, QDialog, QTextBrowser, QTabWidget,
     QProgressBar, QStackedWidget, QMessageBox, QFileDialog
 )
-from PySide6.QtCore import Qt, QUrl
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QFont
 
-try:
-    import pandas as pd
-    import plotly.express as px
-    import plotly.graph_objects as go
-    from PySide6.QtWebEngineWidgets import QWebEngineView
-except ImportError:
-    print("Dependências críticas (pandas, plotly, PySide6-WebEngine) não encontradas.")
-    pd = px = go = QWebEngineView = None
-
-try:
-    from ansi2html import Ansi2HTMLConverter
-    ansi_converter = Ansi2HTMLConverter(dark_bg=True, scheme="xterm")
-except ImportError:
-    ansi_converter = None
-
+# Dependências dos gráficos (pandas, plotly, WebEngine): pesadas, importadas só quando a
+# tela de gráficos é aberta pela primeira vez (ver _load_chart_dependencies)
+pd = px = go = PlotlyChartView = None
 
+def _load_chart_dependencies():
+    """Importa pandas/plotly/WebEngine na primeira chamada. Retorna False se não estiverem instalados."""
+    global pd, px, go, PlotlyChartView
+    if PlotlyChartView is None:
+        try:
+            import pandas as pd
+            import plotly.express as px
+            import plotly.graph_objects as go
+            from src.views.dashboard.plotly_renderer import PlotlyChartView
+        except ImportError as e:
+            print(f"Dependências críticas (pandas, plotly, PySide6-WebEngine) não encontradas: {e}")
+            return False
+    return True
 
 #! IMPORT MODELS
 from src.models.db.DashboardDB import DashboardDB
+from src.views.dashboard.data_service import DashboardDataService
+from src.views.dashboard.points_table import (
+    ConnectionPointsModel, PointsSortProxyModel, PointActionDelegate, COL_REMARK, COL_APPROVAL, COL_PDF
+)
+from src.views.dashboard.points_dataset import PointsDataset, CLIENT_FILTER_MAX_POINTS, FILTER_DEBOUNCE_MS
+from src.views.dashboard.change_watcher import DatabaseChangeWatcher
 
-#! Importação PVRV do script de ETL e Classes Criadas
-from Palkia_GUI import  PalkiaWindowGUI
+# Linhas da tabela (a partir da primeira visível) cujos detalhes são pré-carregados
+DETAILS_PREFETCH_ROWS = 50
+DETAILS_PREFETCH_DELAY_MS = 150
+
+#! Importação PVRV do script de ETL e Classes Criadas: feita ao abrir a tela de extração
+#! (DesktopDashboardWindow._create_extraction_widget), pois carrega todo o ETL
 
 
 # ==============================================================================
@@ -101,6 +110,7 @@ class DetailsDialog(QDialog):
 
 class ApprovalDialog(QDialog):
     def __init__(self, cod_ons, parent=None):
+        # cod_ons: um Cód ONS, ou a lista de pontos da aprovação em lote
         super().__init__(parent)
         self.setWindowTitle("Aprovar Solicitação")
         self.setStyleSheet(STYLESHEET)
@@ -108,7 +118,11 @@ class ApprovalDialog(QDialog):
         self.approver_name = ""
         
         layout = QVBoxLayout(self)
-        layout.addWidget(QLabel(f"<b>Ponto de Conexão:</b> {cod_ons}"))
+        if isinstance(cod_ons, (list, tuple)) and len(cod_ons) > 1:
+            layout.addWidget(QLabel(f"<b>Pontos de Conexão:</b> {len(cod_ons)} selecionados"))
+        else:
+            cod_ons = cod_ons[0] if isinstance(cod_ons, (list, tuple)) else cod_ons
+            layout.addWidget(QLabel(f"<b>Ponto de Conexão:</b> {cod_ons}"))
         layout.addWidget(QLabel("Digite seu nome para confirmar:"))
         
         self.name_input = QLineEdit()
@@ -143,24 +157,32 @@ class CompanyCard(QFrame):
         super().__init__(parent)
         self.setObjectName("kpiCard")
         
-        with_remarks = stats.get('with_remarks', 0)
-        total = stats.get('total', 0)
-        percentage = (with_remarks / total * 100) if total > 0 else 0
-        
         layout = QVBoxLayout(self)
         name_label = QLabel(company_name)
         name_label.setStyleSheet("font-weight: bold; font-size: 16px;")
         
-        stats_label = QLabel(f"Com Ressalvas: {with_remarks} / {total}")
-        stats_label.setObjectName("kpiTitle")
+        self.stats_label = QLabel()
+        self.stats_label.setObjectName("kpiTitle")
+        self.approved_label = QLabel()
+        self.approved_label.setObjectName("kpiTitle")
         
         self.progress_bar = QProgressBar()
-        self.progress_bar.setValue(int(percentage))
-        self.progress_bar.setFormat(f"{percentage:.1f}%")
         
         layout.addWidget(name_label)
-        layout.addWidget(stats_label)
+        layout.addWidget(self.stats_label)
+        layout.addWidget(self.approved_label)
         layout.addWidget(self.progress_bar)
+        self.update_stats(stats)
+    
+    def update_stats(self, stats):
+        with_remarks = stats.get('with_remarks', 0)
+        total = stats.get('total', 0)
+        percentage = (with_remarks / total * 100) if total > 0 else 0
+        
+        self.stats_label.setText(f"Com Ressalvas: {with_remarks} / {total}")
+        self.approved_label.setText(f"Aprovados: {stats.get('approved', 0)} / {total}")
+        self.progress_bar.setValue(int(percentage))
+        self.progress_bar.setFormat(f"{percentage:.1f}%")
 
 # ==============================================================================
 # TELAS DA APLICAÇÃO (Widgets)
@@ -168,10 +190,25 @@ class CompanyCard(QFrame):
 
 
 class DashboardMainWidget(QWidget):
-    def __init__(self, db_model, parent=None):
+    # Linhas alteradas no banco; emitido da thread que gravou e entregue na thread da interface
+    points_changed = Signal(str, object)
+
+    def __init__(self, db_model, data_service, client_filter_limit=CLIENT_FILTER_MAX_POINTS, parent=None):
         super().__init__(parent)
         self.db = db_model
+        self.data_service = data_service # consultas ao banco rodam fora da thread da interface
+        # Até este número de pontos os filtros são aplicados em memória (ver PointsDataset)
+        self.client_filter_limit = client_filter_limit
+        self._dataset = None
+        self._current_filters = None
+        self._total_rows = 0
+        self._kpis = {}
+        self._company_stats = {} # nome_empresa -> estatísticas exibidas no card
+        self._company_cards = {}
         self._setup_ui()
+        self.points_changed.connect(self._on_points_changed)
+        self.db.add_change_listener(self.points_changed.emit)
+        self.destroyed.connect(lambda: self.db.remove_change_listener(self.points_changed.emit))
         self._load_initial_data()
     
     def _setup_ui(self):
@@ -210,6 +247,7 @@ class DashboardMainWidget(QWidget):
             "total_points": self._create_kpi_card("Total de Pontos", "0"),
             "points_with_remarks": self._create_kpi_card("Pontos com Ressalvas", "0"),
             "percentage_with_remarks": self._create_kpi_card("% com Ressalvas", "0.0%"),
+            "approved_points": self._create_kpi_card("Pontos Aprovados", "0"),
         }
         for card in self.kpi_cards.values():
             self.kpi_layout.addWidget(card)
@@ -281,6 +319,15 @@ class DashboardMainWidget(QWidget):
         grid_layout.addWidget(self.tension_combo, 1, 3)
         grid_layout.addWidget(self.status_combo, 1, 4)
         
+        # Filtros aplicados sozinhos após uma pausa na digitação/seleção (sem consulta por tecla)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(self._apply_filters)
+        self.search_input.textChanged.connect(lambda _text: self._filter_timer.start())
+        for combo in (self.company_combo, self.year_combo, self.tension_combo, self.status_combo):
+            combo.currentIndexChanged.connect(lambda _index: self._filter_timer.start())
+        
         button_layout = QHBoxLayout()
         button_layout.addStretch()
         
@@ -303,35 +350,112 @@ class DashboardMainWidget(QWidget):
         container = QFrame()
         container.setObjectName("container")
         layout = QVBoxLayout(container)
-        layout.addWidget(QLabel("Detalhes dos Pontos de Conexão", objectName="sectionTitle"))
-        
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Empresa", "Cód ONS", "Tensão (kV)", "Ressalva?", "Ação/Aprovado Por", "Arquivo PDF"
-        ])
+        title_layout = QHBoxLayout()
+        title_layout.addWidget(QLabel("Detalhes dos Pontos de Conexão", objectName="sectionTitle"))
+        title_layout.addStretch()
+        self.approve_selected_button = QPushButton("Aprovar Selecionados")
+        self.approve_selected_button.setObjectName("filterButton")
+        self.approve_selected_button.clicked.connect(self._approve_selected)
+        title_layout.addWidget(self.approve_selected_button)
+        layout.addLayout(title_layout)
+        
+        # Modelo/view: nenhum widget por linha, só as linhas visíveis são pintadas
+        self.points_model = ConnectionPointsModel(self)
+        # Paginação: a view chama fetchMore ao chegar no fim e o modelo pede a próxima página
+        self.points_model.fetch_requested.connect(self._load_next_page)
+        self.points_proxy = PointsSortProxyModel(self)
+        self.points_proxy.setSourceModel(self.points_model)
+        
+        self.table = QTableView()
+        self.table.setModel(self.points_proxy)
+        self.action_delegate = PointActionDelegate(self.table)
+        self.action_delegate.action_clicked.connect(self._on_action_clicked)
+        self.table.setItemDelegateForColumn(COL_REMARK, self.action_delegate)
+        self.table.setItemDelegateForColumn(COL_APPROVAL, self.action_delegate)
         
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         header.setStretchLastSection(True)
-        
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.cellClicked.connect(self._on_cell_clicked)
-        self.table.setFixedHeight((self.fontMetrics().height() + 12) * 16)
+        # Sem indicador: mantém a ordem do banco até o usuário clicar num cabeçalho
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        
+        row_height = self.fontMetrics().height() + 12
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(row_height)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection) # Ctrl/Shift para aprovar em lote
+        self.table.clicked.connect(self._on_cell_clicked)
+        self.table.setFixedHeight(row_height * 16)
+        
+        # Pré-carrega ressalva e histórico das linhas visíveis (e das próximas) para o modal de detalhes
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(DETAILS_PREFETCH_DELAY_MS)
+        self._prefetch_timer.timeout.connect(self._prefetch_visible_details)
+        self.table.verticalScrollBar().valueChanged.connect(self._prefetch_timer.start)
+        self.points_proxy.modelReset.connect(self._prefetch_timer.start)
+        self.points_proxy.rowsInserted.connect(self._prefetch_timer.start)
+        self.points_proxy.layoutChanged.connect(self._prefetch_timer.start)
+        
+        self.table_footer_label = QLabel("")
+        self.table_footer_label.setObjectName("kpiTitle")
         
         layout.addWidget(self.table)
+        layout.addWidget(self.table_footer_label)
         return container
     
     def _load_initial_data(self):
-        self._update_kpis()
-        self._populate_company_analysis()
-        self._populate_yearly_stats()
-        self._populate_filters()
-        self._apply_filters()
-    
-    def _update_kpis(self):
-        kpi_data = self.db.get_kpi_summary()
+        # Um único snapshot traz KPIs, empresas, estatísticas, filtros e a tabela inicial
+        self.table_footer_label.setText("Carregando dados...")
+        self.data_service.request("snapshot", self.db.get_dashboard_snapshot, callback=self._on_snapshot_loaded)
+    
+    def _on_snapshot_loaded(self, snapshot, reload=False):
+        self._on_summary_loaded(snapshot)
+        self._populate_filters(snapshot['companies'], snapshot['tensions'])
+        # Se o usuário já filtrou enquanto o snapshot carregava, a tabela filtrada prevalece
+        if self._current_filters is None:
+            self._populate_table(snapshot['connection_points'], snapshot['connection_points_next_cursor'])
+            self._set_pagination(snapshot['connection_points_total'])
+        elif reload:
+            self._apply_filters()
+        if snapshot['kpis'].get('total_points', 0) <= self.client_filter_limit:
+            self.data_service.request("dataset", self._build_points_dataset, callback=self._on_dataset_loaded)
+    
+    def _build_points_dataset(self):
+        """Executado em segundo plano: todos os pontos e seus anos, para filtrar em memória."""
+        return PointsDataset(self.db.get_all_connection_points(), self.db.get_point_years())
+    
+    def _on_dataset_loaded(self, dataset):
+        self._dataset = dataset
+    
+    def _on_summary_loaded(self, snapshot):
+        self._update_kpis(snapshot['kpis'])
+        self._populate_company_analysis(snapshot['company_analysis'])
+        self._populate_yearly_stats(snapshot['yearly_stats'])
+    
+    def apply_database_changes(self, changes):
+        """Aplica as alterações feitas fora desta tela (ver DatabaseChangeWatcher)."""
+        if changes['full_reload']:
+            # Carga nova ou inclusões/exclusões: recarrega tudo, mantendo os filtros escolhidos
+            self._dataset = None
+            self.data_service.cancel("dataset")
+            self.data_service.request("snapshot", self.db.get_dashboard_snapshot,
+                                      callback=lambda snapshot: self._on_snapshot_loaded(snapshot, reload=True))
+            return
+        if changes['rows']:
+            self.points_model.update_rows(changes['rows'])
+            if self._dataset is not None:
+                self._dataset.update_rows(changes['rows'])
+        if changes['rows'] or changes['aggregates_changed']:
+            # Confere o cache de detalhes (também muda só com valores MUST) e recarrega os descartados
+            self._prefetch_timer.start()
+        if changes['aggregates_changed']:
+            self.data_service.request("summary", self.db.get_dashboard_snapshot, callback=self._on_summary_loaded)
+    
+    def _update_kpis(self, kpi_data):
+        self._kpis = dict(kpi_data)
         self.kpi_cards["unique_companies"].findChild(QLabel, "kpiValue").setText(
             str(kpi_data.get('unique_companies', 0)))
         self.kpi_cards["total_points"].findChild(QLabel, "kpiValue").setText(
@@ -340,22 +464,31 @@ class DashboardMainWidget(QWidget):
             str(kpi_data.get('points_with_remarks', 0)))
         self.kpi_cards["percentage_with_remarks"].findChild(QLabel, "kpiValue").setText(
             str(kpi_data.get('percentage_with_remarks', '0.0%')))
-    
-    def _populate_company_analysis(self):
-        analysis_data = self.db.get_company_analysis()
+        self.kpi_cards["approved_points"].findChild(QLabel, "kpiValue").setText(
+            str(kpi_data.get('approved_points', 0)))
+    
+    def _populate_company_analysis(self, analysis_data):
+        # Mesmas empresas de antes (ex.: após uma aprovação): só atualiza os números dos cards
+        if [stats['nome_empresa'] for stats in analysis_data] == list(self._company_cards):
+            for stats in analysis_data:
+                self._company_stats[stats['nome_empresa']] = dict(stats)
+                self._company_cards[stats['nome_empresa']].update_stats(stats)
+            return
         for i in reversed(range(self.company_analysis_layout.count())):
             self.company_analysis_layout.itemAt(i).widget().setParent(None)
+        self._company_stats, self._company_cards = {}, {}
         
         row, col, MAX_COLS = 0, 0, 3
         for stats in analysis_data:
             card = CompanyCard(stats['nome_empresa'], stats)
+            self._company_stats[stats['nome_empresa']] = dict(stats)
+            self._company_cards[stats['nome_empresa']] = card
             self.company_analysis_layout.addWidget(card, row, col)
             col += 1
             if col >= MAX_COLS:
                 col, row = 0, row + 1
     
-    def _populate_yearly_stats(self):
-        stats_data = self.db.get_yearly_must_stats()
+    def _populate_yearly_stats(self, stats_data):
         for i in reversed(range(self.yearly_stats_layout.count())):
             self.yearly_stats_layout.itemAt(i).widget().setParent(None)
         
@@ -391,52 +524,43 @@ class DashboardMainWidget(QWidget):
             if col >= MAX_COLS:
                 col, row = 0, row + 1
     
-    def _populate_filters(self):
-        self.company_combo.addItems(["Todas"] + self.db.get_unique_companies())
-        self.year_combo.addItems(["Todos", "2025", "2026", "2027", "2028"])
-        self.tension_combo.addItems(["Todas"] + self.db.get_unique_tensions())
-        self.status_combo.addItems(["Todos", "Com Ressalva", "Aprovado"])
+    def _populate_filters(self, companies, tensions):
+        options = {
+            self.company_combo: ["Todas"] + companies,
+            self.year_combo: ["Todos", "2025", "2026", "2027", "2028"],
+            self.tension_combo: ["Todas"] + tensions,
+            self.status_combo: ["Todos", "Com Ressalva", "Aprovado"],
+        }
+        for combo, items in options.items():
+            combo.blockSignals(True) # preencher as opções não conta como troca de filtro
+            # Numa recarga a opção escolhida é mantida, se ainda existir
+            previous = combo.currentText()
+            combo.clear()
+            combo.addItems(items)
+            combo.setCurrentIndex(max(combo.findText(previous), 0))
+            combo.blockSignals(False)
+    
+    def _populate_table(self, data, next_cursor=None):
+        self.points_model.set_rows(data, next_cursor)
+    
+    def _set_pagination(self, total):
+        self._total_rows = total
+        self.table_footer_label.setText(f"Exibindo {self.points_model.rowCount()} de {total} pontos")
+    
+    def _load_next_page(self):
+        if self.data_service.is_pending("next_page") or self.points_model.next_cursor is None:
+            return
+        self.data_service.request("next_page", self.db.get_connection_points_page,
+                                  self._current_filters, self.points_model.next_cursor,
+                                  callback=self._on_next_page_loaded, error_callback=self._on_next_page_failed)
     
-    def _populate_table(self, data):
-        self.table.setRowCount(0)
-        self.table.setRowCount(len(data))
-        
-        for r, row in enumerate(data):
-            annotation = row.get('anotacao_geral')
-            has_remark = annotation and str(annotation).strip().lower() not in ('', 'nan')
-            
-            self.table.setItem(r, 0, QTableWidgetItem(row['nome_empresa']))
-            self.table.setItem(r, 1, QTableWidgetItem(row['cod_ons']))
-            self.table.setItem(r, 2, QTableWidgetItem(str(row.get('tensao_kv', 'N/D'))))
-            
-            if has_remark:
-                remark_button = QPushButton("Sim")
-                remark_button.setStyleSheet(
-                    "background-color: #FBBF24; color: #78350F; font-weight: bold;")
-                remark_button.clicked.connect(lambda checked=False, r=r: self._show_details_modal(r))
-                self.table.setCellWidget(r, 3, remark_button)
-            else:
-                item = QTableWidgetItem("Não")
-                item.setForeground(Qt.GlobalColor.green)
-                self.table.setItem(r, 3, item)
-            
-            if row.get('aprovado_por'):
-                self.table.setCellWidget(r, 4, 
-                    QLabel(f"{row['aprovado_por']} em {row['data_aprovacao']}"))
-            else:
-                approve_button = QPushButton("Aprovar")
-                approve_button.setStyleSheet("font-size: 12px; padding: 5px;")
-                approve_button.clicked.connect(lambda checked=False, r=r: self._open_approval_dialog(r))
-                self.table.setCellWidget(r, 4, approve_button)
-            
-            pdf_link = row.get('arquivo_referencia', '')
-            pdf_item = QTableWidgetItem("Abrir Link" if pdf_link else "N/D")
-            if pdf_link:
-                pdf_item.setForeground(Qt.GlobalColor.cyan)
-                pdf_item.setData(Qt.ItemDataRole.UserRole, pdf_link)
-            self.table.setItem(r, 5, pdf_item)
-        
-        self.table.resizeRowsToContents()
+    def _on_next_page_loaded(self, page):
+        self.points_model.append_rows(page['rows'], page['next_cursor'])
+        self._set_pagination(self._total_rows)
+    
+    def _on_next_page_failed(self, details):
+        print(f"Erro ao carregar a próxima página: {details}")
+        self.points_model.append_rows([], self.points_model.next_cursor) # libera nova tentativa ao rolar
     
     def _apply_filters(self):
         filters = {
@@ -446,8 +570,31 @@ class DashboardMainWidget(QWidget):
             "tension": self.tension_combo.currentText(),
             "status": self.status_combo.currentText()
         }
-        data = self.db.get_all_connection_points(filters)
-        self._populate_table(data)
+        self._filter_timer.stop()
+        self._current_filters = filters
+        self.points_model.append_rows([], None) # evita carregar a página seguinte dos filtros anteriores durante o reset
+        self.data_service.cancel("next_page")
+        
+        if self._dataset is not None:
+            # Dataset em memória: filtra sem ir ao banco
+            self.data_service.cancel("points")
+            rows = self._dataset.filter(filters)
+            self._populate_table(rows)
+            self._set_pagination(len(rows))
+            return
+        
+        self.table_footer_label.setText("Filtrando...")
+        # Um novo filtro substitui o anterior ainda em andamento (canal "points")
+        self.data_service.request("points", self._query_filtered_points, filters, callback=self._on_filtered_points_loaded)
+    
+    def _query_filtered_points(self, filters):
+        """Executado em segundo plano: primeira página e total de pontos do filtro."""
+        return self.db.get_connection_points_page(filters), self.db.count_connection_points(filters)
+    
+    def _on_filtered_points_loaded(self, result):
+        page, total = result
+        self._populate_table(page['rows'], page['next_cursor'])
+        self._set_pagination(total)
     
     def _clear_filters(self):
         self.company_combo.setCurrentIndex(0)
@@ -457,43 +604,109 @@ class DashboardMainWidget(QWidget):
         self.status_combo.setCurrentIndex(0)
         self._apply_filters()
     
-    def _on_cell_clicked(self, row, column):
-        if column == 5:
-            item = self.table.item(row, column)
-            if item and item.data(Qt.ItemDataRole.UserRole):
-                webbrowser.open(item.data(Qt.ItemDataRole.UserRole))
+    def _on_cell_clicked(self, index):
+        if index.column() == COL_PDF and index.data(Qt.ItemDataRole.UserRole):
+            webbrowser.open(index.data(Qt.ItemDataRole.UserRole))
+    
+    def _on_action_clicked(self, column, row):
+        # `row` já é a linha no modelo de origem (independe da ordenação)
+        if column == COL_REMARK:
+            self._show_details_modal(row)
+        elif column == COL_APPROVAL:
+            self._open_approval_dialog(row)
     
     def _open_approval_dialog(self, row):
-        cod_ons = self.table.item(row, 1).text()
-        dialog = ApprovalDialog(cod_ons, self)
-        if dialog.exec():
-            approver = dialog.approver_name
-            if self.db.approve_point(cod_ons, approver):
-                self._apply_filters()
+        self._approve_cod_ons([self.points_model.cod_ons(row)])
+    
+    def _approve_selected(self):
+        selected_rows = sorted({self.points_proxy.mapToSource(index).row()
+                                for index in self.table.selectionModel().selectedRows()})
+        cod_ons_list = [self.points_model.cod_ons(r) for r in selected_rows if self.points_model.is_pending(r)]
+        
+        # Tudo selecionado mas a tabela ainda tem páginas por carregar: oferece aprovar o filtro inteiro
+        if (selected_rows and len(selected_rows) == self.points_model.rowCount()
+                and self.points_model.next_cursor is not None):
+            answer = QMessageBox.question(
+                self, "Aprovar Selecionados",
+                f"Aprovar todos os {self._total_rows} pontos do filtro atual, "
+                f"e não só os {len(selected_rows)} carregados na tabela?")
+            if answer == QMessageBox.StandardButton.Yes:
+                self.data_service.request("approval_scope", self._query_pending_cod_ons, self._current_filters,
+                                          callback=self._approve_cod_ons)
+                return
+        self._approve_cod_ons(cod_ons_list)
+    
+    def _query_pending_cod_ons(self, filters):
+        """Executado em segundo plano: Cód ONS ainda não aprovados do filtro."""
+        return [row['cod_ons'] for row in self.db.get_all_connection_points(filters) if not row.get('aprovado_por')]
+    
+    def _approve_cod_ons(self, cod_ons_list):
+        if not cod_ons_list:
+            QMessageBox.information(self, "Aprovar Selecionados", "Selecione ao menos um ponto pendente de aprovação.")
+            return
+        dialog = ApprovalDialog(cod_ons_list, self)
+        if not dialog.exec():
+            return
+        # Gravação sem canal: nunca é descartada por outro pedido
+        self.data_service.request(None, self.db.approve_points, cod_ons_list, dialog.approver_name,
+                                  callback=self._on_points_approved)
+    
+    def _on_points_approved(self, updated_rows):
+        # As linhas gravadas chegam pelo aviso de alteração do DashboardDB (_on_points_changed)
+        if updated_rows is None:
+            QMessageBox.critical(self, "Erro", "Não foi possível gravar as aprovações. Nenhum ponto foi alterado.")
+    
+    def _on_points_changed(self, change_type, rows):
+        # Atualiza só as linhas alteradas e os contadores afetados, sem recarregar a tabela nem os cards
+        self.points_model.update_rows(rows)
+        if self._dataset is not None:
+            self._dataset.update_rows(rows)
+        if change_type != 'approved':
+            return
+        for row in rows:
+            stats = self._company_stats.get(row['nome_empresa'])
+            if stats is not None:
+                stats['approved'] = stats.get('approved', 0) + 1
+        for company in {row['nome_empresa'] for row in rows}:
+            if company in self._company_cards:
+                self._company_cards[company].update_stats(self._company_stats[company])
+        if self._kpis:
+            self._kpis['approved_points'] = self._kpis.get('approved_points', 0) + len(rows)
+            self._update_kpis(self._kpis)
+    
+    def _prefetch_visible_details(self):
+        first = max(self.table.rowAt(0), 0)
+        last = min(first + DETAILS_PREFETCH_ROWS, self.points_proxy.rowCount())
+        ids = [self.points_model.id_conexao(self.points_proxy.mapToSource(self.points_proxy.index(r, 0)).row())
+               for r in range(first, last)]
+        if ids:
+            self.data_service.request("details_prefetch", self.db.prefetch_point_details, ids)
     
     def _show_details_modal(self, row):
-        cod_ons_item = self.table.item(row, 1)
-        if not cod_ons_item:
+        id_conexao = self.points_model.id_conexao(row)
+        # Pré-carregado: abre na hora, sem ir ao banco
+        details = self.db.peek_point_details(id_conexao)
+        if details is not None:
+            self._on_point_details_loaded(details)
             return
-        
-        cod_ons = cod_ons_item.text()
-        annotation_data = self.db._execute_query(
-            f"SELECT anotacao_geral FROM {self.db.tbl_anotacao} WHERE cod_ons = ?",
-            (cod_ons,), fetch_one=True)
-        annotation = annotation_data.get('anotacao_geral') if annotation_data else "Não encontrada."
-        history_data = self.db.get_must_history_for_point(cod_ons)
-        
+        self.data_service.request("details", self.db.get_point_details, id_conexao, callback=self._on_point_details_loaded)
+    
+    def _on_point_details_loaded(self, details):
+        if details is None:
+            details = {'anotacao_geral': "Não encontrada.", 'history': []}
+        annotation, history_data = details['anotacao_geral'], details['history']
         dialog = DetailsDialog(str(annotation), history_data, self)
         dialog.exec()
 
 class GraphicsWidget(QWidget):
-    def __init__(self, db_model, parent=None):
+    def __init__(self, db_model, data_service, parent=None):
         super().__init__(parent)
         self.db = db_model
+        self.data_service = data_service
         self._setup_ui()
     
     def _setup_ui(self):
-        if not px or not QWebEngineView:
+        if not _load_chart_dependencies():
             layout = QVBoxLayout(self)
             layout.addWidget(QLabel("Plotly ou WebEngine não instalados."))
             return
@@ -505,36 +718,33 @@ class GraphicsWidget(QWidget):
         title.setObjectName("headerTitle")
         layout.addWidget(title)
         
-        chart_data = self.db.get_data_for_charts()
-        
-        grid_layout = QGridLayout()
-        grid_layout.setSpacing(10)
-        
-        self.points_chart = self._create_plotly_chart(
-            chart_data.get('points_per_company'), self._plot_points_by_company)
-        self.remarks_chart = self._create_plotly_chart(
-            chart_data.get('remarks_summary'), self._plot_remarks_pie)
-        self.yearly_chart = self._create_plotly_chart(
-            chart_data.get('yearly_sum'), self._plot_yearly_sum)
-        
-        grid_layout.addWidget(self.points_chart, 0, 0)
-        grid_layout.addWidget(self.remarks_chart, 0, 1)
-        grid_layout.addWidget(self.yearly_chart, 1, 0, 1, 2)
+        # Uma única view web com os três gráficos e o plotly.js local carregado uma vez
+        self.chart_view = PlotlyChartView(["points_chart", "remarks_chart", "yearly_chart"],
+                                          wide_ids=("yearly_chart",))
+        self.chart_view.setMinimumHeight(850)
+        layout.addWidget(self.chart_view)
         
-        layout.addLayout(grid_layout)
+        self.refresh()
+    
+    def refresh(self):
+        # Mesmo snapshot do dashboard (servido pelo cache do DashboardDB), buscado em segundo plano
+        self.data_service.request("charts", self.db.get_dashboard_snapshot, callback=self._on_snapshot_loaded)
+    
+    def apply_database_changes(self, changes):
+        if hasattr(self, 'chart_view') and (changes['full_reload'] or changes['aggregates_changed']):
+            self.refresh()
+    
+    def _on_snapshot_loaded(self, snapshot):
+        chart_data = snapshot['charts']
+        # Chamadas seguintes só atualizam os traces (Plotly.react), sem recarregar a página
+        self.chart_view.render_charts({
+            "points_chart": self._create_plotly_chart(chart_data.get('points_per_company'), self._plot_points_by_company),
+            "remarks_chart": self._create_plotly_chart(chart_data.get('remarks_summary'), self._plot_remarks_pie),
+            "yearly_chart": self._create_plotly_chart(chart_data.get('yearly_sum'), self._plot_yearly_sum),
+        })
     
     def _create_plotly_chart(self, data, plot_function):
-        browser = QWebEngineView()
-        if not data:
-            return browser
-        
-        fig = plot_function(data)
-        temp_file = tempfile.NamedTemporaryFile(suffix=".html", delete=False, 
-                                                mode='w', encoding='utf-8')
-        fig.write_html(temp_file.name, config={'displayModeBar': False})
-        temp_file.close()
-        browser.setUrl(QUrl.fromLocalFile(os.path.abspath(temp_file.name)))
-        return browser
+        return plot_function(data) if data else None
     
     def _get_plotly_layout(self, title):
         return go.Layout(
@@ -600,6 +810,11 @@ class DesktopDashboardWindow(QMainWindow):
         self.setWindowTitle("Dashboard MUST - Sistema Controle e Gestão ONS")
         self.setMinimumSize(1400, 950)
         self.setStyleSheet(STYLESHEET)
+        self.data_service = DashboardDataService(self)
+        # Iniciado antes das telas: a versão de referência é lida antes do primeiro snapshot
+        self.change_watcher = DatabaseChangeWatcher(self.db, self.data_service, parent=self)
+        self.change_watcher.changes_detected.connect(self._on_database_changed)
+        self.change_watcher.start()
         
         self._setup_ui()
         self.nav_buttons["dashboard"].setChecked(True)
@@ -615,15 +830,43 @@ class DesktopDashboardWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         main_layout.addWidget(self.stacked_widget, 1)
         
-        self.dashboard_widget = self._create_scrollable_widget(DashboardMainWidget(self.db))
-        self.graphics_widget = self._create_scrollable_widget(GraphicsWidget(self.db))
-        self.extraction_widget = self._create_scrollable_widget(PalkiaWindowGUI())
-        self.reports_widget = self._create_scrollable_widget(ReportsWidget())
-        
-        self.stacked_widget.addWidget(self.dashboard_widget)
-        self.stacked_widget.addWidget(self.graphics_widget)
-        self.stacked_widget.addWidget(self.extraction_widget)
-        self.stacked_widget.addWidget(self.reports_widget)
+        # Só o dashboard é construído na abertura; as demais telas (gráficos com WebEngine/plotly,
+        # extração com o ETL) são criadas na primeira navegação até elas (ver _switch_view)
+        self._view_factories = [
+            lambda: DashboardMainWidget(self.db, self.data_service),
+            lambda: GraphicsWidget(self.db, self.data_service),
+            self._create_extraction_widget,
+            ReportsWidget,
+        ]
+        self._built_views = {}
+        self._view_contents = {} # índice -> tela (dentro da área de rolagem)
+        for _ in self._view_factories:
+            self.stacked_widget.addWidget(QWidget()) # marcador até a tela ser construída
+        self.dashboard_widget = self._ensure_view(0)
+    
+    def _create_extraction_widget(self):
+        from Palkia_GUI import PalkiaWindowGUI
+        return PalkiaWindowGUI()
+    
+    def _ensure_view(self, index):
+        """Retorna a tela do índice, construindo-a (no lugar do marcador) na primeira vez."""
+        view = self._built_views.get(index)
+        if view is None:
+            content = self._view_factories[index]()
+            view = self._create_scrollable_widget(content)
+            self._view_contents[index] = content
+            placeholder = self.stacked_widget.widget(index)
+            self.stacked_widget.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.stacked_widget.insertWidget(index, view)
+            self._built_views[index] = view
+        return view
+    
+    def _on_database_changed(self, changes):
+        # Só as telas já construídas; as demais leem os dados atuais ao abrir
+        for content in self._view_contents.values():
+            if hasattr(content, 'apply_database_changes'):
+                content.apply_database_changes(changes)
     
     def _create_nav_panel(self):
         nav_panel = QFrame()
@@ -669,7 +912,7 @@ class DesktopDashboardWindow(QMainWindow):
         return scroll_area
     
     def _switch_view(self, index):
-        self.stacked_widget.setCurrentIndex(index)
+        self.stacked_widget.setCurrentWidget(self._ensure_view(index))
 
 # ==============================================================================
 # PONTO DE ENTRADA
@@ -701,6 +944,7 @@ def main():
     
     if access_db_path.exists():
         try:
+            import pyodbc # só necessário quando existe o banco Access
             conn = pyodbc.connect(
                 r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
                 fr"DBQ={access_db_path};"
@@ -708,6 +952,9 @@ def main():
             conn.close()
             print(f"Usando Access: {access_db_path}")
             db_to_use = access_db_path
+        except ImportError as e:
+            print(f"pyodbc não instalado, Access indisponível: {e}")
+            print("Tentando SQLite...")
         except pyodbc.Error as e:
             print(f"Falha ao conectar Access: {e}")
             print("Tentando SQLite...")
@@ -723,10 +970,20 @@ def main():
             sys.exit(1)
     
     try:
-        db_model = DashboardDB(db_to_use)
+        # --replica: copia o banco para a memória e lê dali (bancos em pasta de rede)
+        db_model = DashboardDB(db_to_use, read_replica="--replica" in sys.argv)
         window = DesktopDashboardWindow(db_model)
         window.show()
-        sys.exit(app.exec())
+        exit_code = app.exec()
+        window.change_watcher.stop()
+        window.data_service.shutdown() # espera consultas em andamento antes de fechar o banco
+        # --query-stats=arquivo.json: grava a latência das consultas da sessão (ver DashboardDB.get_query_stats)
+        stats_path = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--query-stats=")), None)
+        if stats_path:
+            db_model.dump_query_stats(stats_path)
+            print(f"Estatísticas de consultas gravadas em: {stats_path}")
+        db_model.close() # Fecha as conexões persistentes do DashboardDB
+        sys.exit(exit_code)
         
     except Exception as e:
         print(f"Erro ao iniciar aplicação: {e}")
@@ -1,11 +1,20 @@
 from scripts.power_query_MUST_PDF_Tables import power_query, console
-from scripts.script_read_text_MUST_PDF import process_PDF_text_folder_pdf, process_PDF_text_single_pdf
+from scripts.script_read_text_MUST_PDF import process_PDF_text_folder_pdf, extract_pdf_annotations, export_pdf_annotations
 from scripts.juntar_resultados_excel_MUST import consolidar_anotacoes, substituir_aba_excel, extrair_cod_ons
 
 import os 
+import re
+import sys
+import json
+import argparse
+import multiprocessing
 import pandas as pd
 
-from services.DataBaseController import SQLiteController, AccessController
+from services.DataBaseController import SQLiteController, AccessController, prepare_and_normalize_data
+from services.background_writer import submit_write, wait_for_pending_writes
+from services.pipeline_runner import Pipeline, Stage
+from services.pdf_batch import extract_pdfs
+from services.extraction_cache import ExtractionCache, CACHE_FORMATS
 from pathlib import Path
 
 
@@ -14,11 +23,16 @@ from pathlib import Path
 #! Refatorar partindo do banco: Access Microsoft -> Crud - Pyside6 Controle e Gestão Desktop (Deck Builder + Gerador de Relatórios .docx e com AI em HTML) + Site Dashboard Atividades SP com controle aprovação MUST
 
 # Função para conectar com o Banco de dados (apos o Excel consolidado)
-def run_database_load_process(input_folder):
+def run_database_load_process(input_folder, incremental=True):
     """
     Função chamada pela GUI para carregar os dados nos bancos.
+
+    Por padrão a carga é incremental: só as linhas novas/alteradas/removidas são gravadas
+    e as aprovações (aprovado_por / data_aprovacao) são preservadas. Use incremental=False
+    para recarregar as tabelas inteiras.
     """
     console.log("Iniciando processo de carregamento para os bancos de dados...", "info")
+    wait_for_pending_writes() # o Excel de origem pode estar sendo gravado pela consolidação
     
     database_folder = Path(input_folder) / "database"
     source_excel_path = database_folder / "must_tables_PDF_notes_merged.xlsx"
@@ -29,16 +43,19 @@ def run_database_load_process(input_folder):
 
     df_source = pd.read_excel(source_excel_path)
 
+    # Prepara os dados UMA ÚNICA VEZ para os dois bancos
+    df_empresas, df_anotacao, df_valores_must = prepare_and_normalize_data(df_source)
+
     # Carregar para SQLite
     sqlite_db_path = database_folder / "database_consolidado.db"
-    sqlite_controller = SQLiteController(df_source, sqlite_db_path)
-    sqlite_controller.load_data()
+    sqlite_controller = SQLiteController(sqlite_db_path, df_empresas, df_anotacao, df_valores_must)
+    sqlite_controller.load_data(incremental=incremental)
     
     # Carregar para Access
     access_db_path = database_folder / "database_consolidado.accdb"
     if access_db_path.exists():
-        access_controller = AccessController(df_source, access_db_path)
-        access_controller.load_data()
+        access_controller = AccessController(access_db_path, df_empresas, df_anotacao, df_valores_must)
+        access_controller.load_data(incremental=incremental)
     else:
         console.log(f"AVISO: Banco de dados Access não encontrado em {access_db_path}. Pulei a carga.", "warning")
 
@@ -48,9 +65,11 @@ def run_database_load_process(input_folder):
 def consolidate_and_merge_results(input_folder):
     """
     Função principal que orquestra a consolidação das anotações
-    e o merge final com as tabelas.
+    e o merge final com as tabelas. Retorna a tabela final (os arquivos são gravados em
+    segundo plano).
     """
     console.log("Iniciando etapa de consolidação e junção...", "info")
+    wait_for_pending_writes() # planilhas das extrações ainda em gravação
     
     # --- 1. Consolida as anotações ---
     anotacoes_folder = os.path.join(input_folder, "anotacoes_extraidas")
@@ -75,7 +94,8 @@ def consolidate_and_merge_results(input_folder):
     # --- 3. Limpeza e Merge ---
     console.log("Limpando e padronizando códigos ONS...", "info")
     df_tables["Cód ONS"] = df_tables["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
-    df_notes["Cód ONS"] = df_notes["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()
+    # Novo DataFrame: df_notes ainda pode estar sendo gravado em export_notes_MUST_tables.xlsx
+    df_notes = df_notes.assign(**{"Cód ONS": df_notes["Cód ONS"].apply(extrair_cod_ons).str.upper().str.strip()})
 
     df_notes_filtrado = df_notes[df_notes["num_tabela"] == 1].reset_index(drop=True)
 
@@ -94,12 +114,14 @@ def consolidate_and_merge_results(input_folder):
     final_json_path = os.path.join(output_database_folder, "must_tables_PDF_notes_merged.json")
 
     console.log(f"Exportando resultado final para Excel: {final_excel_path}", "info")
-    df_final_merged.to_excel(final_excel_path, index=False)
+    submit_write(f"Resultado final salvo em: {final_excel_path}", df_final_merged.to_excel, final_excel_path, index=False)
     
     console.log(f"Exportando resultado final para JSON: {final_json_path}", "info")
-    df_final_merged.to_json(final_json_path, orient="records", force_ascii=False)
+    submit_write(f"Resultado final salvo em: {final_json_path}", df_final_merged.to_json, final_json_path,
+                 orient="records", force_ascii=False)
 
     console.log("✅ Processo de consolidação e junção concluído com sucesso!", "success")
+    return df_final_merged
 
 
 #-------------------------------------------------------------------------------------------------------------------------------
@@ -109,9 +131,13 @@ def consolidate_and_merge_results(input_folder):
 
 # EXTL (Extract, Load, Transform): Você extrai o conteúdo bruto dos PDFs (Extract), carrega esse conteúdo bruto (por exemplo, o texto completo de cada página) em uma área de preparação (staging area) no seu banco de dados ou em um Data Lake (Load), e só então executa rotinas (com SQL, Python, etc.) para limpar e estruturar os dados em tabelas finais (Transform). Este modelo é mais moderno e flexível.
 
-def run_extract_PDF_tables(input_folder, pdf_files_to_process, intervalos_paginas_to_process, mode = "folder" ):
- 
-    
+def run_extract_PDF_tables(input_folder, pdf_files_to_process, intervalos_paginas_to_process, mode = "folder", progress=None,
+                           jobs=1, cache=None):
+    """
+    Extrai as tabelas MUST dos PDFs selecionados. Retorna a tabela consolidada (ou None).
+    `progress`: chamável opcional que recebe um ProgressEvent por avanço (ver services/progress.py).
+    `jobs`/`cache`: PDFs lidos ao mesmo tempo e cache de extração (ver services/pdf_batch.py).
+    """
     print("\nIniciando extração de tabelas de PDFs...\n")
    
     output_folder = os.path.join(input_folder, "tabelas_extraidas")
@@ -133,10 +159,15 @@ def run_extract_PDF_tables(input_folder, pdf_files_to_process, intervalos_pagina
 
     # O modo "single" não será mais usado da mesma forma, já que estamos operando em uma lista selecionada
     # Se um único PDF foi selecionado na GUI, ele estará em pdf_files_to_process
-    power_query.run_folder_mode( input_folder, output_folder, mapeamento)
+    return power_query.run_folder_mode( input_folder, output_folder, mapeamento, progress=progress, jobs=jobs, cache=cache)
 
 
-def extract_text_from_must_tables(input_folder, pdf_files_to_process, mode = "folder"):
+def extract_text_from_must_tables(input_folder, pdf_files_to_process, mode = "folder", progress=None, jobs=1, cache=None):
+    """
+    Extrai as anotações dos PDFs selecionados. Retorna as anotações de todos eles juntas (ou None).
+    `progress`: chamável opcional que recebe um ProgressEvent por avanço (ver services/progress.py).
+    `jobs`/`cache`: PDFs lidos ao mesmo tempo e cache de extração (ver services/pdf_batch.py).
+    """
 
     print("\nIniciando extração de texto dos PDFs MUST...\n")
 
@@ -145,22 +176,175 @@ def extract_text_from_must_tables(input_folder, pdf_files_to_process, mode = "fo
     os.makedirs(output_folder, exist_ok=True) # Garante que a pasta exista
 
     # Execução para os arquivos selecionados
+    pdf_jobs = []
     for pdf_file_name in pdf_files_to_process:
         pdf_path = os.path.join(input_folder, pdf_file_name)
         if os.path.exists(pdf_path):
-            process_PDF_text_single_pdf(pdf_path, output_folder) # process_PDF_text_single_pdf já lida com um único PDF
+            pdf_jobs.append((pdf_file_name, pdf_path, ()))
         else:
             print(f"AVISO: O arquivo '{pdf_file_name}' não foi encontrado na pasta de entrada. Pulando.")
 
+    results = []
+    for pdf_file_name, df_pdf in extract_pdfs("extract_text", extract_pdf_annotations, pdf_jobs, progress, jobs, cache).items():
+        export_pdf_annotations(df_pdf, os.path.join(input_folder, pdf_file_name), output_folder)
+        if not df_pdf.empty:
+            results.append(df_pdf)
+
     print("\n🔚 Script concluído.")
+    return pd.concat(results, ignore_index=True) if results else None
+
+    
 
 
 
-# Main da automação 
-# if __name__ == "__main__":
+#-------------------------------------------------------------------------------------------------------------------------------
+#! PIPELINE: as etapas acima e os arquivos que cada uma lê e grava (ver services/pipeline_runner.py)
 
-#     run_extract_PDF_tables(intervalos_paginas, mode="folder")
+# Registro das execuções (parâmetros e tempos por etapa), na pasta de entrada
+PIPELINE_STATE_FILE = "pipeline_state.json"
 
-#     extract_text_from_must_tables(mode ="folder")
-    
 
+def build_must_pipeline(input_folder, pdf_files_to_process, intervalos_paginas_to_process, incremental=True,
+                        jobs=1, cache=None):
+    """
+    Monta o pipeline MUST para os PDFs selecionados: tabelas e anotações (independentes),
+    consolidação (depende das duas) e carga no banco (depende da consolidação).
+    `jobs`/`cache` valem para as extrações (PDFs em paralelo, cache por PDF).
+    """
+    extraction_options = {'jobs': jobs, 'cache': cache}
+    input_folder = str(input_folder)
+    root = Path(input_folder)
+    tabelas_folder = root / "tabelas_extraidas"
+    anotacoes_folder = root / "anotacoes_extraidas"
+    database_folder = root / "database"
+    pdf_paths = [root / pdf_file for pdf_file in pdf_files_to_process]
+    merged_excel = database_folder / "must_tables_PDF_notes_merged.xlsx"
+
+    stages = [
+        Stage("extract_tables", run_extract_PDF_tables,
+              args=(input_folder, list(pdf_files_to_process), list(intervalos_paginas_to_process), "folder"),
+              inputs=pdf_paths,
+              # Sem tabelas MUST nos PDFs nada é gravado; a consolidação é que não tem como seguir
+              optional_outputs=[tabelas_folder / "resultado_tabelas_MUST_ONS.xlsx", tabelas_folder / "database_must.xlsx"],
+              options=dict(extraction_options)),
+        Stage("extract_text", extract_text_from_must_tables,
+              args=(input_folder, list(pdf_files_to_process), "folder"),
+              inputs=pdf_paths,
+              # PDFs sem anotações (ou ilegíveis) não geram planilha
+              optional_outputs=[anotacoes_folder / f"saida_anotacoes_{path.stem}.xlsx" for path in pdf_paths],
+              options=dict(extraction_options)),
+        # A consolidação lê todas as planilhas de anotações da pasta, não só as dos PDFs selecionados
+        Stage("consolidate", consolidate_and_merge_results,
+              args=(input_folder,),
+              inputs=[anotacoes_folder / "saida_anotacoes*.xlsx", tabelas_folder / "database_must.xlsx"],
+              outputs=[merged_excel, database_folder / "must_tables_PDF_notes_merged.json"],
+              depends_on=("extract_tables", "extract_text")),
+        Stage("load_database", run_database_load_process,
+              args=(input_folder,), kwargs={'incremental': incremental},
+              inputs=[merged_excel],
+              outputs=[database_folder / "database_consolidado.db"],
+              depends_on=("consolidate",)),
+    ]
+    return Pipeline(stages, state_path=root / PIPELINE_STATE_FILE)
+
+
+#-------------------------------------------------------------------------------------------------------------------------------
+#! LINHA DE COMANDO (execuções em lote, sem interface gráfica)
+#   python -m run pipeline --input PASTA [--jobs N] [--cache PASTA] [--format parquet] [--from ETAPA] [--to ETAPA]
+
+_ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\-_]|\[[0-?]*[ -/]*[@-~])')
+
+EXTRACTION_STAGES = ("extract_tables", "extract_text")
+
+
+def _page_ranges(pdf_files, default_pages, pages_file=None):
+    """Intervalo de páginas de cada PDF: o do arquivo JSON {"arquivo.pdf": "8-16"}, ou o padrão."""
+    ranges = {}
+    if pages_file:
+        with open(pages_file, encoding='utf-8') as f:
+            ranges = json.load(f)
+    return [str(ranges.get(pdf_file, default_pages)) for pdf_file in pdf_files]
+
+
+def _build_arg_parser():
+    parser = argparse.ArgumentParser(prog="python -m run", description="Automação MUST: ETL dos PDFs sem interface gráfica.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pipeline = subparsers.add_parser(
+        "pipeline", help="Extrai tabelas e anotações, consolida e carrega no banco (etapas em dia são puladas).")
+    pipeline.add_argument("--input", required=True, help="Pasta com os PDFs MUST (as saídas são gravadas nela)")
+    pipeline.add_argument("--pdfs", nargs="+", help="PDFs a processar (padrão: todos os PDFs da pasta)")
+    pipeline.add_argument("--pages", default="all", help="Intervalo de páginas das tabelas, para todos os PDFs (padrão: all)")
+    pipeline.add_argument("--pages-file", help='JSON {"arquivo.pdf": "8-16"} com o intervalo de cada PDF (sobrepõe --pages)')
+    pipeline.add_argument("--jobs", type=int, default=1, help="Processos em paralelo: extrações simultâneas e PDFs lidos ao mesmo tempo")
+    pipeline.add_argument("--cache", help="Pasta do cache de extração por PDF (reaproveitado entre execuções)")
+    pipeline.add_argument("--format", choices=CACHE_FORMATS, default="parquet", help="Formato dos arquivos do cache (padrão: parquet)")
+    pipeline.add_argument("--from", dest="from_stage", help="Primeira etapa (executada mesmo em dia)")
+    pipeline.add_argument("--to", dest="to_stage", help="Última etapa")
+    pipeline.add_argument("--force", action="store_true", help="Executa as etapas selecionadas mesmo em dia")
+    pipeline.add_argument("--full-load", action="store_true", help="Recarrega as tabelas do banco inteiras (padrão: carga incremental)")
+    pipeline.add_argument("--report", help="Relatório JSON da execução (padrão: <input>/pipeline_report.json)")
+    return parser
+
+
+def run_pipeline_cli(argv=None):
+    """Ponto de entrada de `python -m run pipeline`. Retorna o código de saída (0 se todas as etapas deram certo)."""
+    parser = _build_arg_parser()
+    args = parser.parse_args(argv)
+    input_folder = os.path.abspath(args.input)
+    if not os.path.isdir(input_folder):
+        parser.error(f"pasta de entrada não encontrada: {input_folder}")
+    pdf_files = args.pdfs or sorted(f for f in os.listdir(input_folder) if f.lower().endswith('.pdf'))
+    if not pdf_files:
+        parser.error(f"nenhum PDF em {input_folder}")
+    jobs = max(1, args.jobs)
+    cache = ExtractionCache(args.cache, args.format) if args.cache else None
+
+    pipeline = build_must_pipeline(input_folder, pdf_files, _page_ranges(pdf_files, args.pages, args.pages_file),
+                                   incremental=not args.full_load, cache=cache)
+    try:
+        plan = pipeline.plan(args.from_stage, args.to_stage, args.force)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e).strip("'\""))
+    # As extrações que vão rodar dividem os processos entre si (elas rodam ao mesmo tempo)
+    extractions = [run.stage for run in plan if run.will_run and run.stage.name in EXTRACTION_STAGES]
+    for stage in extractions:
+        stage.options['jobs'] = max(1, jobs // len(extractions))
+
+    strip_ansi = not sys.stdout.isatty() # logs redirecionados para arquivo: sem códigos de cor
+    def log(line):
+        print(_ANSI_ESCAPE.sub('', line) if strip_ansi else line, flush=True)
+
+    last_items = {}
+    def show_progress(stage_name, event):
+        if event.item != last_items.get(stage_name) and not event.finished:
+            last_items[stage_name] = event.item
+            log(f"[{stage_name}] PDF {event.current + 1} de {event.total}: {event.item}")
+
+    log(f"Pipeline MUST: {len(pdf_files)} PDF(s) em {input_folder}, {jobs} processo(s)"
+        + (f", cache em {cache.cache_dir} ({cache.fmt})" if cache else ""))
+    report = pipeline.run(args.from_stage, args.to_stage, args.force, jobs=jobs, on_log=log, on_progress=show_progress)
+
+    summary = report.to_dict()
+    for entry in summary['stages']:
+        result = report.results.get(entry['stage'])
+        entry['rows'] = len(result) if isinstance(result, pd.DataFrame) else None
+    summary.update({
+        'command': "pipeline",
+        'input': input_folder,
+        'pdfs': pdf_files,
+        'jobs': jobs,
+        'cache': cache.cache_dir if cache else None,
+        'cache_format': cache.fmt if cache else None,
+    })
+    report_path = args.report or os.path.join(input_folder, "pipeline_report.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    log("\nResumo:\n" + report.summary())
+    log(f"Relatório: {report_path}")
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(run_pipeline_cli())
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Mede o tempo de inicialização do dashboard desktop (app.py).
+
+1. Tempo de importação: roda `python -X importtime -c "import app"` e lista os módulos
+   com maior tempo acumulado.
+2. Tempo até a primeira pintura: abre a janela principal (sem exibir, plataforma
+   offscreen por padrão) e mede do início do processo até o primeiro evento Paint.
+
+Uso:
+    python scripts/benchmark_startup.py [--db caminho.db] [--top 15] [--runs 3]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Executado num processo separado: o tempo conta desde o início do interpretador
+_FIRST_PAINT_SCRIPT = r"""
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication
+app_qt = QApplication(sys.argv)
+import app
+from src.models.db.DashboardDB import DashboardDB
+imported = time.perf_counter()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and obj is window:
+            print(f"RESULT {{imported - start:.4f}} {{time.perf_counter() - start:.4f}}", flush=True)
+            app_qt.quit()
+        return False
+
+db = DashboardDB({db!r})
+window = app.DesktopDashboardWindow(db)
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+QTimer.singleShot(30000, app_qt.quit)
+app_qt.exec()
+window.data_service.shutdown()
+db.close()
+"""
+
+
+def measure_imports(top):
+    """Maiores tempos acumulados de importação (ms) ao importar app.py."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            depth = len(match.group(3)) // 2
+            rows.append((int(match.group(2)) / 1000, depth, match.group(4)))
+    total = next((ms for ms, depth, name in rows if name == "app"), None)
+    top_level = sorted((row for row in rows if row[1] <= 1), reverse=True)[:top]
+    return total, top_level
+
+
+def measure_first_paint(db_path, runs):
+    """Tempos (s) de importação e até a primeira pintura, um processo por rodada."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    script = _FIRST_PAINT_SCRIPT.format(root=str(ROOT), db=str(db_path))
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+        line = next((l for l in result.stdout.splitlines() if l.startswith("RESULT")), None)
+        if line is None:
+            print(f"Falha ao medir a primeira pintura:\n{result.stderr[-2000:]}")
+            return []
+        samples.append(tuple(float(v) for v in line.split()[1:]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do dashboard.")
+    parser.add_argument("--db", default=str(ROOT / "database" / "database_consolidado.db"),
+                        help="Banco SQLite usado para abrir a janela.")
+    parser.add_argument("--top", type=int, default=15, help="Quantidade de módulos listados.")
+    parser.add_argument("--runs", type=int, default=3, help="Rodadas da medição de primeira pintura.")
+    args = parser.parse_args()
+
+    total, top_level = measure_imports(args.top)
+    print("=== Importação de app.py ===")
+    if total is not None:
+        print(f"Total: {total:.0f} ms")
+    for ms, depth, name in top_level:
+        print(f"{ms:9.1f} ms  {'  ' * depth}{name}")
+
+    print("\n=== Primeira pintura da janela ===")
+    if not Path(args.db).exists():
+        print(f"Banco não encontrado: {args.db}")
+        return
+    samples = measure_first_paint(args.db, args.runs)
+    if samples:
+        imports = statistics.median(s[0] for s in samples)
+        paint = statistics.median(s[1] for s in samples)
+        print(f"Importações: {imports * 1000:.0f} ms | Primeira pintura: {paint * 1000:.0f} ms "
+              f"(mediana de {len(samples)} rodadas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import pandas as pd
 from openpyxl import load_workbook
 import os
 
+from services.background_writer import submit_write
+
 def substituir_aba_excel(df_novo, caminho_arquivo, nome_aba, engine='openpyxl'):
     """
     Substitui uma aba específica em um arquivo Excel existente por um novo DataFrame.
@@ -80,6 +82,7 @@ def consolidar_anotacoes(diretorio: str):
     - Só concatena arquivos com colunas iguais.
     - Filtra num_tabela = 1 (quando existir).
     - Extrai nome da empresa do arquivo.
+    Retorna o DataFrame consolidado (o Excel é gravado em segundo plano) ou None.
     """
     arquivos = [f for f in os.listdir(diretorio) if f.endswith(".xlsx") and f.startswith("saida_anotacoes")]
     
@@ -125,14 +128,19 @@ def consolidar_anotacoes(diretorio: str):
 
     df_final = pd.concat(dataframes, ignore_index=True)
 
-    # Exporta para Excel
+    # Exporta para Excel (uma cópia: quem chamou pode alterar df_final enquanto a planilha é gravada)
     caminho_saida = os.path.join(diretorio, "export_notes_MUST_tables.xlsx")
-    with pd.ExcelWriter(caminho_saida, engine="openpyxl") as writer:
-        df_final.to_excel(writer, sheet_name="Notas Consolidada", index=False)
-        pd.DataFrame({"Empresas": sorted(empresas)}).to_excel(writer, sheet_name="Empresas", index=False)
+    submit_write(f"Anotações consolidadas salvas em: {caminho_saida}", _gravar_notas_consolidadas,
+                 caminho_saida, df_final.copy(), sorted(empresas))
 
     print(f"✅ Consolidação concluída: {caminho_saida}")
     print(f"🔎 {len(empresas)} empresas identificadas: {sorted(empresas)}")
+    return df_final
+
+def _gravar_notas_consolidadas(caminho_saida, df_final, empresas):
+    with pd.ExcelWriter(caminho_saida, engine="openpyxl") as writer:
+        df_final.to_excel(writer, sheet_name="Notas Consolidada", index=False)
+        pd.DataFrame({"Empresas": empresas}).to_excel(writer, sheet_name="Empresas", index=False)
 
 # -----------------------------
 # Função para limpar código ONS
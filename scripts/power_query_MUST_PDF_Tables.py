@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 import re
-import camelot
 import os
 from rich.console import Console
 from rich.theme import Theme
 
+from services.background_writer import submit_write
+from services.pdf_batch import extract_pdfs
+
 class Logger:
     """Classe para fornecer logs coloridos e formatados no console."""
     def __init__(self):
@@ -40,16 +42,18 @@ class MiniPowerQuery:
         self.final_df = pd.DataFrame()
         self.console = console
 
-    def read_must_tables(self, pdf_path: str, pages: str = 'all'):
+    def read_must_tables(self, pdf_path: str, pages: str = 'all', reporter=None):
         """
         Função principal que orquestra a extração, processamento e
         consolidação de todas as tabelas MUST de um arquivo PDF.
+        `reporter` (ProgressReporter, opcional) recebe o avanço por tabela analisada.
         """
         self.final_df = pd.DataFrame()
         self.console.log(f"Iniciando processamento do arquivo: {os.path.basename(pdf_path)}", "step")
         self.console.log(f"📖 Extraindo todas as tabelas das páginas: {pages}", "info")
         
         try:
+            import camelot # importado só na extração: carrega opencv/pdfminer, lento na inicialização
             tables = camelot.read_pdf(pdf_path, pages=pages, flavor='lattice')
             self.console.log(f"✅ {len(tables)} tabelas encontradas no intervalo especificado.", "success")
         except Exception as e:
@@ -63,6 +67,8 @@ class MiniPowerQuery:
         all_processed_tables = []
         
         for i, table in enumerate(tables):
+            if reporter is not None:
+                reporter.step(i, len(tables), 'tabela')
             temp_df = table.df
             is_must_table = any("MUST" in str(cell).upper() for _, row in temp_df.head(5).iterrows() for cell in row)
             
@@ -81,6 +87,9 @@ class MiniPowerQuery:
                 self.console.log(f"    -> Nenhuma linha de dados válida na Tabela {i+1}. Não é uma tabela MUST", "warning")
 
 
+        if reporter is not None:
+            reporter.step(len(tables), len(tables), 'tabela')
+
         if not all_processed_tables:
             self.console.log("Nenhuma tabela MUST válida foi encontrada após o processamento.", "warning")
             return self
@@ -353,21 +362,24 @@ class MiniPowerQuery:
         (self.read_must_tables(pdf_path, pages=page_range)
         .trim_spaces().drop_duplicates().preview(2).export_excel(output_file))
 
-    def consolidar_tabela_final(self, output_folder, output_filename="database_must.xlsx"):
+    def consolidar_tabela_final(self, output_folder, output_filename="database_must.xlsx", all_sheets=None):
         """
         Consolida todas as abas do arquivo Excel gerado pelo run_folder_mode
         em um único DataFrame com uma coluna adicional 'EMPRESA'.
+        `all_sheets` ({nome da aba: DataFrame}) evita reler o arquivo quando as abas já
+        estão em memória. O Excel consolidado é gravado em segundo plano.
         """
         # Caminho do arquivo gerado pelo run_folder_mode
         input_excel_path = os.path.join(output_folder, "resultado_tabelas_MUST_ONS.xlsx")
         
-        if not os.path.exists(input_excel_path):
+        if all_sheets is None and not os.path.exists(input_excel_path):
             self.console.log(f"Arquivo de entrada não encontrado: {input_excel_path}", "error")
             return
         
         try:
             # Ler todas as abas do arquivo Excel
-            all_sheets = pd.read_excel(input_excel_path, sheet_name=None)
+            if all_sheets is None:
+                all_sheets = pd.read_excel(input_excel_path, sheet_name=None)
             
             # Lista para armazenar todos os DataFrames com a coluna EMPRESA
             consolidated_dfs = []
@@ -390,11 +402,8 @@ class MiniPowerQuery:
             
             # Salvar o resultado consolidado
             output_path = os.path.join(output_folder, output_filename)
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                final_consolidated_df.to_excel(writer, sheet_name="Tabelas Consolidada", index=False)
-                
-                # Adicionar aba com lista de empresas
-                pd.DataFrame({"Empresas": sorted(empresas)}).to_excel(writer, sheet_name="Empresas", index=False)
+            submit_write(f"Tabelas consolidadas salvas em: {output_path}", _write_consolidated_tables,
+                         output_path, final_consolidated_df.copy(), sorted(empresas))
             
             self.console.log(f"\n✅ Consolidação final concluída: {output_path}", "success")
             self.console.log(f"🔎 {len(empresas)} empresas identificadas: {sorted(empresas)}", "info")
@@ -418,32 +427,51 @@ class MiniPowerQuery:
         
         return empresa.strip().upper()
     
-    def run_folder_mode(self, input_folder, output_folder, mapeamento):
-        """Executa o processo para uma pasta, salvando em abas de um único Excel."""
-        all_company_data = {}
+    def run_folder_mode(self, input_folder, output_folder, mapeamento, progress=None, jobs=1, cache=None):
+        """
+        Executa o processo para uma pasta, salvando em abas de um único Excel.
+        `progress` recebe um ProgressEvent por avanço (ver services/progress.py); `jobs` PDFs
+        são lidos ao mesmo tempo e `cache` (ExtractionCache) evita reler PDFs já extraídos
+        com o mesmo intervalo (ver services/pdf_batch.py).
+        Retorna a tabela consolidada (com a coluna EMPRESA) ou None; os Excel são gravados
+        em segundo plano.
+        """
+        pdf_jobs = []
         for pdf_file, page_range in mapeamento.items():
             pdf_path = os.path.join(input_folder, pdf_file)
             if not os.path.exists(pdf_path):
                 console.log(f"AVISO: Arquivo '{pdf_file}' não encontrado, pulando.", "warning")
                 continue
-                
-            (self.read_must_tables(pdf_path, pages=page_range)
-            .trim_spaces().drop_duplicates())
-            
-            if not self.final_df.empty:
-                company_name = get_company_name_from_filename(pdf_file)
-                all_company_data[company_name] = self.final_df.copy()
+            pdf_jobs.append((pdf_file, pdf_path, (page_range,)))
+
+        all_company_data = {}
+        for pdf_file, df in extract_pdfs("extract_tables", read_pdf_must_tables, pdf_jobs, progress, jobs, cache).items():
+            if not df.empty:
+                all_company_data[get_company_name_from_filename(pdf_file)] = df
         
+        final_consolidated_df = None
         if all_company_data:
             output_excel_path = os.path.join(output_folder, "resultado_tabelas_MUST_ONS.xlsx")
-            with pd.ExcelWriter(output_excel_path, engine='xlsxwriter') as writer:
-                for company_name, df in all_company_data.items():
-                    sheet_name = f"sheet_{company_name}"[:31]
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
-            console.log(f"\n\n📁 Arquivo consolidado salvo em:\n{output_excel_path}", "success")
+            sheets = {f"sheet_{company_name}"[:31]: df for company_name, df in all_company_data.items()}
+            submit_write(f"Arquivo consolidado salvo em: {output_excel_path}", _write_company_sheets,
+                         output_excel_path, sheets)
+            console.log(f"\n\n📁 Arquivo consolidado: {output_excel_path} (gravando em segundo plano)", "success")
+
+            # Agora consolide todas as abas em um único DataFrame com coluna EMPRESA (das abas em memória)
+            final_consolidated_df = self.consolidar_tabela_final(output_folder, all_sheets=sheets)
+        return final_consolidated_df
 
-            # Agora consolide todas as abas em um único DataFrame com coluna EMPRESA
-            self.consolidar_tabela_final(output_folder)
+def _write_company_sheets(output_excel_path, sheets):
+    with pd.ExcelWriter(output_excel_path, engine='xlsxwriter') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+def _write_consolidated_tables(output_path, final_consolidated_df, empresas):
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        final_consolidated_df.to_excel(writer, sheet_name="Tabelas Consolidada", index=False)
+        
+        # Adicionar aba com lista de empresas
+        pd.DataFrame({"Empresas": empresas}).to_excel(writer, sheet_name="Empresas", index=False)
 
 def get_company_name_from_filename(filename: str) -> str:
     """Extrai um nome limpo de empresa do nome do arquivo."""
@@ -463,6 +491,10 @@ def get_company_name_from_filename(filename: str) -> str:
 
 power_query = MiniPowerQuery()
 
+def read_pdf_must_tables(pdf_path, page_range, reporter=None):
+    """Tabelas MUST de um PDF, já limpas (função de módulo: também roda em processos auxiliares)."""
+    return power_query.read_must_tables(pdf_path, pages=page_range, reporter=reporter).trim_spaces().drop_duplicates().final_df.copy()
+
 def run_automation(mode = "single" ):
     """Função principal para iniciar o processo de extração de tabelas MUST de PDFs."""
     
@@ -4,31 +4,50 @@ from services.pdf_processor import PDFProcessor
 from services.annotation_linker import AnnotationLinker
 from services.excel_exporter import ExcelExporter
 
-def process_PDF_text_single_pdf(pdf_path: str, output_folder: str):
+def process_PDF_text_single_pdf(pdf_path: str, output_folder: str, reporter=None):
     """
     Processa um único arquivo PDF, vinculando anotações e exportando os resultados para Excel.
 
     Args:
         pdf_path (str): Caminho do arquivo PDF a ser processado.
         output_folder (str): Pasta onde o arquivo Excel será salvo.
+        reporter (ProgressReporter, opcional): recebe as páginas lidas e as linhas extraídas.
+
+    Returns:
+        pd.DataFrame: anotações vinculadas do PDF (a planilha é gravada em segundo plano).
+    """
+    final_df = extract_pdf_annotations(pdf_path, reporter=reporter)
+
+    if reporter is not None:
+        reporter.add_rows(len(final_df))
+
+    export_pdf_annotations(final_df, pdf_path, output_folder)
+    return final_df
+
+def extract_pdf_annotations(pdf_path: str, reporter=None):
+    """
+    Extrai o texto do PDF e vincula as anotações às linhas de dados, sem gravar nada
+    (função de módulo: também roda em processos auxiliares, ver services/pdf_batch.py).
     """
     print(f"\n{'='*50}\nProcessando arquivo: {os.path.basename(pdf_path)}\n{'='*50}")
 
     #! 1) Processa o PDF e extrai o texto
     pdf_processor = PDFProcessor(pdf_path)
-    raw_text = pdf_processor.extract_text()
+    raw_text = pdf_processor.extract_text(reporter=reporter)
 
     #! 2) Vincula anotações às linhas de dados
     annotation_linker = AnnotationLinker(raw_text)
-    final_df = annotation_linker.link_annotations()
+    return annotation_linker.link_annotations()
 
+def export_pdf_annotations(final_df, pdf_path: str, output_folder: str):
+    """Grava (em segundo plano) a planilha saida_anotacoes_<pdf>.xlsx lida pela consolidação."""
     if not final_df.empty:
         # Define o caminho de saída
         base_name = os.path.splitext(os.path.basename(pdf_path))[0]
         output_excel_path = os.path.join(output_folder, f"saida_anotacoes_{base_name}.xlsx")
 
         #! 3) Exporta para Excel
-        ExcelExporter.export_to_excel(final_df, output_excel_path)
+        ExcelExporter.export_to_excel(final_df, output_excel_path, background=True)
     else:
         print("Nenhum dado processado para exportação.")
 
@@ -5,7 +5,10 @@ import re
 from abc import ABC, abstractmethod
 from pathlib import Path
 import sqlite3
-import pyodbc
+
+from src.models.db.summary_tables import refresh_summary_tables
+from src.models.db.search_index import ensure_search_index
+from src.models.db.change_log import ensure_change_log, prune_change_log
 
 # --- 1. Mapeamento e Funções de Preparação de Dados (fora das classes) ---
 
@@ -95,9 +98,97 @@ def prepare_and_normalize_data(df_source: pd.DataFrame):
     return df_empresas, df_equipamentos, df_valores_must
 
 
+def clean_must_valor(raw_valor):
+    """Converte o valor MUST textual ("1.500,25", "-") para float. Retorna None se não for numérico."""
+    if pd.isna(raw_valor):
+        return None
+    valor_str = str(raw_valor).strip()
+    if valor_str == '-':
+        return 0.0 # Trata o hífen como zero
+    try:
+        # Tenta a conversão para formatos como "1.500,25"
+        return float(valor_str.replace('.', '').replace(',', '.'))
+    except ValueError:
+        # Se ainda assim falhar, é um texto inesperado. Mantém como Nulo.
+        print(f"AVISO: Não foi possível converter o valor '{valor_str}' para número. Será inserido como Nulo.")
+        return None
+
+
+# --- 1.6. Carga incremental (diff pela chave natural) ---
+
+# Colunas de dados comparadas na carga incremental. As colunas de aprovação
+# (aprovado_por / data_aprovacao) ficam de fora: são escritas pelo dashboard e a carga nunca as toca.
+EMPRESAS_KEY = ['nome_empresa']
+ANOTACAO_KEY = ['cod_ons']
+ANOTACAO_DATA_COLUMNS = ['tensao_kv', 'ponto_de', 'ponto_ate', 'anotacao_geral', 'id_empresa']
+VALORES_KEY = ['id_conexao', 'ano', 'periodo'] # equivale a (cod_ons, ano, periodo) depois do alinhamento de IDs
+VALORES_DATA_COLUMNS = ['valor', 'anotacao_valor']
+
+def _to_db_value(value):
+    """Converte NaN/escalares numpy para tipos nativos aceitos pelos drivers (sqlite3/pyodbc)."""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value.item() if hasattr(value, 'item') else value
+
+def _normalize_compare_value(value):
+    """Normaliza um valor para comparação (o banco devolve 138, o Excel traz '138' ou 138.0)."""
+    value = _to_db_value(value)
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text if text and text.lower() != 'nan' else None
+
+def frame_to_rows(df: pd.DataFrame, columns):
+    """Converte as colunas de um DataFrame em tuplas prontas para executemany."""
+    return [tuple(_to_db_value(v) for v in row) for row in df[columns].itertuples(index=False, name=None)]
+
+def diff_frames(df_current: pd.DataFrame, df_new: pd.DataFrame, key_cols, data_cols):
+    """
+    Compara o estado atual do banco com o novo DataFrame pela chave natural.
+
+    Returns:
+        tuple: (df_inserts, df_updates, df_deletes) - os dois primeiros com as colunas de df_new,
+        o último apenas com as colunas da chave.
+    """
+    def keys_of(df):
+        return pd.Series([tuple(_normalize_compare_value(v) for v in row)
+                          for row in df[key_cols].itertuples(index=False, name=None)], index=df.index, dtype=object)
+
+    current_keys = keys_of(df_current)
+    new_keys = keys_of(df_new)
+
+    is_new = ~new_keys.isin(set(current_keys))
+    df_inserts = df_new[is_new]
+    df_deletes = df_current.loc[~current_keys.isin(set(new_keys)), key_cols]
+
+    if not data_cols or df_current.empty:
+        return df_inserts, df_new.iloc[0:0], df_deletes
+
+    def signature(df, keys):
+        return dict(zip(keys, (tuple(_normalize_compare_value(v) for v in row)
+                               for row in df[data_cols].itertuples(index=False, name=None))))
+
+    current_signature = signature(df_current, current_keys)
+    existing = df_new[~is_new]
+    new_signature = signature(existing, new_keys[~is_new])
+    changed = [current_signature.get(key) != sig for key, sig in new_signature.items()]
+    df_updates = existing[pd.Series(changed, index=existing.index, dtype=bool)] if len(existing) else existing
+    return df_inserts, df_updates, df_deletes
+
+
 # --- 2. Classe Base Abstrata (agora mais simples) ---
 
 class DataBaseController(ABC):
+    # Nome físico de cada tabela lógica; sobrescrito por backend.
+    TABLES = {'empresas': 'empresas', 'anotacao': 'anotacao', 'valores_must': 'valores_must'}
+
     def __init__(self, db_path: Path, df_empresas, df_equipamentos, df_valores_must):
         self.db_path = db_path
         self.df_empresas = df_empresas
@@ -114,18 +205,105 @@ class DataBaseController(ABC):
     def _create_tables(self): pass
     @abstractmethod
     def _insert_data(self): pass
+    @abstractmethod
+    def _apply_changes(self, changes): pass
 
-    def load_data(self):
+    def load_data(self, incremental=False):
+        """
+        Carrega os DataFrames normalizados no banco.
+
+        Args:
+            incremental (bool): Se True, aplica apenas inserções/atualizações/exclusões em relação
+                ao conteúdo atual (preservando as aprovações). Se False, recarrega as tabelas inteiras.
+        """
         try:
             self.connect()
             self._create_tables()
-            self._insert_data()
+            if incremental:
+                self._upsert_data()
+            else:
+                self._insert_data()
+            self._after_load()
             print(f"\n✅ Entrada de dados para '{self.db_path.name}' concluída com sucesso!")
         except Exception as e:
             print(f"\n❌ ERRO GERAL para {self.db_path.name}: {e}")
         finally:
             self.close()
 
+    def _after_load(self):
+        """Gancho executado após a carga (ex.: materializar tabelas derivadas). Padrão: nada."""
+        pass
+
+    def _read_table(self, logical_name, columns):
+        """Lê as colunas indicadas de uma tabela do banco para um DataFrame."""
+        self.cursor.execute(f"SELECT {', '.join(columns)} FROM {self.TABLES[logical_name]}")
+        return pd.DataFrame.from_records([tuple(row) for row in self.cursor.fetchall()], columns=columns)
+
+    def _prepare_valores(self, df_valores):
+        """Ajusta os valores MUST ao formato gravado pelo backend (por padrão, sem alteração)."""
+        return df_valores
+
+    def _align_ids(self, df_empresas_atual, df_anotacao_atual):
+        """
+        Reaproveita os IDs já existentes no banco (pela chave natural) e gera novos IDs
+        a partir do maior existente, propagando-os para as chaves estrangeiras.
+        """
+        def resolve(existing_ids, keys):
+            existing = {_normalize_compare_value(k): int(v) for k, v in existing_ids}
+            next_id = max(existing.values(), default=0) + 1
+            resolved = []
+            for key in keys:
+                key = _normalize_compare_value(key)
+                if key not in existing:
+                    existing[key] = next_id
+                    next_id += 1
+                resolved.append(existing[key])
+            return resolved
+
+        df_empresas = self.df_empresas.copy()
+        empresa_ids = resolve(zip(df_empresas_atual['nome_empresa'], df_empresas_atual['id_empresa']), df_empresas['nome_empresa'])
+        empresa_id_map = dict(zip(df_empresas['id_empresa'], empresa_ids))
+        df_empresas['id_empresa'] = empresa_ids
+
+        df_anotacao = self.df_equipamentos.copy()
+        conexao_ids = resolve(zip(df_anotacao_atual['cod_ons'], df_anotacao_atual['id_conexao']), df_anotacao['cod_ons'])
+        conexao_id_map = dict(zip(df_anotacao['id_conexao'], conexao_ids))
+        df_anotacao['id_conexao'] = conexao_ids
+        df_anotacao['id_empresa'] = df_anotacao['id_empresa'].map(empresa_id_map)
+
+        df_valores = self.df_valores_must.copy()
+        df_valores['id_conexao'] = df_valores['id_conexao'].map(conexao_id_map)
+        return df_empresas, df_anotacao, self._prepare_valores(df_valores)
+
+    def _upsert_data(self):
+        print("5. Calculando diferenças para carga incremental...")
+        df_empresas_atual = self._read_table('empresas', ['id_empresa'] + EMPRESAS_KEY)
+        df_anotacao_atual = self._read_table('anotacao', ['id_conexao'] + ANOTACAO_KEY + ANOTACAO_DATA_COLUMNS)
+        df_valores_atual = self._read_table('valores_must', VALORES_KEY + VALORES_DATA_COLUMNS)
+
+        df_empresas, df_anotacao, df_valores = self._align_ids(df_empresas_atual, df_anotacao_atual)
+
+        changes = {
+            'empresas': diff_frames(df_empresas_atual, df_empresas, EMPRESAS_KEY, []),
+            'anotacao': diff_frames(df_anotacao_atual, df_anotacao, ANOTACAO_KEY, ANOTACAO_DATA_COLUMNS),
+            'valores_must': diff_frames(df_valores_atual, df_valores, VALORES_KEY, VALORES_DATA_COLUMNS),
+        }
+        for table, (df_ins, df_upd, df_del) in changes.items():
+            print(f"   -> {table}: {len(df_ins)} inserções, {len(df_upd)} atualizações, {len(df_del)} exclusões")
+
+        try:
+            self._apply_changes(changes)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _delete_keys(self, logical_name, key_cols, df_deletes):
+        if df_deletes.empty:
+            return
+        where = " AND ".join(f"{col} = ?" for col in key_cols)
+        self.cursor.executemany(f"DELETE FROM {self.TABLES[logical_name]} WHERE {where}", frame_to_rows(df_deletes, key_cols))
+
 # --- 3. Implementações Específicas (SQLite e Access) ---
 
 class SQLiteController(DataBaseController):
@@ -140,8 +318,13 @@ class SQLiteController(DataBaseController):
     def _create_tables(self):
         print("4. Criando tabelas (se não existirem)...")
         self.cursor.execute("CREATE TABLE IF NOT EXISTS empresas (id_empresa INTEGER PRIMARY KEY, nome_empresa TEXT NOT NULL UNIQUE)")
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS anotacao (id_conexao INTEGER PRIMARY KEY, cod_ons TEXT NOT NULL UNIQUE, tensao_kv INTEGER, ponto_de TEXT, ponto_ate TEXT, anotacao_geral TEXT, id_empresa_fk INTEGER, FOREIGN KEY (id_empresa_fk) REFERENCES empresas(id_empresa))")
-        self.cursor.execute("CREATE TABLE IF NOT EXISTS valores_must (id_valor INTEGER PRIMARY KEY, id_equipamento_fk INTEGER, ano INTEGER, periodo TEXT, valor REAL, FOREIGN KEY (id_equipamento_fk) REFERENCES equipamentos(id_conexao))")
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS anotacao (id_conexao INTEGER PRIMARY KEY, cod_ons TEXT NOT NULL UNIQUE, tensao_kv INTEGER, ponto_de TEXT, ponto_ate TEXT, anotacao_geral TEXT, id_empresa INTEGER, aprovado_por TEXT, data_aprovacao TEXT, FOREIGN KEY (id_empresa) REFERENCES empresas(id_empresa))")
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS valores_must (id_conexao INTEGER, ano INTEGER, periodo TEXT, valor TEXT, anotacao_valor TEXT, FOREIGN KEY (id_conexao) REFERENCES anotacao(id_conexao))")
+        # Índices únicos nas chaves naturais: exigidos pelo ON CONFLICT da carga incremental
+        # (as tabelas criadas pelo to_sql da carga completa não têm restrições).
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_empresas_nome ON empresas (nome_empresa)")
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_anotacao_cod_ons ON anotacao (cod_ons)")
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_valores_must_chave ON valores_must (id_conexao, ano, periodo)")
         self.conn.commit()
 
     def _insert_data(self):
@@ -151,6 +334,44 @@ class SQLiteController(DataBaseController):
         self.df_valores_must.to_sql('valores_must', self.conn, if_exists='replace', index=False)
         self.conn.commit()
 
+    def _after_load(self):
+        print("7. Materializando tabelas de resumo do dashboard...")
+        refresh_summary_tables(self.conn, self.TABLES['empresas'], self.TABLES['anotacao'], self.TABLES['valores_must'])
+        # Na carga incremental as triggers já mantêm o índice; na completa ele é recriado aqui
+        print("8. Atualizando índice de busca textual...")
+        ensure_search_index(self.conn, self.TABLES['anotacao'])
+        # Na carga completa as triggers somem com as tabelas: recriá-las grava o marcador de carga
+        print("9. Atualizando registro de alterações (dashboards abertos)...")
+        if ensure_change_log(self.conn, self.TABLES['anotacao'], self.TABLES['valores_must']):
+            prune_change_log(self.conn)
+
+    @staticmethod
+    def _upsert_sql(table, columns, conflict_cols, update_cols):
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT ({', '.join(conflict_cols)}) DO "
+        if not update_cols:
+            return sql + "NOTHING"
+        return sql + "UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in update_cols)
+
+    def _apply_changes(self, changes):
+        print("6. Aplicando alterações (INSERT ... ON CONFLICT DO UPDATE)...")
+        # Exclusões: filhos antes dos pais
+        self._delete_keys('valores_must', VALORES_KEY, changes['valores_must'][2])
+        self._delete_keys('anotacao', ANOTACAO_KEY, changes['anotacao'][2])
+        self._delete_keys('empresas', EMPRESAS_KEY, changes['empresas'][2])
+
+        # Upserts: pais antes dos filhos. aprovado_por/data_aprovacao nunca entram no SET.
+        upserts = [
+            ('empresas', ['id_empresa'] + EMPRESAS_KEY, EMPRESAS_KEY, []),
+            ('anotacao', ['id_conexao'] + ANOTACAO_KEY + ANOTACAO_DATA_COLUMNS, ANOTACAO_KEY, ANOTACAO_DATA_COLUMNS),
+            ('valores_must', VALORES_KEY + VALORES_DATA_COLUMNS, VALORES_KEY, VALORES_DATA_COLUMNS),
+        ]
+        for logical_name, columns, conflict_cols, update_cols in upserts:
+            df_ins, df_upd, _ = changes[logical_name]
+            rows = frame_to_rows(df_ins, columns) + frame_to_rows(df_upd, columns)
+            if rows:
+                self.cursor.executemany(self._upsert_sql(self.TABLES[logical_name], columns, conflict_cols, update_cols), rows)
+
     def list_tables(self):
         """Lista todas as tabelas no banco de dados SQLite."""
         if not self.conn:
@@ -171,9 +392,12 @@ class SQLiteController(DataBaseController):
 
 # --- 4. Implementação para MS Access (VERSÃO FINAL) ---
 class AccessController(DataBaseController):
+    TABLES = {'empresas': 'tb_empresas', 'anotacao': 'tb_anotacao', 'valores_must': 'tb_valores_must'}
+
     def connect(self):
         print("3. Conectando ao banco de dados MS Access...")
         if not self.db_path.exists(): raise FileNotFoundError(f"Arquivo Access não encontrado: {self.db_path}.")
+        import pyodbc # só necessário para o Access
         conn_str = (r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};" fr"DBQ={self.db_path};")
         self.conn = pyodbc.connect(conn_str)
         self.cursor = self.conn.cursor()
@@ -199,19 +423,19 @@ class AccessController(DataBaseController):
         return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
 
     def _create_tables(self):
-        print("4. Verificando e limpando tabelas no Access...")
+        print("4. Verificando tabelas no Access...")
         required_tables = ['tb_empresas', 'tb_anotacao', 'tb_valores_must']
         existing_tables = [table.table_name.lower() for table in self.cursor.tables(tableType='TABLE')]
         for table in required_tables:
             if table not in existing_tables: raise ValueError(f"Tabela '{table}' não encontrada no Access!")
-        
+
+    def _insert_data(self):
         print("   -> Limpando tabelas para nova carga (ordem reversa por causa dos relacionamentos)...")
         self.cursor.execute("DELETE FROM tb_valores_must")
         self.cursor.execute("DELETE FROM tb_anotacao")
         self.cursor.execute("DELETE FROM tb_empresas")
         self.conn.commit()
 
-    def _insert_data(self):
         print("5. Inserindo dados no Access...")
         
         # ETAPA 1: Inserir Empresas e mapear ID do pandas -> ID do Access
@@ -256,29 +480,11 @@ class AccessController(DataBaseController):
         
         valores_data = []
         for _, row in df_valores_to_insert.iterrows():
-            
-            # ===== CORREÇÃO DEFINITIVA ESTÁ AQUI =====
-            raw_valor = row['valor']
-            cleaned_valor = None # Valor padrão caso a conversão falhe
-
-            if pd.notna(raw_valor):
-                valor_str = str(raw_valor).strip()
-                if valor_str == '-':
-                    cleaned_valor = 0.0 # Trata o hífen como zero
-                else:
-                    try:
-                        # Tenta a conversão para formatos como "1.500,25"
-                        cleaned_valor = float(valor_str.replace('.', '').replace(',', '.'))
-                    except ValueError:
-                        # Se ainda assim falhar, é um texto inesperado. Mantém como Nulo.
-                        print(f"AVISO: Não foi possível converter o valor '{valor_str}' para número. Será inserido como Nulo.")
-                        cleaned_valor = None
-            
             params = (
                 int(row['id_conexao']),
                 int(row['ano']),
                 row['periodo'],
-                cleaned_valor, # Usa o valor limpo e seguro
+                clean_must_valor(row['valor']), # Usa o valor limpo e seguro
                 row['anotacao_valor']
             )
             valores_data.append(params)
@@ -286,6 +492,35 @@ class AccessController(DataBaseController):
         self.cursor.executemany(f"INSERT INTO tb_valores_must ({sql_cols_valores}) VALUES (?, ?, ?, ?, ?)", valores_data)
         self.conn.commit()
 
+    def _prepare_valores(self, df_valores):
+        # No Access o valor é gravado já convertido para número
+        df_valores = df_valores.copy()
+        df_valores['valor'] = df_valores['valor'].map(clean_must_valor)
+        return df_valores
+
+    def _apply_changes(self, changes):
+        # O Access não tem INSERT ... ON CONFLICT: aplica UPDATE e INSERT separados a partir do diff.
+        print("6. Aplicando alterações no Access (UPDATE/INSERT/DELETE)...")
+        self._delete_keys('valores_must', VALORES_KEY, changes['valores_must'][2])
+        self._delete_keys('anotacao', ANOTACAO_KEY, changes['anotacao'][2])
+        self._delete_keys('empresas', EMPRESAS_KEY, changes['empresas'][2])
+
+        tables = [
+            ('empresas', ['id_empresa'] + EMPRESAS_KEY, EMPRESAS_KEY, []),
+            ('anotacao', ['id_conexao'] + ANOTACAO_KEY + ANOTACAO_DATA_COLUMNS, ANOTACAO_KEY, ANOTACAO_DATA_COLUMNS),
+            ('valores_must', VALORES_KEY + VALORES_DATA_COLUMNS, VALORES_KEY, VALORES_DATA_COLUMNS),
+        ]
+        for logical_name, columns, key_cols, data_cols in tables:
+            table = self.TABLES[logical_name]
+            df_ins, df_upd, _ = changes[logical_name]
+            if data_cols and not df_upd.empty:
+                set_clause = ", ".join(f"{col} = ?" for col in data_cols)
+                where = " AND ".join(f"{col} = ?" for col in key_cols)
+                self.cursor.executemany(f"UPDATE {table} SET {set_clause} WHERE {where}", frame_to_rows(df_upd, data_cols + key_cols))
+            if not df_ins.empty:
+                placeholders = ", ".join("?" for _ in columns)
+                self.cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", frame_to_rows(df_ins, columns))
+
 # --- 5. Exemplo de Execução Refatorado ---
 
 if __name__ == '__main__':
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação dos resultados do ETL em segundo plano.
+
+As etapas de run.py devolvem seus DataFrames para quem as chamou (a GUI exibe na hora) e
+entregam as gravações de .xlsx/.json, lentas com openpyxl/xlsxwriter, a uma única thread
+de gravação: os arquivos são escritos na ordem em que foram pedidos, e um mesmo arquivo
+nunca é gravado por duas threads ao mesmo tempo. Um DataFrame entregue a submit_write()
+não pode ser alterado depois: quem ainda vai usá-lo entrega uma cópia.
+
+Quem vai ler esses arquivos (a etapa seguinte, o fechamento da janela) chama antes
+wait_for_pending_writes(). Os avisos de cada gravação ("💾 ... salvo") são impressos por
+quem espera, não pela thread de gravação, para caírem no log da tarefa.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+_pending = [] # (descrição, Future), na ordem de envio
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gravacao_etl")
+        return _executor
+
+
+def submit_write(description, function, *args, **kwargs):
+    """Agenda `function(*args, **kwargs)` na thread de gravação e retorna o Future."""
+    future = _get_executor().submit(function, *args, **kwargs)
+    with _lock:
+        _pending.append((description, future))
+    return future
+
+
+def has_pending_writes():
+    with _lock:
+        return any(not future.done() for _, future in _pending)
+
+
+def wait_for_pending_writes():
+    """
+    Espera as gravações agendadas e imprime o resultado de cada uma. Retorna a lista de
+    (descrição, erro) das que falharam.
+    """
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    failures = []
+    for description, future in pending:
+        try:
+            future.result()
+            print(f"💾 {description}")
+        except Exception as e:
+            print(f"❌ Erro ao gravar {description}: {e}")
+            failures.append((description, e))
+    return failures
@@ -1,23 +1,29 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 
+from services.background_writer import submit_write
+
 class ExcelExporter:
     """
     Classe responsável por exportar DataFrames para arquivos Excel.
     """
 
     @staticmethod
-    def export_to_excel(df: pd.DataFrame, output_path: str):
+    def export_to_excel(df: pd.DataFrame, output_path: str, background: bool = False):
         """
         Exporta um DataFrame para um arquivo Excel.
 
         Args:
             df (pd.DataFrame): DataFrame a ser exportado.
             output_path (str): Caminho do arquivo de saída.
+            background (bool): grava na thread de gravação (ver services/background_writer.py).
         """
         if df.empty:
             print("Nenhum dado para exportar.")
             return
+        if background:
+            submit_write(f"Planilha salva em: {output_path}", df.copy().to_excel, output_path, index=False, engine='xlsxwriter')
+            return
         try:
             df.to_excel(output_path, index=False, engine='xlsxwriter')
             print(f"💾 Planilha salva com sucesso em: {output_path}")
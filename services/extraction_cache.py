@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco do resultado da extração de cada PDF.
+
+A chave é o conteúdo do PDF (sha256), a etapa e os parâmetros (ex.: intervalo de páginas):
+um PDF copiado de novo para a pasta, com outra data, continua no cache; um PDF alterado ou
+lido com outro intervalo não. Ao mudar a lógica de extração, aumente CACHE_VERSION para
+descartar os resultados antigos.
+
+Formatos: 'parquet' (precisa do pyarrow ou do fastparquet; sem eles o cache usa pickle,
+com um aviso) e 'pickle'. Tabelas que o parquet não aceita (colunas de tipos misturados)
+são gravadas em pickle.
+"""
+import hashlib
+import importlib.util
+import os
+
+import pandas as pd
+
+CACHE_VERSION = 1
+
+CACHE_FORMATS = ('parquet', 'pickle')
+
+_EXTENSIONS = {'parquet': '.parquet', 'pickle': '.pkl'}
+
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Resultados (DataFrame) por etapa + PDF + parâmetros, numa pasta. Pode ser passado a outros processos."""
+
+    def __init__(self, cache_dir, fmt='parquet'):
+        if fmt not in CACHE_FORMATS:
+            raise ValueError(f"Formato de cache inválido: {fmt}. Use um de: {', '.join(CACHE_FORMATS)}")
+        if fmt == 'parquet' and not parquet_available():
+            print("AVISO: 'pyarrow' não está instalado. O cache será gravado em pickle.")
+            fmt = 'pickle'
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.fmt = fmt
+
+    def __repr__(self):
+        return f"ExtractionCache({self.cache_dir!r}, {self.fmt!r})"
+
+    def key(self, stage, pdf_path, params=()):
+        content = file_digest(pdf_path)
+        return hashlib.sha256(repr((CACHE_VERSION, stage, content, tuple(params))).encode('utf-8')).hexdigest()
+
+    def _path(self, stage, key, fmt):
+        return os.path.join(self.cache_dir, stage, key + _EXTENSIONS[fmt])
+
+    def get(self, stage, key):
+        """DataFrame guardado para a chave, ou None."""
+        for fmt in CACHE_FORMATS:
+            path = self._path(stage, key, fmt)
+            if not os.path.exists(path):
+                continue
+            try:
+                return pd.read_parquet(path) if fmt == 'parquet' else pd.read_pickle(path)
+            except Exception as e:
+                print(f"AVISO: Entrada do cache ilegível ({path}): {e}. Extraindo de novo.")
+        return None
+
+    def put(self, stage, key, df):
+        os.makedirs(os.path.join(self.cache_dir, stage), exist_ok=True)
+        if self.fmt == 'parquet':
+            path = self._path(stage, key, 'parquet')
+            try:
+                df.to_parquet(path + '.tmp', index=False)
+                os.replace(path + '.tmp', path)
+                return
+            except Exception: # tipos que o parquet não aceita: cai para pickle
+                if os.path.exists(path + '.tmp'):
+                    os.remove(path + '.tmp')
+        path = self._path(stage, key, 'pickle')
+        df.to_pickle(path + '.tmp')
+        os.replace(path + '.tmp', path)
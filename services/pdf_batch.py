@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Extração de vários PDFs com cache (services/extraction_cache.py) e em paralelo.
+
+extract_pdfs() chama `extract(pdf_path, *params, reporter=...)` para cada PDF e devolve os
+DataFrames na ordem dos PDFs. PDFs já extraídos com o mesmo conteúdo e parâmetros vêm do
+cache. Com jobs > 1 os PDFs restantes são distribuídos entre processos; nesse caso o
+progresso é informado por PDF concluído (sem o avanço por página/tabela) e o que os
+processos auxiliares imprimem vai para o console, não para o log da tarefa.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from services.progress import ProgressReporter
+
+
+def extract_pdfs(stage, extract, pdf_jobs, progress=None, jobs=1, cache=None):
+    """
+    `pdf_jobs`: lista de (nome, caminho do PDF, parâmetros). `extract` precisa ser uma função
+    de nível de módulo (é enviada aos processos auxiliares). Retorna {nome: DataFrame}, na
+    ordem de `pdf_jobs`; PDFs cuja extração falhou ficam de fora.
+    """
+    reporter = ProgressReporter(progress, stage, len(pdf_jobs))
+    results = {}
+    keys = {}
+    pending = []
+    completed = 0
+    for name, pdf_path, params in pdf_jobs:
+        if cache is not None:
+            keys[name] = cache.key(stage, pdf_path, params)
+            df = cache.get(stage, keys[name])
+            if df is not None:
+                reporter.start_item(completed, name)
+                print(f"♻️ {name}: resultado em cache ({len(df)} linhas)")
+                results[name] = df
+                reporter.add_rows(len(df))
+                reporter.finish_item()
+                completed += 1
+                continue
+        pending.append((name, pdf_path, params))
+
+    def store(name, df):
+        results[name] = df
+        reporter.add_rows(len(df))
+        if cache is not None and not df.empty:
+            cache.put(stage, keys[name], df)
+
+    if jobs <= 1 or len(pending) <= 1:
+        for name, pdf_path, params in pending:
+            reporter.start_item(completed, name)
+            store(name, extract(pdf_path, *params, reporter=reporter))
+            reporter.finish_item()
+            completed += 1
+    else:
+        # spawn também no Linux: o processo da etapa pode ter threads (gravação em segundo plano)
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(pending)), mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = {pool.submit(extract, pdf_path, *params): name for name, pdf_path, params in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                reporter.start_item(completed, name)
+                try:
+                    store(name, future.result())
+                    print(f"✅ {name}: {len(results[name])} linhas extraídas")
+                except Exception as e:
+                    print(f"❌ Erro ao extrair {name}: {e}")
+                reporter.finish_item()
+                completed += 1
+        except BaseException:
+            # Cancelamento: não espera os PDFs em andamento nos processos auxiliares
+            for process in list(getattr(pool, '_processes', {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+    reporter.done()
+    return {name: results[name] for name, _, _ in pdf_jobs if name in results}
@@ -12,10 +12,13 @@ class PDFProcessor:
             raise FileNotFoundError(f"O arquivo não foi encontrado: {pdf_path}")
         self.pdf_path = pdf_path
 
-    def extract_text(self) -> str:
+    def extract_text(self, reporter=None) -> str:
         """
         Extrai o texto bruto de um arquivo PDF.
 
+        Args:
+            reporter (ProgressReporter, opcional): recebe o avanço página a página.
+
         Returns:
             str: Texto extraído do PDF.
         """
@@ -23,10 +26,13 @@ class PDFProcessor:
         text = ""
         try:
             reader = PdfReader(self.pdf_path)
-            for page in reader.pages:
+            total_pages = len(reader.pages)
+            for page_number, page in enumerate(reader.pages, start=1):
                 extracted = page.extract_text()
                 if extracted:
                     text += extracted + "\n"
+                if reporter is not None:
+                    reporter.step(page_number, total_pages, 'página')
             print("✅ Texto extraído com sucesso.")
             return text
         except Exception as e:
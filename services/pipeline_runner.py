@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Execução das etapas do ETL como um grafo de dependências, no estilo do make.
+
+Cada Stage declara a função que a executa, os arquivos que lê (`inputs`, aceita padrões
+glob), os arquivos que sempre grava (`outputs`), os que grava só quando há dados
+(`optional_outputs`: um PDF sem anotações não gera planilha) e de quais etapas depende.
+Uma etapa que termina sem alguma das `outputs` falhou. Pipeline.plan() decide o que
+precisa rodar:
+
+  - uma etapa está em dia quando todas as `outputs` existem, as saídas geradas são mais
+    novas que todas as entradas (sem nenhuma saída gerada, vale o início da última
+    execução registrada) e os parâmetros (`signature`) são os mesmos dessa execução;
+  - uma etapa cuja dependência vai rodar também roda;
+  - from_stage/to_stage recortam a sequência de etapas; as etapas a partir de from_stage
+    rodam mesmo em dia (como um "refazer a partir daqui"). Etapas fora do recorte não
+    rodam e suas saídas atuais são usadas como estão.
+
+As execuções bem-sucedidas (parâmetros, instante e duração) ficam no arquivo de estado
+(`state_path`). Pipeline.run() executa o plano com a fila de tarefas (services/task_scheduler.py),
+cada etapa num processo (services/task_process.py); a GUI usa plan()/record() com a sua
+própria fila e os seus Workers.
+"""
+import glob
+import json
+import os
+import time
+
+from services.task_process import start_task_process
+from services.task_scheduler import TaskScheduler, FAILED, CANCELLED
+
+# Situação de cada etapa no relatório de execução
+RAN = 'executada'
+UP_TO_DATE = 'em dia'
+OUT_OF_RANGE = 'fora da seleção'
+NOT_RUN = 'não executada'
+
+# Tempo máximo tratando as mensagens de uma etapa antes de passar às outras (uma etapa
+# que imprime sem parar não pode travar as demais, a fila e o cancelamento)
+DRAIN_SLICE_S = 0.1
+
+
+class Stage:
+    """Uma etapa do pipeline: função, argumentos, arquivos de entrada/saída e dependências (nomes)."""
+
+    def __init__(self, name, function, args=(), kwargs=None, inputs=(), outputs=(), depends_on=(),
+                 signature=None, options=None, optional_outputs=()):
+        self.name = name
+        self.function = function
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        # Argumentos que não mudam o resultado (paralelismo, cache): ficam fora da assinatura
+        self.options = options or {}
+        self.inputs = [str(path) for path in inputs]
+        self.outputs = [str(path) for path in outputs]
+        self.optional_outputs = [str(path) for path in optional_outputs]
+        self.depends_on = tuple(depends_on)
+        # O que, além dos arquivos, muda o resultado (PDFs selecionados, intervalos de páginas...)
+        if signature is None:
+            signature = repr((getattr(function, '__name__', str(function)), self.args, sorted(self.kwargs.items())))
+        self.signature = signature
+
+    @property
+    def call_kwargs(self):
+        return {**self.kwargs, **self.options}
+
+    def missing_outputs(self):
+        """Saídas obrigatórias (`outputs`) que não existem; as opcionais não entram."""
+        return [path for path in self.outputs if not os.path.exists(path)]
+
+    def existing_outputs(self):
+        return [path for path in self.outputs + self.optional_outputs if os.path.exists(path)]
+
+    def expanded_inputs(self):
+        """Arquivos de entrada, com os padrões glob expandidos. Padrões sem correspondência ficam como estão."""
+        paths = []
+        for pattern in self.inputs:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+            paths.extend(matches or [pattern])
+        return paths
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, depende de {list(self.depends_on)})"
+
+
+class StageRun:
+    """Decisão do plano e resultado de uma etapa numa execução."""
+
+    def __init__(self, stage, status, reason=""):
+        self.stage = stage
+        self.status = status # RAN, UP_TO_DATE, OUT_OF_RANGE, NOT_RUN, FAILED ou CANCELLED
+        self.reason = reason
+        self.seconds = None
+        self.error = None
+
+    @property
+    def will_run(self):
+        return self.status == NOT_RUN
+
+    def to_dict(self):
+        return {
+            'stage': self.stage.name,
+            'status': self.status,
+            'reason': self.reason,
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'error': self.error,
+        }
+
+
+class PipelineReport:
+    """Resultado de Pipeline.run(): situação e tempo de cada etapa; `results` guarda o que cada uma devolveu."""
+
+    def __init__(self, runs):
+        self.runs = runs # StageRun, na ordem das etapas
+        self.results = {}
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def ok(self):
+        return all(run.status in (RAN, UP_TO_DATE, OUT_OF_RANGE) for run in self.runs)
+
+    def to_dict(self):
+        finished_at = self.finished_at or time.time()
+        return {
+            'ok': self.ok,
+            'started_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            'finished_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(finished_at)),
+            'seconds': round(finished_at - self.started_at, 3),
+            'stages': [run.to_dict() for run in self.runs],
+        }
+
+    def summary(self):
+        """Uma linha por etapa: situação, tempo e motivo."""
+        lines = []
+        for run in self.runs:
+            duration = f" em {run.seconds:.1f}s" if run.seconds is not None else ""
+            reason = f" ({run.reason})" if run.reason else ""
+            lines.append(f"  {run.stage.name}: {run.status}{duration}{reason}")
+        return "\n".join(lines)
+
+
+class Pipeline:
+    """Etapas em ordem de execução (cada uma depois das suas dependências)."""
+
+    def __init__(self, stages, state_path=None):
+        self.stages = list(stages)
+        self.state_path = str(state_path) if state_path else None
+        names = [stage.name for stage in self.stages]
+        for index, stage in enumerate(self.stages):
+            unknown = [d for d in stage.depends_on if d not in names[:index]]
+            if unknown:
+                raise ValueError(f"Etapa '{stage.name}' depende de etapas desconhecidas ou posteriores: {unknown}")
+
+    def stage(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f"Etapa desconhecida: {name}. Etapas: {', '.join(s.name for s in self.stages)}")
+
+    # --- Estado das execuções anteriores ---
+
+    def load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"AVISO: Estado do pipeline ilegível ({self.state_path}): {e}. Ignorando.")
+            return {}
+
+    def record(self, stage_name, seconds):
+        """Registra uma execução bem-sucedida da etapa (parâmetros e duração) no arquivo de estado."""
+        if not self.state_path:
+            return
+        state = self.load_state()
+        state[stage_name] = {
+            'signature': self.stage(stage_name).signature,
+            'finished_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'started_ts': time.time() - seconds, # referência de is_up_to_date quando a etapa não gerou saídas
+            'seconds': round(seconds, 3),
+        }
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+
+    # --- Planejamento ---
+
+    def is_up_to_date(self, stage, state=None):
+        """(em_dia, motivo) pelo critério do make: saídas existentes e mais novas que as entradas."""
+        if not stage.outputs and not stage.optional_outputs:
+            return False, "etapa sem saídas declaradas"
+        recorded = (state if state is not None else self.load_state()).get(stage.name)
+        missing = stage.missing_outputs()
+        if missing:
+            return False, f"saída ausente: {os.path.basename(missing[0])}"
+        inputs = stage.expanded_inputs()
+        missing = [path for path in inputs if not os.path.exists(path)]
+        if missing:
+            return False, f"entrada ausente: {os.path.basename(missing[0])}"
+        stamps = [(os.path.basename(path), os.path.getmtime(path)) for path in stage.existing_outputs()]
+        if not stamps:
+            # Só saídas opcionais, nenhuma gerada (ex.: PDFs sem anotações): vale a última execução
+            if recorded is None or 'started_ts' not in recorded:
+                return False, "nenhuma execução registrada"
+            stamps = [("a última execução", recorded['started_ts'])]
+        oldest_name, oldest_time = min(stamps, key=lambda stamp: stamp[1])
+        newest_input = max(inputs, key=os.path.getmtime) if inputs else None
+        if newest_input is not None and os.path.getmtime(newest_input) > oldest_time:
+            return False, f"{os.path.basename(newest_input)} mais novo que {oldest_name}"
+        if recorded is not None and recorded.get('signature') != stage.signature:
+            return False, "parâmetros mudaram desde a última execução"
+        return True, "saídas mais novas que as entradas"
+
+    def plan(self, from_stage=None, to_stage=None, force=False, scheduled=()):
+        """
+        StageRun de cada etapa, na ordem; `will_run` indica as que precisam rodar.
+        `scheduled`: etapas que já estão na fila de quem chama (contam como "vai rodar").
+        """
+        names = [stage.name for stage in self.stages]
+        start = names.index(self.stage(from_stage).name) if from_stage else 0
+        end = names.index(self.stage(to_stage).name) if to_stage else len(names) - 1
+        if start > end:
+            raise ValueError(f"A etapa inicial '{from_stage}' vem depois da final '{to_stage}'.")
+        state = self.load_state()
+        runs = []
+        running = set()
+        for index, stage in enumerate(self.stages):
+            if not start <= index <= end:
+                runs.append(StageRun(stage, OUT_OF_RANGE))
+                continue
+            if stage.name in scheduled:
+                reason = "já está na fila"
+            elif force:
+                reason = "execução forçada"
+            elif from_stage:
+                reason = f"a partir de '{from_stage}'"
+            else:
+                upstream = [d for d in stage.depends_on if d in running]
+                if upstream:
+                    reason = f"dependência '{upstream[0]}' será executada"
+                else:
+                    up_to_date, reason = self.is_up_to_date(stage, state)
+                    if up_to_date:
+                        runs.append(StageRun(stage, UP_TO_DATE, reason))
+                        continue
+            runs.append(StageRun(stage, NOT_RUN, reason))
+            running.add(stage.name)
+        return runs
+
+    # --- Execução sem interface ---
+
+    def run(self, from_stage=None, to_stage=None, force=False, jobs=1, on_log=print, on_progress=None):
+        """
+        Executa o plano: até `jobs` etapas independentes ao mesmo tempo, cada uma num processo.
+        As linhas impressas pelas etapas vão para `on_log` prefixadas com o nome da etapa;
+        `on_progress(nome, ProgressEvent)` recebe o progresso. Retorna um PipelineReport.
+        """
+        report = PipelineReport(self.plan(from_stage, to_stage, force))
+        by_name = {run.stage.name: run for run in report.runs}
+        for run in report.runs:
+            if not run.will_run:
+                on_log(f"⏭️ {run.stage.name}: {run.status} ({run.reason})" if run.reason else f"⏭️ {run.stage.name}: {run.status}")
+
+        scheduler = TaskScheduler(max_parallel=max(1, jobs))
+        tasks = {}
+        for run in report.runs:
+            if run.will_run:
+                dependencies = [tasks[d] for d in run.stage.depends_on if d in tasks]
+                tasks[run.stage.name] = scheduler.add(run.stage.name, dependencies, run)
+        processes = {} # nome da etapa -> TaskProcess
+        try:
+            while not scheduler.is_idle():
+                for task in scheduler.ready():
+                    stage = task.payload.stage
+                    scheduler.mark_running(task)
+                    on_log(f"▶️ {stage.name}: iniciando ({task.payload.reason})")
+                    processes[stage.name] = start_task_process(stage.function, *stage.args, **stage.call_kwargs)
+                for name, process in list(processes.items()):
+                    self._drain_process(name, process, tasks[name], scheduler, report, on_log, on_progress,
+                                        timeout=0.05 if len(processes) > 1 else 0.1)
+                    if not tasks[name].is_active:
+                        del processes[name]
+        except KeyboardInterrupt:
+            on_log("⏹️ Interrompido: cancelando as etapas em execução...")
+            for process in processes.values():
+                process.cancel()
+            for name, process in processes.items():
+                while tasks[name].is_active:
+                    self._drain_process(name, process, tasks[name], scheduler, report, on_log, on_progress)
+            for task in scheduler.tasks():
+                if task.is_active:
+                    scheduler.mark_cancelled(task, "execução interrompida")
+        for task in scheduler.tasks():
+            run = by_name[task.name]
+            if task.state in (FAILED, CANCELLED):
+                run.status = task.state
+                run.error = run.error or task.error
+        report.finished_at = time.time()
+        return report
+
+    def _drain_process(self, name, process, task, scheduler, report, on_log, on_progress, timeout=0.1):
+        """
+        Trata as mensagens disponíveis de uma etapa, por no máximo DRAIN_SLICE_S; ao receber a
+        mensagem final, atualiza a fila e o relatório.
+        """
+        slice_end = time.monotonic() + timeout + DRAIN_SLICE_S
+        message = process.poll(timeout)
+        while message is not None:
+            kind, payload = message
+            if kind == 'log':
+                on_log(f"[{name}] {payload}" if payload else payload)
+            elif kind == 'progress':
+                if on_progress is not None:
+                    on_progress(name, payload)
+            elif kind == 'result':
+                report.results[name] = payload
+            else:
+                run = task.payload
+                run.seconds = task.elapsed
+                # As etapas registram seus erros no log e retornam: sem as saídas obrigatórias, a etapa falhou
+                missing = run.stage.missing_outputs() if kind == 'done' else []
+                if missing:
+                    kind, payload = 'error', f"❌ {name}: saída não gerada: {missing[0]}"
+                if kind == 'done':
+                    scheduler.mark_done(task)
+                    run.status = RAN
+                    self.record(name, run.seconds)
+                    on_log(f"✅ {name}: concluída em {run.seconds:.1f}s")
+                else:
+                    if kind == 'cancelled':
+                        cancelled = scheduler.mark_cancelled(task, "cancelada")
+                    else:
+                        run.error = payload
+                        cancelled = scheduler.mark_failed(task, payload)
+                        on_log(payload)
+                    on_log(f"❌ {name}: {task.state}")
+                    for other in cancelled:
+                        on_log(f"⏹️ {other.name}: {other.error}")
+                return
+            if time.monotonic() >= slice_end:
+                return
+            message = process.poll(0)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Protocolo de progresso das etapas do ETL (run.py).
+
+As funções de etapa aceitam `progress=None`: um chamável que recebe um ProgressEvent a
+cada avanço (PDF i de N, páginas/tabelas do PDF atual, linhas extraídas até agora). As
+etapas usam um ProgressReporter para montar os eventos; sem `progress` ele não faz nada
+e o comportamento das etapas não muda.
+
+O mesmo callback serve para interromper a etapa: quem executa a tarefa levanta
+TaskCancelled dentro dele e a etapa para no próximo aviso de progresso.
+"""
+import time
+
+
+class TaskCancelled(BaseException):
+    """
+    Cancelamento pedido pelo usuário, levantado pelo callback de progresso. Deriva de
+    BaseException, como KeyboardInterrupt, para não ser engolido pelos `except Exception`
+    das etapas (que tratam um PDF com erro e seguem para o próximo).
+    """
+
+
+class ProgressEvent:
+    """
+    Estado de uma etapa num instante.
+
+    `current` é o índice (0..total) do PDF em andamento, ou seja, quantos já terminaram;
+    `step_done`/`step_total` contam as unidades (`step_unit`: 'página', 'tabela') do PDF
+    atual; `rows` é o total de linhas extraídas na etapa até agora.
+    """
+    __slots__ = ('stage', 'current', 'total', 'item', 'step_done', 'step_total', 'step_unit', 'rows', 'message')
+
+    def __init__(self, stage, current, total, item=None, step_done=0, step_total=0, step_unit='',
+                 rows=0, message=None):
+        self.stage = stage
+        self.current = current
+        self.total = total
+        self.item = item
+        self.step_done = step_done
+        self.step_total = step_total
+        self.step_unit = step_unit
+        self.rows = rows
+        self.message = message
+
+    @property
+    def fraction(self):
+        """Fração concluída da etapa (0 a 1), contando a parte já feita do PDF atual."""
+        if not self.total:
+            return 0.0
+        partial = self.step_done / self.step_total if self.step_total else 0.0
+        return min((self.current + partial) / self.total, 1.0)
+
+    @property
+    def finished(self):
+        return self.total > 0 and self.current >= self.total
+
+    def __repr__(self):
+        return (f"ProgressEvent({self.stage!r}, {self.current}/{self.total}, item={self.item!r}, "
+                f"{self.step_unit or 'passo'} {self.step_done}/{self.step_total}, rows={self.rows})")
+
+
+class ProgressReporter:
+    """Monta e envia os ProgressEvent de uma etapa com `total` itens (PDFs)."""
+
+    def __init__(self, callback, stage, total):
+        self.callback = callback
+        self.stage = stage
+        self.total = total
+        self.current = 0
+        self.item = None
+        self.step_done = 0
+        self.step_total = 0
+        self.step_unit = ''
+        self.rows = 0
+
+    def start_item(self, index, item):
+        """Começa o item `index` (0-based): o PDF atual passa a ser `item`."""
+        self.current, self.item = index, item
+        self.step_done, self.step_total, self.step_unit = 0, 0, ''
+        self._emit(f"Processando {item} ({index + 1} de {self.total})")
+
+    def step(self, done, total, unit):
+        """Avanço dentro do item atual: `done` de `total` páginas/tabelas."""
+        self.step_done, self.step_total, self.step_unit = done, total, unit
+        self._emit()
+
+    def add_rows(self, count):
+        self.rows += count
+        self._emit()
+
+    def finish_item(self):
+        self.current += 1
+        self.step_done, self.step_total, self.step_unit = 0, 0, ''
+        self._emit()
+
+    def done(self, message=None):
+        self.current = self.total
+        self._emit(message)
+
+    def _emit(self, message=None):
+        if self.callback is None:
+            return
+        self.callback(ProgressEvent(self.stage, self.current, self.total, self.item, self.step_done,
+                                    self.step_total, self.step_unit, self.rows, message))
+
+
+class EtaEstimator:
+    """
+    Tempo restante a partir da vazão observada (fração concluída por segundo desde o início).
+
+    Só estima depois de MIN_ELAPSED_S e de algum avanço, para não extrapolar os primeiros
+    instantes (abertura do PDF, importações).
+    """
+    MIN_ELAPSED_S = 2.0
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._start = clock()
+
+    def restart(self):
+        self._start = self._clock()
+
+    def elapsed(self):
+        return self._clock() - self._start
+
+    def remaining(self, fraction):
+        """Segundos restantes estimados, ou None se ainda não há base para estimar."""
+        elapsed = self.elapsed()
+        if fraction <= 0 or elapsed < self.MIN_ELAPSED_S:
+            return None
+        if fraction >= 1:
+            return 0.0
+        rate = fraction / elapsed
+        return (1 - fraction) / rate
+
+
+def format_duration(seconds):
+    """'1h 02min', '3min 05s' ou '12s'."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}min"
+    if minutes:
+        return f"{minutes}min {secs:02d}s"
+    return f"{secs}s"
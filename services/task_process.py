@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Execução de uma etapa do ETL (run.py) num processo separado.
+
+Processos em vez de threads: as extrações são CPU-bound em Python (pdfminer, PyPDF2) e,
+em threads, o GIL faria "tabelas" e "texto" se revezarem em vez de rodar juntas. Além
+disso um processo pode ser encerrado de fato quando a tarefa é cancelada.
+
+start_task_process() inicia o processo e devolve um TaskProcess; o processo envia pela
+fila `events` tuplas (tipo, dado), sempre nesta ordem:
+  ('log', linha)                       cada linha impressa pela etapa
+  ('progress', ProgressEvent)          no máximo a cada PROGRESS_INTERVAL_S
+  ('result', objeto)                   o valor devolvido pela etapa, se não for None
+  ('done' | 'cancelled' | 'error', detalhe)   fim da execução, sempre a última mensagem
+
+O cancelamento é cooperativo primeiro: o callback de progresso da etapa levanta
+TaskCancelled no próximo aviso (próxima página/tabela/PDF) e a etapa termina as gravações
+pendentes antes de sair. Etapas sem progresso, ou presas numa única chamada longa (camelot
+numa página pesada), são encerradas após CANCEL_GRACE_S.
+"""
+import inspect
+import io
+import multiprocessing
+import queue
+import sys
+import time
+import traceback
+
+from services.background_writer import has_pending_writes, wait_for_pending_writes
+from services.progress import TaskCancelled
+
+# Intervalo mínimo entre dois avisos de progresso enviados ao processo principal
+PROGRESS_INTERVAL_S = 0.1
+
+# Tempo que uma etapa cancelada tem para parar sozinha antes de o processo ser encerrado
+CANCEL_GRACE_S = 5.0
+
+
+class LineStream(io.TextIOBase):
+    """Stream de texto que entrega cada linha completa a `emit` assim que ela é escrita."""
+
+    def __init__(self, emit):
+        super().__init__()
+        self._emit = emit
+        self._partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not text:
+            return 0
+        lines = (self._partial + text).split("\n")
+        # Barras de progresso reescrevem a linha com \r: vale só o último trecho
+        self._partial = lines.pop().rsplit("\r", 1)[-1]
+        for line in lines:
+            self._emit(line.rstrip("\r").rsplit("\r", 1)[-1])
+        return len(text)
+
+    def close(self):
+        if self._partial:
+            self._emit(self._partial)
+            self._partial = ""
+        super().close()
+
+
+def _run_in_child(events, cancel_event, function, args, kwargs):
+    """Ponto de entrada do processo filho."""
+    stream = LineStream(lambda line: events.put(('log', line)))
+    sys.stdout = stream
+    last_emit = [0.0, None] # instante e item do último aviso enviado
+
+    def report_progress(event):
+        if cancel_event.is_set():
+            raise TaskCancelled()
+        now = time.monotonic()
+        if event.item != last_emit[1] or event.finished or now - last_emit[0] >= PROGRESS_INTERVAL_S:
+            last_emit[:] = [now, event.item]
+            events.put(('progress', event))
+
+    kwargs = dict(kwargs)
+    # Etapas com o protocolo de progresso (services/progress.py) recebem o callback
+    if 'progress' in inspect.signature(function).parameters:
+        kwargs.setdefault('progress', report_progress)
+    try:
+        print(f"▶️ Executando a função: {function.__name__}\n")
+        result = function(*args, **kwargs)
+        if result is not None:
+            events.put(('result', result))
+        # A tarefa só termina quando as planilhas que ela mandou gravar estão no disco
+        if has_pending_writes():
+            print("💾 Gravando arquivos em segundo plano...")
+        wait_for_pending_writes()
+        outcome = ('done', None)
+    except TaskCancelled:
+        wait_for_pending_writes()
+        print("⏹️ Etapa interrompida.")
+        outcome = ('cancelled', None)
+    except Exception as e:
+        wait_for_pending_writes()
+        outcome = ('error', f"❌ Erro na execução da tarefa: {e}\n{traceback.format_exc()}")
+    stream.close()
+    events.put(outcome)
+
+
+class TaskProcess:
+    """Processo de uma etapa em andamento. Use poll() para receber as mensagens."""
+
+    def __init__(self, function, args=(), kwargs=None):
+        # spawn também no Linux: fork de um processo com Qt e threads não é seguro
+        context = multiprocessing.get_context("spawn")
+        self.events = context.Queue()
+        self._cancel_event = context.Event()
+        self._cancel_deadline = None
+        self._finished = False
+        # Não daemon: a etapa pode abrir seus próprios processos (leitura de PDFs em paralelo)
+        self.process = context.Process(
+            target=_run_in_child, args=(self.events, self._cancel_event, function, tuple(args), kwargs or {}),
+            name=f"etapa_{function.__name__}")
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def cancel(self):
+        """Pede que a etapa pare; se não parar em CANCEL_GRACE_S, poll() encerra o processo."""
+        if self._cancel_deadline is None:
+            self._cancel_event.set()
+            self._cancel_deadline = time.monotonic() + CANCEL_GRACE_S
+
+    def poll(self, timeout=0.1):
+        """
+        Próxima mensagem (tipo, dado), ou None se nada chegou em `timeout`. Quando o processo
+        morre sem mensagem final, ou é encerrado por não atender ao cancelamento, devolve a
+        mensagem final correspondente ('error' ou 'cancelled').
+        """
+        if self._finished:
+            return None
+        # Antes de ler a fila: uma etapa cancelada que continua imprimindo também é encerrada
+        if self._cancel_deadline is not None and time.monotonic() > self._cancel_deadline:
+            self.process.terminate()
+            return self._final(('cancelled', None))
+        try:
+            message = self.events.get(timeout=timeout)
+        except queue.Empty:
+            if not self.process.is_alive():
+                # A fila é esvaziada antes de o filho sair; pode ainda haver mensagens em trânsito
+                try:
+                    message = self.events.get(timeout=0.5)
+                except queue.Empty:
+                    return self._final(('error', f"❌ O processo da tarefa terminou inesperadamente (código {self.process.exitcode})."))
+            else:
+                return None
+        if message[0] in ('done', 'cancelled', 'error'):
+            return self._final(message)
+        return message
+
+    def _final(self, message):
+        self._finished = True
+        self.process.join(timeout=5)
+        return message
+
+
+def start_task_process(function, *args, **kwargs):
+    """Executa `function(*args, **kwargs)` num processo novo. `function` precisa ser importável (nível de módulo)."""
+    return TaskProcess(function, args, kwargs).start()
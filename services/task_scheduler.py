@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Fila de tarefas com dependências entre as etapas do ETL.
+
+Cada tarefa declara de quais outras tarefas da fila depende. O agendador libera uma
+tarefa quando todas as dependências terminaram com sucesso, e libera juntas as que não
+dependem umas das outras (até `max_parallel`): "tabelas" e "texto" rodam ao mesmo tempo e
+"consolidar" começa quando as duas acabam.
+
+Quem executa (threads, processos) fica de fora: o dono da fila pergunta ready(), marca
+cada tarefa iniciada com mark_running() e informa o fim com mark_done(), mark_failed() ou
+mark_cancelled(). Uma tarefa que falha ou é cancelada cancela as que dependem dela.
+"""
+import itertools
+import threading
+import time
+
+PENDING = 'pendente'
+RUNNING = 'executando'
+DONE = 'concluída'
+FAILED = 'falhou'
+CANCELLED = 'cancelada'
+
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+
+class ScheduledTask:
+    """Uma tarefa da fila. `payload` é o que o dono da fila precisa para executá-la."""
+
+    def __init__(self, task_id, name, depends_on=(), payload=None):
+        self.id = task_id
+        self.name = name
+        self.depends_on = tuple(depends_on) # ids de outras tarefas da fila
+        self.payload = payload
+        self.state = PENDING
+        self.cancel_requested = False
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def is_active(self):
+        return self.state in (PENDING, RUNNING)
+
+    @property
+    def elapsed(self):
+        """Segundos em execução (até agora, se ainda roda), ou None se não começou."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def __repr__(self):
+        return f"ScheduledTask({self.id}, {self.name!r}, {self.state}, depende de {list(self.depends_on)})"
+
+
+class TaskScheduler:
+    """Estado da fila (thread-safe). Não executa nada: ver a docstring do módulo."""
+
+    def __init__(self, max_parallel=2):
+        self.max_parallel = max_parallel
+        self._tasks = {} # id -> ScheduledTask, na ordem de inclusão
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, name, depends_on=(), payload=None):
+        """Inclui a tarefa. `depends_on` aceita ScheduledTask ou ids; dependências já concluídas são ignoradas."""
+        with self._lock:
+            dependency_ids = []
+            for dependency in depends_on:
+                dependency_id = dependency.id if isinstance(dependency, ScheduledTask) else dependency
+                if dependency_id not in self._tasks:
+                    raise KeyError(f"Dependência desconhecida: {dependency_id}")
+                if self._tasks[dependency_id].state != DONE:
+                    dependency_ids.append(dependency_id)
+            task = ScheduledTask(next(self._ids), name, dependency_ids, payload)
+            self._tasks[task.id] = task
+            blocked_by = [self._tasks[i] for i in dependency_ids if self._tasks[i].state in (FAILED, CANCELLED)]
+        if blocked_by:
+            self.mark_cancelled(task, f"dependência '{blocked_by[0].name}' {blocked_by[0].state}")
+        return task
+
+    def get(self, task_id):
+        return self._tasks.get(task_id)
+
+    def active(self, name):
+        """Tarefa pendente ou em execução com esse nome, ou None."""
+        with self._lock:
+            return next((t for t in self._tasks.values() if t.name == name and t.is_active), None)
+
+    def tasks(self):
+        with self._lock:
+            return list(self._tasks.values())
+
+    def running(self):
+        with self._lock:
+            return [t for t in self._tasks.values() if t.state == RUNNING]
+
+    def is_idle(self):
+        with self._lock:
+            return not any(t.is_active for t in self._tasks.values())
+
+    def ready(self):
+        """Tarefas pendentes com todas as dependências concluídas, dentro do limite de paralelismo."""
+        with self._lock:
+            slots = self.max_parallel - sum(1 for t in self._tasks.values() if t.state == RUNNING)
+            ready = []
+            for task in self._tasks.values():
+                if slots <= 0:
+                    break
+                if task.state == PENDING and all(self._tasks[i].state == DONE for i in task.depends_on):
+                    ready.append(task)
+                    slots -= 1
+            return ready
+
+    def mark_running(self, task):
+        with self._lock:
+            task.state = RUNNING
+            task.started_at = time.monotonic()
+
+    def mark_done(self, task):
+        self._finish(task, DONE)
+        return []
+
+    def mark_failed(self, task, error=None):
+        """Marca a falha e cancela as dependentes. Retorna as tarefas canceladas por causa dela."""
+        return self._finish(task, FAILED, error)
+
+    def mark_cancelled(self, task, reason=None):
+        """Marca a tarefa (pendente ou já interrompida) como cancelada e cancela as dependentes."""
+        return self._finish(task, CANCELLED, reason)
+
+    def request_cancel(self, task):
+        """
+        Pede o cancelamento. Tarefas pendentes são canceladas na hora (junto com as
+        dependentes, todas devolvidas na lista); para uma tarefa em execução só fica
+        registrado o pedido, e o dono da fila a interrompe e chama mark_cancelled().
+        """
+        with self._lock:
+            if task.state != PENDING:
+                task.cancel_requested = task.state == RUNNING
+                return []
+        return [task] + self.mark_cancelled(task, "cancelada pelo usuário")
+
+    def clear_finished(self):
+        """Remove da fila as tarefas terminadas das quais nenhuma tarefa ativa depende."""
+        with self._lock:
+            needed = {i for t in self._tasks.values() if t.is_active for i in t.depends_on}
+            for task_id in [i for i, t in self._tasks.items() if t.state in FINAL_STATES and i not in needed]:
+                del self._tasks[task_id]
+
+    def _finish(self, task, state, error=None):
+        with self._lock:
+            task.state = state
+            task.error = error
+            task.finished_at = time.monotonic()
+            if state == DONE:
+                return []
+            # Dependentes (diretas e indiretas) que ainda não começaram não têm como rodar
+            cancelled = []
+            blocked = {task.id}
+            for other in self._tasks.values():
+                if other.state == PENDING and blocked.intersection(other.depends_on):
+                    other.state = CANCELLED
+                    other.error = f"dependência '{task.name}' {state}"
+                    other.finished_at = task.finished_at
+                    blocked.add(other.id)
+                    cancelled.append(other)
+            return cancelled
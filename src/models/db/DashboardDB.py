@@ -1,16 +1,31 @@
 import sqlite3
-import pyodbc
+import sys
+import threading
+import time
 
 from pathlib import Path
 from datetime import datetime
 
+from src.models.db import summary_tables, search_index, change_log
+from src.models.db.connection_manager import ConnectionManager, STATEMENT_CACHE_SIZE
+from src.models.db.read_replica import ReadReplica
+from src.models.db.query_cache import QueryResultCache, LRUCache, cached_query, normalize_filters
+from src.models.db.query_stats import QueryStats, SLOW_QUERY_MS
+
 
 # ==============================================================================
 # MODELO DE DADOS (DATABASE)
 # ==============================================================================
 
+POINTS_PAGE_SIZE = 200 # Pontos por página na tabela do dashboard
+IN_CLAUSE_CHUNK = 500 # Máximo de valores por cláusula IN (limite de parâmetros do SQLite/Access)
+CHANGE_DELTA_MAX_ROWS = 2000 # Acima disso, buscar as alterações linha a linha não compensa: recarrega tudo
+POINT_DETAILS_CACHE_SIZE = 2000 # Pontos com ressalva e histórico MUST guardados para o modal de detalhes
+LOCAL_WRITES_KEPT = 100 # Gravações deste objeto lembradas para get_changes_since não as tratar como externas
+POINT_COLUMNS = "a.id_conexao, emp.nome_empresa, a.cod_ons, a.tensao_kv, a.anotacao_geral, a.aprovado_por, a.data_aprovacao"
+
 class DashboardDB:
-    def __init__(self, db_path):
+    def __init__(self, db_path, read_replica=False, slow_query_ms=SLOW_QUERY_MS):
         self.db_path = Path(db_path)
         if not self.db_path.exists():
             raise FileNotFoundError(f"Arquivo de banco de dados não encontrado: {self.db_path}")
@@ -26,8 +41,47 @@ class DashboardDB:
             self.tbl_anotacao = 'tb_anotacao'
             self.tbl_valores = 'tb_valores_must'
 
+        # Exceções de banco tratadas nas consultas; o pyodbc só é importado para o Access
+        self._db_errors = (sqlite3.Error,)
+        if self.db_type == 'access':
+            import pyodbc
+            self._db_errors = (sqlite3.Error, pyodbc.Error)
+
+        # Latência de cada consulta por modelo e log das lentas (ver get_query_stats)
+        self.query_stats = QueryStats(slow_query_ms)
+
+        self._connections = ConnectionManager(self._open_connection)
+        self.read_replica = None # ReadReplica ativa (ver _start_read_replica)
+        self._read_connections = self._connections
+
+        # Cache de resultados carimbado com a geração dos dados (ver _current_generation)
+        self._cache = QueryResultCache()
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._seen_versions = {} # id(conexão) -> último PRAGMA data_version visto (SQLite)
+        self._seen_mtime = None # último mtime visto do arquivo (Access)
+        self._thread_state = threading.local()
+        self._change_listeners = [] # chamados após cada gravação, com as linhas alteradas
+        self._local_writes = {} # versão antes -> versão depois de cada gravação deste objeto (ver is_local_change)
+        self._local_writes_lock = threading.Lock()
+        # Ressalva e histórico por id_conexao, invalidados só para os pontos que mudaram (ver _sync_details_cache)
+        self._details_cache = LRUCache(POINT_DETAILS_CACHE_SIZE)
+        self._details_version = None
+        self._checked_version = None # última versão vista por get_changes_since (ver peek_point_details)
+        self._details_lock = threading.Lock()
+
+        self.has_summary_tables = False
+        self.search_tokenizer = None # tokenizador do índice FTS5 de busca; None = busca por LIKE
+        self.has_change_log = False # registro de alterações por versão (ver get_changes_since)
         if self.db_type == 'sqlite':
             self._ensure_approval_columns_exist_sqlite()
+            self.has_summary_tables = self._ensure_summary_tables_sqlite()
+            self.search_tokenizer = self._ensure_search_index_sqlite()
+            self.has_change_log = self._ensure_change_log_sqlite()
+
+        # Réplica de leitura em memória (opcional): leituras sem ida ao arquivo/ODBC
+        if read_replica:
+            self._start_read_replica()
 
         self.company_links = {
             'SUL SUDESTE': 'https://onsbr-my.sharepoint.com/:b:/g/personal/pedrovictor_veras_ons_org_br/EbWWq1r7MnxPvOejycbr82cB5a_rN_PCsDMDjp9r3bF3Ng?e=C7dxKN',
@@ -38,39 +92,367 @@ class DashboardDB:
             'CPFL PAULISTA': 'https://onsbr-my.sharepoint.com/:b:/g/personal/pedrovictor_veras_ons_org_br/EbWWq1r7MnxPvOejycbr82cB5a_rN_PCsDMDjp9r3bF3Ng?e=C7dxKN'
         }
 
-    def _get_connection(self):
+    def _open_connection(self):
         if self.db_type == 'sqlite':
-            conn = sqlite3.connect(self.db_path)
+            # check_same_thread=False apenas para permitir o close() no encerramento;
+            # cada conexão é usada somente pela thread dona (ver ConnectionManager).
+            conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
             conn.row_factory = sqlite3.Row
             return conn
         else:
+            import pyodbc
             conn_str = (r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};" fr"DBQ={self.db_path};")
             return pyodbc.connect(conn_str)
 
-    def _execute_query(self, query, params=(), fetch_one=False):
+    def _get_connection(self):
+        """Conexão persistente da thread atual com o banco principal."""
+        return self._connections.get()
+
+    def _get_read_connection(self):
+        """Conexão de leitura da thread atual: a réplica em memória, se ativa, senão o banco principal."""
+        return self._read_connections.get()
+
+    def _handle_connection_error(self):
+        # No ODBC (Access em rede) um erro costuma deixar a conexão inutilizável: reabre na próxima chamada.
+        if self.db_type == 'access':
+            self._connections.discard()
+
+    def close(self):
+        """Fecha todas as conexões abertas. Chamar no encerramento da aplicação."""
+        self._connections.close_all()
+        if self.read_replica is not None:
+            self._read_connections.close_all()
+            self.read_replica.close()
+        with self._generation_lock:
+            self._seen_versions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _execute_query(self, query, params=(), fetch_one=False, primary=False):
+        """Executa uma leitura. `primary=True` ignora a réplica (ex.: versão atual do banco)."""
+        conn = None
+        start = time.perf_counter()
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
+            conn = self._get_connection() if primary else self._get_read_connection()
+            cursor = conn.cursor()
+            try:
                 cursor.execute(query, params)
                 columns = [column[0] for column in cursor.description]
                 if fetch_one:
                     result = cursor.fetchone()
-                    return dict(zip(columns, result)) if result else None
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
-        except (sqlite3.Error, pyodbc.Error) as e:
+                    result = dict(zip(columns, result)) if result else None
+                    row_count = 1 if result else 0
+                else:
+                    result = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                    row_count = len(result)
+            finally:
+                cursor.close()
+        except self._db_errors as e:
             print(f"Erro de banco de dados (leitura): {e}")
+            self._record_query(conn, self._backend_label(primary), query, params, start, error=e)
+            self._thread_state.query_errors = self._query_error_count() + 1
+            self._handle_connection_error()
             return [] if not fetch_one else None
+        self._record_query(conn, self._backend_label(primary), query, params, start, rows=row_count)
+        return result
 
     def _execute_write_query(self, query, params=()):
+        return self._execute_write_transaction([(query, params)])
+
+    def _execute_write_transaction(self, statements):
+        """
+        Executa uma lista de (query, params) numa única transação. Se `params` for uma
+        lista de tuplas, o comando é executado com executemany (um por tupla).
+        Com a réplica ativa, a transação é repetida nela depois do commit no banco principal.
+        As versões antes e depois da transação ficam registradas (ver is_local_change).
+        """
+        conn = None
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
-            return True
-        except (sqlite3.Error, pyodbc.Error) as e:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            try:
+                if self.db_type == 'sqlite':
+                    # Trava de escrita antes de ler a versão: nenhuma gravação externa entra no meio
+                    cursor.execute("BEGIN IMMEDIATE")
+                version_before = self._primary_version(cursor)
+                for query, params in statements:
+                    start = time.perf_counter()
+                    if isinstance(params, list):
+                        cursor.executemany(query, params)
+                    else:
+                        cursor.execute(query, params)
+                    # Sem EXPLAIN para gravações: o plano seria de uma escrita já executada
+                    self._record_query(None, self.db_type, query, params, start, rows=max(cursor.rowcount, 0))
+                version_after = None
+                if self.db_type == 'sqlite':
+                    version_after = self._primary_version(cursor)
+            finally:
+                cursor.close()
+            conn.commit()
+        except self._db_errors as e:
             print(f"Erro de banco de dados (escrita): {e}")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except self._db_errors:
+                    pass
+            self._handle_connection_error()
             return False
+        if self.db_type == 'access':
+            version_after = self.get_change_version() # mtime: aproximado, o Access não tem trava de versão
+        self._record_local_write(version_before, version_after)
+        if self.read_replica is not None:
+            # Réplica já atrás do principal antes desta gravação: repete mesmo assim, mas marca para recarga
+            in_sync = version_before is not None and version_before == self.read_replica.version
+            self.read_replica.apply(statements, version_after if in_sync else None)
+        return True
+
+    def _primary_version(self, cursor):
+        """Versão do banco principal (ver get_change_version) lida na transação corrente."""
+        if self.has_change_log:
+            cursor.execute(f"SELECT MAX(versao) FROM {change_log.CHANGE_LOG_TABLE}")
+            return cursor.fetchone()[0] or 0
+        try:
+            return self.db_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    # --- Réplica de leitura em memória ---
+
+    def _start_read_replica(self):
+        replica = ReadReplica(self.db_type, {'tbl_empresas': self.tbl_empresas, 'tbl_anotacao': self.tbl_anotacao,
+                                             'tbl_valores': self.tbl_valores})
+        try:
+            # Versão lida antes da cópia: uma gravação no meio só causa uma recarga a mais
+            replica.load(self._get_connection(), self.get_change_version())
+        except (*self._db_errors, OSError) as e:
+            print(f"Aviso: réplica em memória indisponível, lendo do banco principal ({e})")
+            return
+        self.read_replica = replica
+        self._read_connections = ConnectionManager(replica.connect)
+
+    def sync_read_replica(self, version=None):
+        """
+        Recopia a réplica se o banco principal mudou desde a última cópia (alterações de outras
+        pessoas; as gravações deste objeto já são repetidas nela). Retorna True se recopiou.
+        """
+        if self.read_replica is None:
+            return False
+        version = self.get_change_version() if version is None else version
+        if version is not None and version == self.read_replica.version:
+            return False
+        try:
+            self.read_replica.load(self._get_connection(), version)
+        except (*self._db_errors, OSError) as e:
+            print(f"Aviso: falha ao recarregar a réplica em memória ({e})")
+            return False
+        self._read_connections.retire()
+        self.bump_data_generation()
+        return True
+
+    def _query_error_count(self):
+        return getattr(self._thread_state, 'query_errors', 0)
+
+    # --- Instrumentação das consultas ---
+
+    def _backend_label(self, primary=False):
+        return 'replica' if self.read_replica is not None and not primary else self.db_type
+
+    @staticmethod
+    def _caller_name():
+        """Método do DashboardDB que originou a consulta (ignorando os auxiliares de execução)."""
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_name.startswith(('_execute_', '_record_query')):
+            frame = frame.f_back
+        return frame.f_code.co_name if frame is not None else None
+
+    def _record_query(self, conn, backend, query, params, start, rows=0, error=None):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        caller = self._caller_name()
+        stats = self.query_stats
+        if not stats.record(backend, query, elapsed_ms, rows, caller, error) or error is not None:
+            return
+        # Consulta lenta: guarda o plano (uma vez por modelo) e avisa no console
+        plan = self._explain_query_plan(conn, query, params) if stats.needs_plan(backend, query) else None
+        stats.record_slow(backend, query, params if not isinstance(params, list) else (), elapsed_ms, caller, plan)
+        print(f"Consulta lenta ({elapsed_ms:.0f} ms, {backend}, {caller}): {' '.join(query.split())[:300]}")
+        for line in plan or ():
+            print(f"    {line}")
+
+    @staticmethod
+    def _explain_query_plan(conn, query, params):
+        """EXPLAIN QUERY PLAN da consulta (só SQLite), como linhas indentadas pela árvore do plano."""
+        if not isinstance(conn, sqlite3.Connection):
+            return None
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        except sqlite3.Error as e:
+            return [f"(EXPLAIN indisponível: {e})"]
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in (tuple(row) for row in rows):
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+
+    def get_query_stats(self):
+        """Latência por modelo de consulta e backend, e o log das consultas lentas (ver QueryStats.stats)."""
+        return self.query_stats.stats()
+
+    def dump_query_stats(self, path):
+        """Grava get_query_stats() num arquivo JSON."""
+        self.query_stats.dump_json(path)
+
+    def reset_query_stats(self):
+        self.query_stats.reset()
+
+    # --- Geração dos dados (invalidação do cache) ---
+
+    def bump_data_generation(self):
+        """Marca os dados como alterados: nenhuma entrada de cache anterior volta a ser servida."""
+        with self._generation_lock:
+            self._generation += 1
+
+    def _detect_external_changes(self):
+        """
+        Detecta escritas feitas fora deste objeto (carga do banco, outro revisor):
+        PRAGMA data_version no SQLite (muda quando outra conexão faz commit) e mtime do arquivo no Access.
+        """
+        if self.read_replica is not None:
+            # Leituras vêm da réplica, que só muda por sync_read_replica e pelas gravações (ambos mudam a geração)
+            return
+        try:
+            if self.db_type == 'sqlite':
+                conn = self._get_connection()
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                with self._generation_lock:
+                    changed = self._seen_versions.get(id(conn)) != version
+                    self._seen_versions[id(conn)] = version
+            else:
+                mtime = self.db_path.stat().st_mtime_ns
+                with self._generation_lock:
+                    changed = self._seen_mtime != mtime
+                    self._seen_mtime = mtime
+        except (OSError, sqlite3.Error) as e:
+            print(f"Aviso ao verificar alterações externas: {e}")
+            changed = True
+        # Primeira leitura numa conexão nova também conta como mudança (não há referência anterior)
+        if changed:
+            self.bump_data_generation()
+
+    def _current_generation(self):
+        self._detect_external_changes()
+        return self._generation
+
+    def get_cache_stats(self):
+        return self._cache.stats()
+
+    # --- Notificação de alterações ---
+
+    def add_change_listener(self, callback):
+        """
+        Registra `callback(change_type, rows)`, chamado após cada gravação bem-sucedida com as
+        linhas alteradas (mesmo formato de get_all_connection_points). A chamada acontece na
+        thread que fez a gravação: widgets devem repassar para a thread da interface (ex.: Signal).
+        """
+        if callback not in self._change_listeners:
+            self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def get_change_version(self):
+        """
+        Versão atual dos dados: a última entrada do registro de alterações (SQLite) ou o
+        mtime do arquivo (Access, que não tem triggers).
+        """
+        if self.has_change_log:
+            row = self._execute_query(f"SELECT MAX(versao) AS versao FROM {change_log.CHANGE_LOG_TABLE};",
+                                      fetch_one=True, primary=True)
+            return (row or {}).get('versao') or 0
+        try:
+            return self.db_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _record_local_write(self, version_before, version_after):
+        if version_before is None or version_after is None or version_before == version_after:
+            return
+        with self._local_writes_lock:
+            self._local_writes[version_before] = version_after
+            while len(self._local_writes) > LOCAL_WRITES_KEPT:
+                del self._local_writes[next(iter(self._local_writes))]
+
+    def is_local_change(self, since, version):
+        """
+        True se tudo o que mudou da versão `since` até `version` foi gravado por este objeto
+        (aprovações da própria janela). Quem gravou já avisou os ouvintes (add_change_listener).
+        """
+        with self._local_writes_lock:
+            visited = set()
+            while since != version and since in self._local_writes and since not in visited:
+                visited.add(since)
+                since = self._local_writes[since]
+        return since == version
+
+    def get_changes_since(self, version):
+        """
+        O que mudou no banco desde a versão `version` (de get_change_version ou de uma chamada anterior).
+        Gravações feitas por este objeto não contam: as telas já as receberam por add_change_listener.
+
+        Returns:
+            dict: 'version' (a nova versão), 'rows' (pontos alterados, no formato de
+                  get_all_connection_points), 'aggregates_changed' (KPIs/resumos/valores podem
+                  ter mudado) e 'full_reload' (inclusões, exclusões, carga completa ou alterações
+                  demais: a tela deve recarregar tudo).
+        """
+        current = self.get_change_version()
+        self.sync_read_replica(current)
+        with self._details_lock:
+            self._checked_version = current
+        result = {'version': current, 'rows': [], 'aggregates_changed': False, 'full_reload': False}
+        if version is None or current is None or self.is_local_change(version, current):
+            return result
+        if not self.has_change_log:
+            # Access: sem registro por linha, qualquer mudança no arquivo recarrega tudo
+            result.update(aggregates_changed=True, full_reload=True)
+            return result
+
+        log = change_log.CHANGE_LOG_TABLE
+        summary = self._execute_query(
+            f"SELECT COUNT(*) AS total, "
+            f"SUM(CASE WHEN tabela = ? AND operacao <> ? THEN 1 ELSE 0 END) AS estruturais, "
+            f"(SELECT MIN(versao) FROM {log}) AS primeira "
+            f"FROM {log} WHERE versao > ? AND versao <= ?;",
+            (self.tbl_anotacao, change_log.OP_UPDATE, version, current), fetch_one=True, primary=True) or {}
+        result['aggregates_changed'] = bool(summary.get('total'))
+        # Versão anterior à primeira guardada (registro podado ou banco substituído): não dá para saber o que mudou
+        gap = current < version or (summary.get('primeira') or 0) > version + 1
+        if gap or summary.get('estruturais') or (summary.get('total') or 0) > CHANGE_DELTA_MAX_ROWS:
+            result.update(aggregates_changed=True, full_reload=True)
+            return result
+
+        rows = self._execute_query(
+            f"SELECT {POINT_COLUMNS} {self._points_from_clause()} "
+            f"WHERE a.id_conexao IN (SELECT id_conexao FROM {log} WHERE versao > ? AND versao <= ? AND tabela = ?) "
+            f"ORDER BY emp.nome_empresa, a.cod_ons;",
+            (version, current, self.tbl_anotacao), primary=True)
+        result['rows'] = self._add_reference_links(rows)
+        return result
+
+    def _notify_change(self, change_type, rows):
+        if not rows:
+            return
+        for callback in list(self._change_listeners):
+            try:
+                callback(change_type, rows)
+            except Exception as e:
+                print(f"Erro ao notificar alteração ({change_type}): {e}")
 
     def _ensure_approval_columns_exist_sqlite(self):
         try:
@@ -82,8 +464,51 @@ class DashboardDB:
                 self._execute_write_query(f"ALTER TABLE {self.tbl_anotacao} ADD COLUMN data_aprovacao TEXT;")
         except Exception as e:
             print(f"Erro ao verificar tabela '{self.tbl_anotacao}': {e}")
-            
+
+    def _ensure_summary_tables_sqlite(self):
+        """Materializa as tabelas de resumo em bancos carregados antes delas existirem."""
+        try:
+            conn = self._get_connection()
+            if not summary_tables.summary_tables_exist(conn.cursor()):
+                summary_tables.refresh_summary_tables(conn, self.tbl_empresas, self.tbl_anotacao, self.tbl_valores)
+            return True
+        except sqlite3.Error as e:
+            print(f"Erro ao materializar tabelas de resumo: {e}")
+            return False
+
+    def _ensure_search_index_sqlite(self):
+        """Cria (ou recria, se desatualizado) o índice FTS5 usado pela busca de pontos."""
+        try:
+            return search_index.ensure_search_index(self._get_connection(), self.tbl_anotacao)
+        except sqlite3.Error as e:
+            print(f"Erro ao preparar índice de busca: {e}")
+            return None
+
+    def _ensure_change_log_sqlite(self):
+        """Cria o registro de alterações (tabela e triggers) em bancos carregados antes dele existir."""
+        try:
+            return change_log.ensure_change_log(self._get_connection(), self.tbl_anotacao, self.tbl_valores)
+        except sqlite3.Error as e:
+            print(f"Erro ao preparar registro de alterações: {e}")
+            return False
+
+    @cached_query
     def get_kpi_summary(self):
+        if self.has_summary_tables:
+            row = self._execute_query(
+                f"SELECT unique_companies, total_points, points_with_remarks, approved_points FROM {summary_tables.RESUMO_KPIS};",
+                fetch_one=True) or {}
+            total_points = row.get('total_points') or 0
+            points_with_remarks = row.get('points_with_remarks') or 0
+            percentage = (points_with_remarks / total_points * 100) if total_points > 0 else 0
+            return {
+                'unique_companies': row.get('unique_companies') or 0,
+                'total_points': total_points,
+                'points_with_remarks': points_with_remarks,
+                'approved_points': row.get('approved_points') or 0,
+                'percentage_with_remarks': f"{percentage:.1f}%"
+            }
+
         query_companies = f"SELECT COUNT(*) as count FROM {self.tbl_empresas};"
         query_points = f"SELECT COUNT(*) as count FROM {self.tbl_anotacao};"
         query_remarks = f"SELECT COUNT(*) as count FROM {self.tbl_anotacao} WHERE anotacao_geral IS NOT NULL AND anotacao_geral <> '' AND anotacao_geral <> 'nan';"
@@ -102,7 +527,12 @@ class DashboardDB:
             print(f"Erro ao calcular KPIs: {e}")
             return {'unique_companies': 0, 'total_points': 0, 'points_with_remarks': 0, 'percentage_with_remarks': '0.0%'}
 
+    @cached_query
     def get_company_analysis(self):
+        if self.has_summary_tables:
+            return self._execute_query(
+                f"SELECT nome_empresa, total, with_remarks, approved FROM {summary_tables.RESUMO_EMPRESAS} "
+                "WHERE total > 0 ORDER BY nome_empresa;")
         query = f"""
             SELECT e.nome_empresa, COUNT(a.id_conexao) as total,
                    SUM(IIF(a.anotacao_geral IS NOT NULL AND a.anotacao_geral <> '' AND a.anotacao_geral <> 'nan', 1, 0)) as with_remarks
@@ -111,25 +541,51 @@ class DashboardDB:
         """
         return self._execute_query(query)
         
+    @cached_query
     def get_yearly_must_stats(self):
+        if self.has_summary_tables:
+            return self._execute_query(f"SELECT ano, periodo, total_valor FROM {summary_tables.RESUMO_ANUAL} ORDER BY ano, periodo;")
         query = f"SELECT ano, periodo, SUM(valor) as total_valor FROM {self.tbl_valores} GROUP BY ano, periodo ORDER BY ano, periodo;"
         return self._execute_query(query)
 
+    @cached_query
     def get_unique_companies(self):
         query = f"SELECT nome_empresa FROM {self.tbl_empresas} ORDER BY nome_empresa;"
         return [row['nome_empresa'] for row in self._execute_query(query)]
 
+    @cached_query
     def get_unique_tensions(self):
         query = f"SELECT DISTINCT tensao_kv FROM {self.tbl_anotacao} WHERE tensao_kv IS NOT NULL ORDER BY tensao_kv;"
         return [str(row['tensao_kv']) for row in self._execute_query(query)]
 
-    def get_all_connection_points(self, filters=None):
-        query = f"""
-            SELECT emp.nome_empresa, a.cod_ons, a.tensao_kv, a.anotacao_geral, a.aprovado_por, a.data_aprovacao
+    def _search_match(self, filters):
+        """Expressão MATCH do índice FTS5 para o filtro de busca, ou None se a busca deve usar LIKE."""
+        if not filters or not filters.get("search") or not self.search_tokenizer:
+            return None
+        return search_index.build_match_expression(filters["search"], self.search_tokenizer)
+
+    def _points_from_clause(self, search_match=None):
+        """FROM das consultas de pontos; com busca FTS5, junta os ids encontrados e sua relevância (fts.rank)."""
+        from_clause = f"""
             FROM ({self.tbl_empresas} AS emp
             INNER JOIN {self.tbl_anotacao} AS a ON emp.id_empresa = a.id_empresa)
         """
+        if search_match:
+            from_clause += f"""
+            INNER JOIN (SELECT rowid AS id_conexao, rank FROM {search_index.SEARCH_TABLE}
+                        WHERE {search_index.SEARCH_TABLE} MATCH ?) AS fts ON fts.id_conexao = a.id_conexao
+            """
+        return from_clause
+
+    def _build_point_filters(self, filters, search_match=None):
+        """
+        Traduz os filtros do dashboard em (condições, parâmetros) sobre emp/a. Se `search_match`
+        for informado, a busca é atendida pelo índice FTS5 (ver _points_from_clause) e o
+        parâmetro do MATCH vem primeiro; senão cai no LIKE sobre cod_ons e anotacao_geral.
+        """
         conditions, params = [], []
+        if search_match:
+            params.append(search_match)
         if filters:
             year_filter = filters.get("year")
             if year_filter and year_filter != "Todos":
@@ -138,7 +594,7 @@ class DashboardDB:
             if filters.get("company") and filters["company"] != "Todas":
                 conditions.append("emp.nome_empresa = ?")
                 params.append(filters["company"])
-            if filters.get("search"):
+            if filters.get("search") and not search_match:
                 search_term = f"%{filters['search']}%"
                 conditions.append("(a.cod_ons LIKE ? OR a.anotacao_geral LIKE ?)")
                 params.extend([search_term, search_term])
@@ -149,17 +605,86 @@ class DashboardDB:
                 conditions.append("(a.anotacao_geral IS NOT NULL AND a.anotacao_geral <> '' AND a.anotacao_geral <> 'nan')")
             elif filters.get("status") == "Aprovado":
                 conditions.append("(a.aprovado_por IS NOT NULL AND a.aprovado_por <> '')")
-        
+        return conditions, params
+
+    def _add_reference_links(self, rows):
+        for row in rows:
+            normalized_empresa = str(row['nome_empresa']).strip().upper()
+            row['arquivo_referencia'] = self.company_links.get(normalized_empresa, '')
+        return rows
+
+    @cached_query
+    def get_all_connection_points(self, filters=None):
+        """Pontos que atendem aos filtros; com busca textual, os mais relevantes vêm primeiro."""
+        search_match = self._search_match(filters)
+        query = f"""
+            SELECT {POINT_COLUMNS}
+            {self._points_from_clause(search_match)}
+        """
+        conditions, params = self._build_point_filters(filters, search_match)
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
-        query += " ORDER BY emp.nome_empresa, a.cod_ons;"
+        query += " ORDER BY " + ("fts.rank, " if search_match else "") + "emp.nome_empresa, a.cod_ons;"
         
-        results = self._execute_query(query, tuple(params))
-        for row in results:
-            normalized_empresa = str(row['nome_empresa']).strip().upper()
-            row['arquivo_referencia'] = self.company_links.get(normalized_empresa, '')
-        return results
+        return self._add_reference_links(self._execute_query(query, tuple(params)))
+
+    @cached_query
+    def count_connection_points(self, filters=None):
+        """Total de pontos que atendem aos filtros (para o rodapé da tabela paginada)."""
+        search_match = self._search_match(filters)
+        query = f"SELECT COUNT(*) AS total {self._points_from_clause(search_match)}"
+        conditions, params = self._build_point_filters(filters, search_match)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        row = self._execute_query(query + ";", tuple(params), fetch_one=True)
+        return row['total'] if row else 0
+
+    @cached_query
+    def get_connection_points_page(self, filters=None, after=None, page_size=POINTS_PAGE_SIZE):
+        """
+        Página de pontos de conexão com paginação por chave (keyset) em (nome_empresa, cod_ons),
+        a mesma ordem de get_all_connection_points sem busca (a paginação precisa de ordem estável,
+        então aqui a relevância da busca não reordena). Cada página custa o mesmo, seja a primeira ou a última.
+
+        Args:
+            after: (nome_empresa, cod_ons) do último ponto da página anterior, ou None para a primeira.
+
+        Returns:
+            dict: {'rows': [...], 'next_cursor': (nome_empresa, cod_ons) ou None se não houver mais páginas}
+        """
+        search_match = self._search_match(filters)
+        conditions, params = self._build_point_filters(filters, search_match)
+        if after:
+            conditions.append("(emp.nome_empresa > ? OR (emp.nome_empresa = ? AND a.cod_ons > ?))")
+            params.extend([after[0], after[0], after[1]])
+
+        # Busca um item a mais para saber se existe próxima página
+        if self._read_dialect() == 'access':
+            query = f"SELECT TOP {int(page_size) + 1} {POINT_COLUMNS} {self._points_from_clause(search_match)}"
+        else:
+            query = f"SELECT {POINT_COLUMNS} {self._points_from_clause(search_match)}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY emp.nome_empresa, a.cod_ons"
+        if self._read_dialect() == 'sqlite':
+            query += " LIMIT ?"
+            params.append(int(page_size) + 1)
 
+        rows = self._execute_query(query + ";", tuple(params))
+        has_more = len(rows) > page_size
+        rows = self._add_reference_links(rows[:page_size])
+        next_cursor = (rows[-1]['nome_empresa'], rows[-1]['cod_ons']) if has_more and rows else None
+        return {'rows': rows, 'next_cursor': next_cursor}
+
+    @cached_query
+    def get_point_years(self):
+        """Anos com valores MUST de cada ponto, {id_conexao: [anos]} (filtro de ano feito em memória)."""
+        years = {}
+        for row in self._execute_query(f"SELECT DISTINCT id_conexao, ano FROM {self.tbl_valores};"):
+            years.setdefault(row['id_conexao'], []).append(row['ano'])
+        return years
+
+    @cached_query
     def get_must_history_for_point(self, cod_ons):
         query = f"""
             SELECT vm.ano, vm.periodo, vm.valor
@@ -169,12 +694,138 @@ class DashboardDB:
         """
         return self._execute_query(query, (cod_ons,))
 
+    # --- Detalhes dos pontos (modal de detalhes) ---
+
+    def _sync_details_cache(self):
+        """
+        Descarta do cache de detalhes os pontos alterados desde a última verificação, pelo
+        registro de alterações; sem ele (Access), ou após uma carga, descarta tudo.
+        """
+        version = self.get_change_version()
+        self.sync_read_replica(version) # os detalhes são lidos da réplica: ela precisa estar na mesma versão
+        with self._details_lock:
+            seen, self._details_version = self._details_version, version
+        if seen == version:
+            return
+        if seen is None or version is None or not self.has_change_log or version < seen:
+            self._details_cache.clear()
+            return
+        rows = self._execute_query(
+            f"SELECT DISTINCT id_conexao FROM {change_log.CHANGE_LOG_TABLE} WHERE versao > ? AND versao <= ?;",
+            (seen, version), primary=True)
+        changed = [row['id_conexao'] for row in rows]
+        if None in changed or len(changed) > CHANGE_DELTA_MAX_ROWS: # marcador de carga
+            self._details_cache.clear()
+        else:
+            self._details_cache.discard(changed)
+
+    def prefetch_point_details(self, id_list):
+        """
+        Carrega ressalva e histórico MUST dos pontos informados que ainda não estão no cache,
+        numa consulta por bloco de IN_CLAUSE_CHUNK pontos. Retorna quantos foram carregados.
+        """
+        self._sync_details_cache()
+        missing = [i for i in dict.fromkeys(id_list) if i is not None and i not in self._details_cache]
+        loaded = 0
+        for start in range(0, len(missing), IN_CLAUSE_CHUNK):
+            chunk = missing[start:start + IN_CLAUSE_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            errors_before = self._query_error_count()
+            rows = self._execute_query(
+                f"SELECT a.id_conexao, a.anotacao_geral, vm.ano, vm.periodo, vm.valor "
+                f"FROM {self.tbl_anotacao} AS a LEFT JOIN {self.tbl_valores} AS vm ON vm.id_conexao = a.id_conexao "
+                f"WHERE a.id_conexao IN ({placeholders}) ORDER BY a.id_conexao, vm.ano, vm.periodo;",
+                tuple(chunk))
+            if self._query_error_count() != errors_before:
+                continue # não guarda resultado de consulta que falhou
+            details = {}
+            for row in rows:
+                entry = details.setdefault(row['id_conexao'], {'anotacao_geral': row['anotacao_geral'], 'history': []})
+                if row['ano'] is not None:
+                    entry['history'].append({'ano': row['ano'], 'periodo': row['periodo'], 'valor': row['valor']})
+            for id_conexao, entry in details.items():
+                self._details_cache.put(id_conexao, entry)
+            loaded += len(details)
+        return loaded
+
+    def peek_point_details(self, id_conexao):
+        """
+        Detalhes já pré-carregados do ponto, sem acessar o banco. None se não estiverem no cache
+        ou se o cache não foi conferido na última versão vista por get_changes_since (pode estar
+        desatualizado: get_point_details descarta o que mudou antes de ler).
+        """
+        with self._details_lock:
+            stale = self._checked_version is not None and self._checked_version != self._details_version
+        if stale:
+            return None
+        hit, value = self._details_cache.get(id_conexao)
+        return value if hit else None
+
+    def get_point_details(self, id_conexao):
+        """
+        Ressalva e histórico MUST do ponto: {'anotacao_geral': ..., 'history': [{'ano', 'periodo', 'valor'}]},
+        do cache quando possível. None se o ponto não existe.
+        """
+        self.prefetch_point_details([id_conexao])
+        return self.peek_point_details(id_conexao)
+
+    def get_details_cache_stats(self):
+        return self._details_cache.stats()
+
     def approve_point(self, cod_ons, approver_name):
-        query = f"UPDATE {self.tbl_anotacao} SET aprovado_por = ?, data_aprovacao = ? WHERE cod_ons = ?;"
+        """Aprova um ponto. Retorna a linha atualizada, ou None se falhou ou o ponto já estava aprovado."""
+        updated = self.approve_points([cod_ons], approver_name)
+        return updated[0] if updated else None
+
+    def approve_points(self, cod_ons_list, approver_name):
+        """
+        Aprova vários pontos numa única transação (um executemany e um commit).
+        Pontos já aprovados são mantidos como estão.
+
+        Returns:
+            list: os pontos efetivamente aprovados, no mesmo formato de get_all_connection_points,
+                  ou None se a transação falhou (nada é gravado).
+        """
+        cod_ons_list = list(dict.fromkeys(cod_ons_list))
+        if not cod_ons_list:
+            return []
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return self._execute_write_query(query, (approver_name, timestamp, cod_ons))
+        query = (f"UPDATE {self.tbl_anotacao} SET aprovado_por = ?, data_aprovacao = ? "
+                 f"WHERE cod_ons = ? AND (aprovado_por IS NULL OR aprovado_por = '');")
+        statements = [(query, [(approver_name, timestamp, cod_ons) for cod_ons in cod_ons_list])]
+        chunks = [cod_ons_list[i:i + IN_CLAUSE_CHUNK] for i in range(0, len(cod_ons_list), IN_CLAUSE_CHUNK)]
+        if self.has_summary_tables:
+            for chunk in chunks:
+                statements += summary_tables.build_company_refresh_statements(chunk, self.tbl_empresas, self.tbl_anotacao)
+        if not self._execute_write_transaction(statements):
+            return None
+        self.bump_data_generation()
+
+        # Relê só as linhas gravadas por esta chamada (mesmo responsável e horário)
+        updated = []
+        for chunk in chunks:
+            placeholders = ", ".join("?" for _ in chunk)
+            updated += self._execute_query(
+                f"SELECT {POINT_COLUMNS} {self._points_from_clause()} "
+                f"WHERE a.cod_ons IN ({placeholders}) AND a.aprovado_por = ? AND a.data_aprovacao = ? "
+                f"ORDER BY emp.nome_empresa, a.cod_ons;",
+                tuple(chunk) + (approver_name, timestamp))
+        updated = self._add_reference_links(updated)
+        self._notify_change('approved', updated)
+        return updated
         
+    @cached_query
     def get_data_for_charts(self):
+        if self.has_summary_tables:
+            return {
+                "points_per_company": self._execute_query(
+                    f"SELECT nome_empresa, total as count FROM {summary_tables.RESUMO_EMPRESAS} WHERE total > 0"),
+                "remarks_summary": self._execute_query(
+                    f"SELECT points_with_remarks as with_remarks, total_points as total FROM {summary_tables.RESUMO_KPIS}",
+                    fetch_one=True),
+                "yearly_sum": self._execute_query(
+                    f"SELECT ano, SUM(total_valor) as total_valor FROM {summary_tables.RESUMO_ANUAL} GROUP BY ano ORDER BY ano"),
+            }
         points_per_company_query = f"SELECT e.nome_empresa, COUNT(a.id_conexao) as count FROM {self.tbl_empresas} AS e INNER JOIN {self.tbl_anotacao} AS a ON e.id_empresa = a.id_empresa GROUP BY e.nome_empresa"
         remarks_summary_query = f"SELECT SUM(IIF(anotacao_geral IS NOT NULL AND anotacao_geral <> '' AND anotacao_geral <> 'nan', 1, 0)) as with_remarks, COUNT(id_conexao) as total FROM {self.tbl_anotacao}"
         yearly_sum_query = f"SELECT ano, SUM(valor) as total_valor FROM {self.tbl_valores} GROUP BY ano ORDER BY ano"
@@ -184,3 +835,109 @@ class DashboardDB:
             "yearly_sum": self._execute_query(yearly_sum_query),
         }
 
+
+    # --- Snapshot do dashboard (uma ida ao banco para todos os agregados) ---
+
+    def _snapshot_aggregates_query(self):
+        """
+        Uma única consulta UNION ALL com todos os agregados do dashboard, identificados pela
+        coluna 'secao'. Sem CTE/GROUPING SETS de propósito: o Access não suporta nenhum dos dois.
+        Os KPIs globais são derivados das linhas por empresa.
+        """
+        tensions = (f"SELECT DISTINCT 'tensao' AS secao, tensao_kv AS chave, NULL AS periodo, NULL AS v1, NULL AS v2, NULL AS v3 "
+                    f"FROM {self.tbl_anotacao} WHERE tensao_kv IS NOT NULL")
+        if self.has_summary_tables:
+            return f"""
+                SELECT 'empresa' AS secao, nome_empresa AS chave, NULL AS periodo, total AS v1, with_remarks AS v2, approved AS v3
+                FROM {summary_tables.RESUMO_EMPRESAS}
+                UNION ALL
+                SELECT 'anual', ano, periodo, total_valor, NULL, NULL FROM {summary_tables.RESUMO_ANUAL}
+                UNION ALL
+                {tensions};
+            """
+        remark = "a.anotacao_geral IS NOT NULL AND a.anotacao_geral <> '' AND a.anotacao_geral <> 'nan'"
+        approved = "a.aprovado_por IS NOT NULL AND a.aprovado_por <> ''"
+        return f"""
+            SELECT 'empresa' AS secao, e.nome_empresa AS chave, NULL AS periodo, COUNT(a.id_conexao) AS v1,
+                   SUM(IIF({remark}, 1, 0)) AS v2, SUM(IIF({approved}, 1, 0)) AS v3
+            FROM {self.tbl_empresas} AS e LEFT JOIN {self.tbl_anotacao} AS a ON e.id_empresa = a.id_empresa
+            GROUP BY e.nome_empresa
+            UNION ALL
+            SELECT 'anual', ano, periodo, SUM(valor), NULL, NULL FROM {self.tbl_valores} GROUP BY ano, periodo
+            UNION ALL
+            {tensions};
+        """
+
+    def _read_dialect(self):
+        """SQL das leituras: a réplica é sempre SQLite, mesmo com o Access como banco principal."""
+        return 'sqlite' if self.read_replica is not None else self.db_type
+
+    @staticmethod
+    def _tension_sort_key(value):
+        try:
+            return (0, float(value), '')
+        except (TypeError, ValueError):
+            return (1, 0.0, str(value))
+
+    @cached_query
+    def get_dashboard_snapshot(self, filters=None, page_size=POINTS_PAGE_SIZE):
+        """
+        Reúne numa única estrutura tudo o que o dashboard e os gráficos precisam ao abrir:
+        KPIs, análise por empresa, estatísticas anuais, listas dos filtros, a primeira página
+        de pontos de conexão (com os filtros informados) e os dados dos gráficos.
+        Os agregados vêm de uma só consulta.
+        """
+        rows = self._execute_query(self._snapshot_aggregates_query())
+
+        companies, yearly_stats, tensions = [], [], set()
+        for row in rows:
+            if row['secao'] == 'empresa':
+                companies.append({
+                    'nome_empresa': row['chave'],
+                    'total': int(row['v1'] or 0),
+                    'with_remarks': int(row['v2'] or 0),
+                    'approved': int(row['v3'] or 0),
+                })
+            elif row['secao'] == 'anual':
+                yearly_stats.append({'ano': int(row['chave']), 'periodo': row['periodo'], 'total_valor': row['v1'] or 0})
+            elif row['secao'] == 'tensao':
+                tensions.add(row['chave'])
+
+        companies.sort(key=lambda c: c['nome_empresa'])
+        yearly_stats.sort(key=lambda y: (y['ano'], y['periodo']))
+        company_analysis = [c for c in companies if c['total'] > 0]
+
+        total_points = sum(c['total'] for c in companies)
+        points_with_remarks = sum(c['with_remarks'] for c in companies)
+        percentage = (points_with_remarks / total_points * 100) if total_points > 0 else 0
+        kpis = {
+            'unique_companies': len(companies),
+            'total_points': total_points,
+            'points_with_remarks': points_with_remarks,
+            'approved_points': sum(c['approved'] for c in companies),
+            'percentage_with_remarks': f"{percentage:.1f}%"
+        }
+
+        yearly_sum = {}
+        for stat in yearly_stats:
+            yearly_sum[stat['ano']] = yearly_sum.get(stat['ano'], 0) + (stat['total_valor'] or 0)
+
+        first_page = self.get_connection_points_page(filters, None, page_size)
+        # Sem filtros o total já é conhecido pelos KPIs: evita o COUNT extra
+        filtered_total = total_points if not normalize_filters(filters) else self.count_connection_points(filters)
+
+        return {
+            'kpis': kpis,
+            'company_analysis': company_analysis,
+            'yearly_stats': yearly_stats,
+            'companies': [c['nome_empresa'] for c in companies],
+            'tensions': [str(t) for t in sorted(tensions, key=self._tension_sort_key)],
+            'connection_points': first_page['rows'],
+            'connection_points_next_cursor': first_page['next_cursor'],
+            'connection_points_total': filtered_total,
+            'charts': {
+                'points_per_company': [{'nome_empresa': c['nome_empresa'], 'count': c['total']} for c in company_analysis],
+                'remarks_summary': {'with_remarks': points_with_remarks, 'total': total_points},
+                'yearly_sum': [{'ano': ano, 'total_valor': total} for ano, total in sorted(yearly_sum.items())],
+            },
+        }
@@ -0,0 +1,80 @@
+"""
+Registro de alterações do banco (SQLite), para atualizar dashboards abertos por diferença.
+
+Cada inserção, alteração ou exclusão nas tabelas de anotações e de valores MUST grava,
+por trigger, uma linha em log_alteracoes com uma versão crescente (AUTOINCREMENT: nunca
+reaproveitada). Quem já viu a versão N busca só as linhas com versão maior que N.
+
+A carga completa recria as tabelas com to_sql, o que apaga as triggers; ao recriá-las
+ensure_change_log grava um marcador de carga, e quem o encontra recarrega tudo.
+"""
+import sqlite3
+
+CHANGE_LOG_TABLE = 'log_alteracoes'
+
+# Operações registradas
+OP_INSERT, OP_UPDATE, OP_DELETE, OP_RELOAD = 'insert', 'update', 'delete', 'carga'
+
+# Entradas mantidas após cada carga; quem ficou mais atrás que isso recarrega tudo
+CHANGE_LOG_KEEP = 100000
+
+
+def _trigger_names(tbl_anotacao, tbl_valores):
+    return [f"{CHANGE_LOG_TABLE}_{table}_{suffix}" for table in (tbl_anotacao, tbl_valores)
+            for suffix in ('ai', 'au', 'ad')]
+
+
+def build_change_log_statements(tbl_anotacao='anotacao', tbl_valores='valores_must'):
+    """Comandos que criam a tabela de alterações (se não existir) e (re)criam suas triggers."""
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (versao INTEGER PRIMARY KEY AUTOINCREMENT, "
+        f"tabela TEXT NOT NULL, id_conexao INTEGER, operacao TEXT NOT NULL)",
+    ]
+    names = iter(_trigger_names(tbl_anotacao, tbl_valores))
+    for table in (tbl_anotacao, tbl_valores):
+        for event, operation, row in (('INSERT', OP_INSERT, 'new'), ('UPDATE', OP_UPDATE, 'new'), ('DELETE', OP_DELETE, 'old')):
+            name = next(names)
+            statements += [
+                f"DROP TRIGGER IF EXISTS {name}",
+                f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN "
+                f"INSERT INTO {CHANGE_LOG_TABLE} (tabela, id_conexao, operacao) "
+                f"VALUES ('{table}', {row}.id_conexao, '{operation}'); END",
+            ]
+    return statements
+
+
+def change_log_ready(cursor, tbl_anotacao='anotacao', tbl_valores='valores_must'):
+    """True se a tabela de alterações e todas as suas triggers existem."""
+    names = [CHANGE_LOG_TABLE] + _trigger_names(tbl_anotacao, tbl_valores)
+    placeholders = ", ".join("?" for _ in names)
+    cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({placeholders})", names)
+    return cursor.fetchone()[0] == len(names)
+
+
+def ensure_change_log(conn, tbl_anotacao='anotacao', tbl_valores='valores_must'):
+    """
+    Garante a tabela de alterações e suas triggers. Se as triggers não existiam (banco novo
+    ou recarregado por completo), as entradas antigas são descartadas e um marcador de carga
+    é gravado, para que os dashboards abertos recarreguem tudo.
+    """
+    cursor = conn.cursor()
+    if change_log_ready(cursor, tbl_anotacao, tbl_valores):
+        return True
+    try:
+        for sql in build_change_log_statements(tbl_anotacao, tbl_valores):
+            cursor.execute(sql)
+        cursor.execute(f"DELETE FROM {CHANGE_LOG_TABLE}")
+        cursor.execute(f"INSERT INTO {CHANGE_LOG_TABLE} (tabela, id_conexao, operacao) VALUES (?, NULL, ?)",
+                       (tbl_anotacao, OP_RELOAD))
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"Aviso: registro de alterações indisponível ({e})")
+        return False
+    return True
+
+
+def prune_change_log(conn, keep=CHANGE_LOG_KEEP):
+    """Descarta as entradas mais antigas, mantendo as `keep` mais recentes."""
+    conn.execute(f"DELETE FROM {CHANGE_LOG_TABLE} WHERE versao <= (SELECT MAX(versao) FROM {CHANGE_LOG_TABLE}) - ?", (keep,))
+    conn.commit()
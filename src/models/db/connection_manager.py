@@ -0,0 +1,79 @@
+import threading
+
+
+# Tamanho do cache de prepared statements do sqlite3 por conexão. O DashboardDB tem
+# algumas dezenas de consultas distintas (filtros combinados geram variações), então
+# 128 mantém todas preparadas sem reparse a cada chamada.
+STATEMENT_CACHE_SIZE = 128
+
+
+class ConnectionManager:
+    """
+    Mantém uma conexão persistente por thread, criada sob demanda pela função `connect_func`.
+
+    Cada thread reutiliza sempre a mesma conexão (e portanto o cache de statements dela),
+    evitando o custo de conectar e reler o schema a cada consulta. `close_all()` fecha
+    todas as conexões abertas, de qualquer thread, no encerramento da aplicação.
+    """
+
+    def __init__(self, connect_func):
+        self._connect_func = connect_func
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._epoch = 0 # incrementado em close_all(): invalida as conexões guardadas nas threads
+
+    def get(self):
+        """Retorna a conexão da thread atual, abrindo uma nova se necessário."""
+        epoch, conn = getattr(self._local, 'entry', (None, None))
+        if conn is not None and epoch == self._epoch:
+            return conn
+        if conn is not None:
+            self._forget(conn) # aposentada por retire(): fechada pela própria thread dona
+        conn = self._connect_func()
+        with self._lock:
+            self._connections.append(conn)
+            self._local.entry = (self._epoch, conn)
+        return conn
+
+    def discard(self):
+        """Fecha e esquece a conexão da thread atual (ex.: após erro de rede no ODBC)."""
+        _, conn = getattr(self._local, 'entry', (None, None))
+        self._local.entry = (None, None)
+        if conn is not None:
+            self._forget(conn)
+
+    def retire(self):
+        """
+        Faz cada thread abrir uma conexão nova na próxima chamada de get(), sem fechar as
+        atuais no meio de uma consulta: cada uma é fechada pela thread dona ao ser trocada.
+        """
+        with self._lock:
+            self._epoch += 1
+
+    def _forget(self, conn):
+        with self._lock:
+            if conn not in self._connections:
+                return # já fechada por close_all()
+            self._connections.remove(conn)
+        self._safe_close(conn)
+
+    def close_all(self):
+        """Fecha todas as conexões abertas por este gerenciador."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._epoch += 1
+        for conn in connections:
+            self._safe_close(conn)
+
+    @property
+    def open_connections(self):
+        with self._lock:
+            return len(self._connections)
+
+    @staticmethod
+    def _safe_close(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Aviso ao fechar conexão: {e}")
@@ -0,0 +1,159 @@
+import functools
+import threading
+from collections import OrderedDict
+
+
+# Valores de filtro que significam "sem filtro" nos combos do dashboard
+_NO_FILTER_VALUES = (None, "", "Todas", "Todos")
+
+
+def normalize_filters(filters):
+    """
+    Converte o dicionário de filtros numa tupla ordenada e hashable, descartando
+    os valores neutros ("Todas", "Todos", vazio) para que combinações equivalentes
+    compartilhem a mesma entrada de cache.
+    """
+    if not filters:
+        return ()
+    normalized = []
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value in _NO_FILTER_VALUES:
+            continue
+        normalized.append((name, str(value)))
+    return tuple(sorted(normalized))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return ('dict', normalize_filters(value))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def make_cache_key(method_name, args, kwargs):
+    return (method_name, _freeze(args), tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+
+
+def _copy_result(value):
+    """Cópia dos contêineres do resultado, para que quem chama possa alterá-lo sem afetar o cache."""
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    return value
+
+
+class QueryResultCache:
+    """
+    Cache LRU de resultados de consultas, carimbado com a geração dos dados.
+
+    Uma entrada só é devolvida se a geração em que foi gravada for igual à geração
+    atual; qualquer escrita (ou alteração externa detectada) muda a geração e torna
+    todas as entradas anteriores inválidas, sem servir dados velhos.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        """Retorna (True, valor) se houver entrada válida para a geração, senão (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return True, _copy_result(value)
+
+    def put(self, key, generation, value):
+        value = _copy_result(value)
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class LRUCache:
+    """Cache LRU simples e thread-safe, com invalidação por chave (sem geração)."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retorna (True, cópia do valor) se a chave estiver no cache, senão (False, None)."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = self._entries[key]
+        return True, _copy_result(value)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value):
+        value = _copy_result(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def cached_query(method):
+    """
+    Decorador para métodos de leitura do DashboardDB: guarda o resultado por
+    (método, argumentos normalizados) enquanto a geração dos dados não mudar.
+    Resultados de consultas que falharam não são guardados.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = make_cache_key(method.__name__, args, kwargs)
+        generation = self._current_generation()
+        hit, value = self._cache.get(key, generation)
+        if hit:
+            return value
+        errors_before = self._query_error_count()
+        value = method(self, *args, **kwargs)
+        if self._query_error_count() == errors_before:
+            self._cache.put(key, generation, value)
+        return value
+    return wrapper
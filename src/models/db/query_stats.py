@@ -0,0 +1,164 @@
+"""
+Instrumentação das consultas do DashboardDB: latência por modelo de consulta e log de consultas lentas.
+
+Cada consulta é registrada pelo seu modelo (o SQL com espaços normalizados, listas IN
+de placeholders e números literais colapsados), separado por backend (sqlite, access,
+replica). Para cada modelo ficam a contagem, o tempo total/mín/máx, um histograma de
+latência em faixas fixas, as últimas amostras (percentis), as linhas devolvidas, os
+erros e os métodos do DashboardDB que o executaram.
+
+Consultas acima do limite vão para o log de lentas junto com o EXPLAIN QUERY PLAN
+(SQLite), gravado uma vez por modelo.
+"""
+import json
+import re
+import threading
+import time
+from collections import deque
+
+# Consultas acima deste tempo entram no log de lentas
+SLOW_QUERY_MS = 200
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima de 5000"
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_SAMPLES_PER_TEMPLATE = 256 # últimas durações guardadas para os percentis
+_SLOW_LOG_SIZE = 200 # últimas consultas lentas guardadas
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+
+def query_template(query):
+    """Modelo da consulta: mesmas consultas com listas IN ou TOP/LIMIT diferentes caem juntas."""
+    template = _WHITESPACE.sub(" ", query).strip().rstrip(";").strip()
+    template = _PLACEHOLDER_LIST.sub("?, ...", template)
+    return _NUMBER.sub("N", template)
+
+
+def _percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    index = min(int(round(fraction * (len(sorted_samples) - 1))), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+class _TemplateStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+        self.slow = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=_SAMPLES_PER_TEMPLATE)
+        self.callers = set()
+        self.last_error = None
+        self.plan = None
+
+
+class QueryStats:
+    """Estatísticas de latência das consultas (thread-safe). Ver get_query_stats no DashboardDB."""
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.started_at = time.time()
+        self._templates = {} # (backend, modelo) -> _TemplateStats
+        self._slow_log = deque(maxlen=_SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, backend, query, elapsed_ms, rows=0, caller=None, error=None):
+        """Registra uma execução. Retorna True se ela passou do limite de consulta lenta."""
+        template = query_template(query)
+        bucket = next((i for i, limit in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= limit), len(LATENCY_BUCKETS_MS))
+        is_slow = elapsed_ms >= self.slow_query_ms
+        with self._lock:
+            stats = self._templates.get((backend, template))
+            if stats is None:
+                stats = self._templates[(backend, template)] = _TemplateStats()
+            stats.count += 1
+            stats.rows += rows
+            stats.total_ms += elapsed_ms
+            stats.min_ms = elapsed_ms if stats.min_ms is None else min(stats.min_ms, elapsed_ms)
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bucket] += 1
+            stats.samples.append(elapsed_ms)
+            if caller:
+                stats.callers.add(caller)
+            if error is not None:
+                stats.errors += 1
+                stats.last_error = str(error)
+            if is_slow:
+                stats.slow += 1
+        return is_slow
+
+    def needs_plan(self, backend, query):
+        """True se o modelo ainda não tem EXPLAIN QUERY PLAN guardado."""
+        with self._lock:
+            stats = self._templates.get((backend, query_template(query)))
+            return stats is not None and stats.plan is None
+
+    def record_slow(self, backend, query, params, elapsed_ms, caller=None, plan=None):
+        """Acrescenta uma consulta lenta ao log (e o plano, se informado, ao modelo)."""
+        template = query_template(query)
+        with self._lock:
+            stats = self._templates.get((backend, template))
+            if plan is not None and stats is not None and stats.plan is None:
+                stats.plan = plan
+            self._slow_log.append({
+                'when': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'backend': backend,
+                'caller': caller,
+                'elapsed_ms': round(elapsed_ms, 2),
+                'template': template,
+                'params': [str(p) for p in params],
+                'plan': plan if plan is not None else (stats.plan if stats else None),
+            })
+
+    def stats(self):
+        """Resumo por modelo de consulta, do maior tempo total para o menor, e o log de lentas."""
+        labels = [f"<={limit}ms" for limit in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            templates = []
+            for (backend, template), stats in self._templates.items():
+                samples = sorted(stats.samples)
+                templates.append({
+                    'backend': backend,
+                    'template': template,
+                    'callers': sorted(stats.callers),
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'last_error': stats.last_error,
+                    'slow': stats.slow,
+                    'rows': stats.rows,
+                    'avg_rows': round(stats.rows / stats.count, 1) if stats.count else 0,
+                    'total_ms': round(stats.total_ms, 2),
+                    'avg_ms': round(stats.total_ms / stats.count, 3) if stats.count else 0,
+                    'min_ms': round(stats.min_ms or 0, 3),
+                    'max_ms': round(stats.max_ms, 3),
+                    'p50_ms': round(_percentile(samples, 0.50) or 0, 3),
+                    'p95_ms': round(_percentile(samples, 0.95) or 0, 3),
+                    'histogram': {label: n for label, n in zip(labels, stats.buckets) if n},
+                    'plan': stats.plan,
+                })
+            slow_log = list(self._slow_log)
+        templates.sort(key=lambda t: t['total_ms'], reverse=True)
+        return {
+            'since': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            'slow_query_ms': self.slow_query_ms,
+            'queries': templates,
+            'slow_log': slow_log,
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats(), f, ensure_ascii=False, indent=2, default=str)
+
+    def reset(self):
+        with self._lock:
+            self._templates.clear()
+            self._slow_log.clear()
+            self.started_at = time.time()
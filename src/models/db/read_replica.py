@@ -0,0 +1,128 @@
+"""
+Réplica de leitura em memória (SQLite) do banco do dashboard.
+
+Em pastas de rede cada consulta ao arquivo (ou ao Access via ODBC) paga a latência da
+rede. Com a réplica, o banco é copiado uma vez para um SQLite em memória e todas as
+leituras são atendidas dali; as gravações vão para o banco principal e são repetidas na
+réplica (write-through). Quando outra pessoa altera o banco principal, a réplica é
+recopiada por inteiro (ver DashboardDB.sync_read_replica).
+
+A cópia usa a API de backup do SQLite; para o Access, as tabelas são convertidas para
+SQLite com os mesmos nomes, de modo que as mesmas consultas funcionam nos dois.
+"""
+import datetime
+import decimal
+import itertools
+import sqlite3
+import threading
+
+from src.models.db.connection_manager import STATEMENT_CACHE_SIZE
+
+_replica_ids = itertools.count(1)
+
+# Índices criados na cópia do Access (o SQLite já traz os seus no backup)
+_ACCESS_INDEXES = (
+    ('tbl_empresas', 'id_empresa'),
+    ('tbl_anotacao', 'id_conexao'),
+    ('tbl_anotacao', 'cod_ons'),
+    ('tbl_anotacao', 'id_empresa'),
+    ('tbl_valores', 'id_conexao'),
+)
+
+
+def _to_sqlite_value(value):
+    """Converte os tipos devolvidos pelo pyodbc para tipos aceitos pelo sqlite3."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime.datetime) else value.isoformat()
+    return value
+
+
+class ReadReplica:
+    """
+    Banco SQLite em memória compartilhado entre as conexões de leitura (uma por thread).
+
+    Cada carga cria um banco em memória novo e troca o atual por ele: as conexões abertas
+    no banco anterior terminam suas consultas normalmente e são trocadas na próxima leitura
+    (ver ConnectionManager.retire). `version` é a versão do banco principal copiada
+    (DashboardDB.get_change_version); None indica réplica desatualizada.
+    """
+
+    def __init__(self, db_type, tables):
+        self.db_type = db_type
+        self.tables = tables # {'tbl_empresas': nome, 'tbl_anotacao': nome, 'tbl_valores': nome}
+        self.version = None
+        self._uri = None
+        self._anchor = None # mantém o banco em memória vivo (e recebe o write-through)
+        self._lock = threading.Lock()
+
+    def load(self, source_conn, version):
+        """Copia o banco principal para um novo banco em memória e passa a usá-lo."""
+        uri = f"file:must_replica_{next(_replica_ids)}?mode=memory&cache=shared"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            if self.db_type == 'sqlite':
+                source_conn.backup(anchor)
+            else:
+                self._copy_access_tables(source_conn, anchor)
+        except Exception:
+            anchor.close()
+            raise
+        with self._lock:
+            old_anchor, self._anchor, self._uri = self._anchor, anchor, uri
+            self.version = version
+        if old_anchor is not None:
+            old_anchor.close()
+
+    def _copy_access_tables(self, source_conn, anchor):
+        source = source_conn.cursor()
+        try:
+            for table in self.tables.values():
+                source.execute(f"SELECT * FROM {table}")
+                columns = [column[0] for column in source.description]
+                anchor.execute(f"CREATE TABLE {table} ({', '.join(f'[{c}]' for c in columns)})")
+                placeholders = ", ".join("?" for _ in columns)
+                anchor.executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                                   ([_to_sqlite_value(v) for v in row] for row in source.fetchall()))
+        finally:
+            source.close()
+        for table_key, column in _ACCESS_INDEXES:
+            table = self.tables[table_key]
+            anchor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})")
+        anchor.commit()
+
+    def connect(self):
+        """Nova conexão de leitura ao banco em memória atual."""
+        with self._lock:
+            uri = self._uri
+        conn = sqlite3.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        # Leitores não esperam pelo write-through (no cache compartilhado as travas são por tabela)
+        conn.execute("PRAGMA read_uncommitted = 1")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def apply(self, statements, version):
+        """
+        Repete na réplica uma transação já gravada no banco principal. `version` é a versão
+        do principal após a gravação, ou None se a réplica já estava atrás dele.
+        """
+        with self._lock:
+            try:
+                for query, params in statements:
+                    if isinstance(params, list):
+                        self._anchor.executemany(query, params)
+                    else:
+                        self._anchor.execute(query, params)
+                self._anchor.commit()
+                self.version = version
+            except sqlite3.Error as e:
+                self._anchor.rollback()
+                self.version = None # recopiada na próxima sincronização
+                print(f"Aviso: falha ao repetir gravação na réplica ({e}); ela será recarregada.")
+
+    def close(self):
+        with self._lock:
+            anchor, self._anchor = self._anchor, None
+        if anchor is not None:
+            anchor.close()
@@ -0,0 +1,101 @@
+"""
+Índice de busca textual (FTS5) sobre Cód ONS e anotações (SQLite).
+
+A busca do dashboard procurava o termo com LIKE '%termo%' em todos os textos de
+anotação, sem poder usar índice. O índice FTS5 com tokenizador trigram resolve
+buscas por trecho (inclusive no meio do Cód ONS) consultando só o índice; em
+SQLite sem trigram (anterior à 3.34) usa unicode61 com busca por prefixo.
+
+O índice é de conteúdo externo (aponta para a tabela de anotações) e é mantido
+por triggers nas inserções, exclusões e alterações de cod_ons/anotacao_geral.
+"""
+import sqlite3
+
+SEARCH_TABLE = 'anotacao_fts'
+SEARCH_TRIGGERS = (f'{SEARCH_TABLE}_ai', f'{SEARCH_TABLE}_ad', f'{SEARCH_TABLE}_au')
+
+# Com trigram, termos menores que 3 caracteres não geram nenhum trigrama: a busca cai no LIKE
+MIN_TRIGRAM_TERM = 3
+
+
+def _preferred_tokenizer():
+    return 'trigram' if sqlite3.sqlite_version_info >= (3, 34, 0) else 'unicode61'
+
+
+def build_search_index_statements(tbl_anotacao='anotacao', tokenizer=None):
+    """Comandos que (re)criam o índice FTS5, suas triggers e o repopulam a partir da tabela base."""
+    tokenizer = tokenizer or _preferred_tokenizer()
+    options = "tokenize='trigram'" if tokenizer == 'trigram' else "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'"
+    insert_new = f"INSERT INTO {SEARCH_TABLE} (rowid, cod_ons, anotacao_geral) VALUES (new.id_conexao, new.cod_ons, new.anotacao_geral);"
+    delete_old = (f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, cod_ons, anotacao_geral) "
+                  f"VALUES ('delete', old.id_conexao, old.cod_ons, old.anotacao_geral);")
+    statements = [f"DROP TRIGGER IF EXISTS {name}" for name in SEARCH_TRIGGERS]
+    statements += [
+        f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(cod_ons, anotacao_geral, "
+        f"content='{tbl_anotacao}', content_rowid='id_conexao', {options})",
+        f"CREATE TRIGGER {SEARCH_TRIGGERS[0]} AFTER INSERT ON {tbl_anotacao} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {SEARCH_TRIGGERS[1]} AFTER DELETE ON {tbl_anotacao} BEGIN {delete_old} END",
+        # Só as colunas indexadas: aprovar um ponto não mexe no índice
+        f"CREATE TRIGGER {SEARCH_TRIGGERS[2]} AFTER UPDATE OF id_conexao, cod_ons, anotacao_geral ON {tbl_anotacao} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')",
+    ]
+    return statements
+
+
+def search_index_tokenizer(cursor):
+    """Tokenizador do índice existente ('trigram' ou 'unicode61'), ou None se o índice ou suas triggers não existem."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    placeholders = ", ".join("?" for _ in SEARCH_TRIGGERS)
+    cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})", SEARCH_TRIGGERS)
+    # A carga completa recria a tabela de anotações com to_sql, o que apaga as triggers: índice desatualizado
+    if cursor.fetchone()[0] != len(SEARCH_TRIGGERS):
+        return None
+    return 'trigram' if 'trigram' in row[0] else 'unicode61'
+
+
+def ensure_search_index(conn, tbl_anotacao='anotacao'):
+    """
+    Garante que o índice de busca exista e esteja sincronizado com a tabela de anotações,
+    recriando-o quando necessário. Retorna o tokenizador em uso, ou None se o SQLite
+    não tiver FTS5 (a busca continua funcionando por LIKE).
+    """
+    cursor = conn.cursor()
+    tokenizer = search_index_tokenizer(cursor)
+    if tokenizer:
+        return tokenizer
+    tokenizer = _preferred_tokenizer()
+    try:
+        for sql in build_search_index_statements(tbl_anotacao, tokenizer):
+            cursor.execute(sql)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"Aviso: índice de busca FTS5 indisponível, usando LIKE ({e})")
+        return None
+    return tokenizer
+
+
+def build_match_expression(term, tokenizer):
+    """
+    Converte o texto digitado numa expressão MATCH do FTS5, ou None quando o índice
+    não consegue atender o termo (ex.: menos de 3 caracteres com trigram).
+    """
+    term = (term or "").strip()
+    if not term:
+        return None
+    if tokenizer == 'trigram':
+        if len(term) < MIN_TRIGRAM_TERM:
+            return None
+        # Frase entre aspas: busca o trecho literal, como o LIKE '%termo%'
+        return '"' + term.replace('"', '""') + '"'
+    # unicode61: cada palavra vira um prefixo ("SPAJ"*), todas obrigatórias
+    tokens = ["".join(ch if ch.isalnum() else " " for ch in word).split() for word in term.split()]
+    tokens = [token for group in tokens for token in group]
+    if not tokens:
+        return None
+    return " AND ".join('"' + token + '"*' for token in tokens)
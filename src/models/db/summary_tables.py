@@ -0,0 +1,84 @@
+"""
+Tabelas de resumo materializadas do dashboard (SQLite).
+
+Os agregados do dashboard (KPIs, análise por empresa e totais anuais) são gravados
+em tabelas próprias ao final de cada carga, e mantidos atualizados a cada aprovação,
+para que abrir o dashboard não dependa do número de pontos de conexão.
+"""
+
+RESUMO_EMPRESAS = 'resumo_empresas'
+RESUMO_ANUAL = 'resumo_anual'
+RESUMO_KPIS = 'resumo_kpis'
+SUMMARY_TABLES = (RESUMO_EMPRESAS, RESUMO_ANUAL, RESUMO_KPIS)
+
+REMARK_CONDITION = "a.anotacao_geral IS NOT NULL AND a.anotacao_geral <> '' AND a.anotacao_geral <> 'nan'"
+APPROVED_CONDITION = "a.aprovado_por IS NOT NULL AND a.aprovado_por <> ''"
+
+_CREATE_STATEMENTS = [
+    f"CREATE TABLE IF NOT EXISTS {RESUMO_EMPRESAS} (id_empresa INTEGER PRIMARY KEY, nome_empresa TEXT, total INTEGER, with_remarks INTEGER, approved INTEGER)",
+    f"CREATE TABLE IF NOT EXISTS {RESUMO_ANUAL} (ano INTEGER, periodo TEXT, total_valor REAL, PRIMARY KEY (ano, periodo))",
+    f"CREATE TABLE IF NOT EXISTS {RESUMO_KPIS} (id INTEGER PRIMARY KEY CHECK (id = 1), unique_companies INTEGER, total_points INTEGER, points_with_remarks INTEGER, approved_points INTEGER)",
+]
+
+
+def _company_summary_select(tbl_empresas, tbl_anotacao, where=""):
+    return f"""
+        SELECT e.id_empresa, e.nome_empresa, COUNT(a.id_conexao),
+               COALESCE(SUM(CASE WHEN {REMARK_CONDITION} THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN {APPROVED_CONDITION} THEN 1 ELSE 0 END), 0)
+        FROM {tbl_empresas} AS e LEFT JOIN {tbl_anotacao} AS a ON e.id_empresa = a.id_empresa
+        {where}
+        GROUP BY e.id_empresa, e.nome_empresa
+    """
+
+
+def _kpi_refresh_statement(tbl_empresas):
+    return (f"""
+        INSERT OR REPLACE INTO {RESUMO_KPIS} (id, unique_companies, total_points, points_with_remarks, approved_points)
+        SELECT 1, (SELECT COUNT(*) FROM {tbl_empresas}),
+               COALESCE(SUM(total), 0), COALESCE(SUM(with_remarks), 0), COALESCE(SUM(approved), 0)
+        FROM {RESUMO_EMPRESAS}
+    """, ())
+
+
+def build_refresh_statements(tbl_empresas='empresas', tbl_anotacao='anotacao', tbl_valores='valores_must'):
+    """Comandos (sql, params) que recriam todas as tabelas de resumo a partir das tabelas base."""
+    statements = [(sql, ()) for sql in _CREATE_STATEMENTS]
+    statements += [(f"DELETE FROM {table}", ()) for table in SUMMARY_TABLES]
+    statements.append((
+        f"INSERT INTO {RESUMO_EMPRESAS} (id_empresa, nome_empresa, total, with_remarks, approved) "
+        + _company_summary_select(tbl_empresas, tbl_anotacao), ()))
+    statements.append((
+        f"INSERT INTO {RESUMO_ANUAL} (ano, periodo, total_valor) "
+        f"SELECT ano, periodo, SUM(valor) FROM {tbl_valores} GROUP BY ano, periodo", ()))
+    statements.append(_kpi_refresh_statement(tbl_empresas))
+    return statements
+
+
+def build_company_refresh_statements(cod_ons_list, tbl_empresas='empresas', tbl_anotacao='anotacao'):
+    """Comandos (sql, params) que recalculam só as empresas dos pontos informados e os KPIs globais."""
+    cod_ons_list = list(cod_ons_list)
+    if not cod_ons_list:
+        return []
+    placeholders = ", ".join("?" for _ in cod_ons_list)
+    where = f"WHERE e.id_empresa IN (SELECT id_empresa FROM {tbl_anotacao} WHERE cod_ons IN ({placeholders}))"
+    return [
+        (f"INSERT OR REPLACE INTO {RESUMO_EMPRESAS} (id_empresa, nome_empresa, total, with_remarks, approved) "
+         + _company_summary_select(tbl_empresas, tbl_anotacao, where), tuple(cod_ons_list)),
+        _kpi_refresh_statement(tbl_empresas),
+    ]
+
+
+def summary_tables_exist(cursor):
+    """Indica se as três tabelas de resumo já existem no banco SQLite."""
+    placeholders = ", ".join("?" for _ in SUMMARY_TABLES)
+    cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})", SUMMARY_TABLES)
+    return cursor.fetchone()[0] == len(SUMMARY_TABLES)
+
+
+def refresh_summary_tables(conn, tbl_empresas='empresas', tbl_anotacao='anotacao', tbl_valores='valores_must'):
+    """Rematerializa as tabelas de resumo numa única transação."""
+    cursor = conn.cursor()
+    for sql, params in build_refresh_statements(tbl_empresas, tbl_anotacao, tbl_valores):
+        cursor.execute(sql, params)
+    conn.commit()
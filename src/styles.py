@@ -58,9 +58,9 @@ QPushButton#filterButton { background-color: #EA580C; color: white; text-align:
 QPushButton#filterButton:hover { background-color: #F97316; }
 QPushButton#clearButton { background-color: transparent; border: 1px solid #6B7280; text-align: center; }
 QPushButton#clearButton:hover { background-color: #374151; }
-QTableWidget { background-color: #1F2937; border: none; gridline-color: #374151; }
+QTableWidget, QTableView { background-color: #1F2937; border: none; gridline-color: #374151; }
 QHeaderView::section { background-color: #374151; color: #D1D5DB; padding: 8px; border: none; font-weight: bold; }
-QTableWidget::item { padding-left: 10px; border-bottom: 1px solid #374151; }
+QTableWidget::item, QTableView::item { padding-left: 10px; border-bottom: 1px solid #374151; }
 QScrollBar:vertical, QScrollBar:horizontal { background: #1f2937; width: 10px; height: 10px; margin: 0; }
 QScrollBar::handle:vertical, QScrollBar::handle:horizontal { background: #4b5563; min-width: 20px; border-radius: 5px; }
 QTabWidget::pane { border: none; } QTabBar::tab { background: #1F2937; padding: 10px; border-top-left-radius: 6px; border-top-right-radius: 6px; }
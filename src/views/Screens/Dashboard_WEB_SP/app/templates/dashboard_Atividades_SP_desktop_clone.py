@@ -1,4 +1,5 @@
 import sys
+from pathlib import Path
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -9,7 +10,7 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QAbstractItemView
 )
 from PySide6.QtCore import (
-    Qt, QObject, Signal, Slot, QThread, QAbstractTableModel
+    Qt, QObject, Signal, Slot, QThread
 )
 from PySide6.QtGui import QColor, QPalette, QTextCharFormat, QFont
 
@@ -17,6 +18,10 @@ from PySide6.QtGui import QColor, QPalette, QTextCharFormat, QFont
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+# Raiz do projeto no path para o modelo de tabela compartilhado (src/views/dataframe_table.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[6]))
+from src.views.dataframe_table import DataFrameModel
+
 # --- Folha de Estilo (CSS convertido para QSS) ---
 STYLESHEET = """
 QWidget {
@@ -345,61 +350,51 @@ class MplChartWidget(QWidget):
         self.canvas.draw()
 
 
-class PandasModel(QAbstractTableModel):
-    """Modelo de tabela para exibir DataFrames do Pandas."""
+class PandasModel(DataFrameModel):
+    """Modelo de tabela para exibir DataFrames do Pandas (textos e estilos calculados uma vez por coluna)."""
+    DATE_COLUMN = 'PREVISÃO DE TÉRMINO_FORMATADA'
+    DAYS_COLUMNS = ('DIAS ÚTEIS', 'TEMPO TOTAL')
+
     def __init__(self, data):
-        super().__init__()
-        self._data = data
+        super().__init__(data)
+        self._negative = {} # coluna de dias -> lista de bool (valor negativo), sob demanda
 
-    def rowCount(self, parent=None):
-        return self._data.shape[0]
+    def _is_negative(self, row, col):
+        flags = self._negative.get(col)
+        if flags is None:
+            flags = self._negative[col] = [self._negative_value(value) for value in self._values[col]]
+        return flags[row]
 
-    def columnCount(self, parent=None):
-        return self._data.shape[1]
+    @staticmethod
+    def _negative_value(value):
+        try:
+            return int(value) < 0
+        except (ValueError, TypeError):
+            return False
 
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
         
-        value = self._data.iloc[index.row(), index.column()]
-        
         if role == Qt.DisplayRole:
-            return str(value)
+            return self.display_column(index.column())[index.row()]
         
+        col_name = self._headers[index.column()]
         if role == Qt.BackgroundRole:
-            if self._data.columns[index.column()] == 'PREVISÃO DE TÉRMINO_FORMATADA' and value:
+            if col_name == self.DATE_COLUMN and self.raw_value(index.row(), index.column()):
                 return QColor('#212529')
         
         if role == Qt.ForegroundRole:
-            col_name = self._data.columns[index.column()]
-            if col_name == 'PREVISÃO DE TÉRMINO_FORMATADA' and value:
+            if col_name == self.DATE_COLUMN and self.raw_value(index.row(), index.column()):
                 return QColor('#FFFFFF')
-            
-            if col_name in ['DIAS ÚTEIS', 'TEMPO TOTAL']:
-                try:
-                    if int(value) < 0:
-                        return QColor('red')
-                except (ValueError, TypeError):
-                    pass
+            if col_name in self.DAYS_COLUMNS and self._is_negative(index.row(), index.column()):
+                return QColor('red')
         
         if role == Qt.FontRole:
-            col_name = self._data.columns[index.column()]
-            if col_name in ['DIAS ÚTEIS', 'TEMPO TOTAL']:
-                try:
-                    if int(value) < 0:
-                        font = QFont()
-                        font.setBold(True)
-                        return font
-                except (ValueError, TypeError):
-                    pass
-        return None
-
-    def headerData(self, section, orientation, role):
-        if role == Qt.DisplayRole:
-            if orientation == Qt.Horizontal:
-                return self._data.columns[section]
-            if orientation == Qt.Vertical:
-                return str(self._data.index[section])
+            if col_name in self.DAYS_COLUMNS and self._is_negative(index.row(), index.column()):
+                font = QFont()
+                font.setBold(True)
+                return font
         return None
 
 
@@ -661,7 +656,7 @@ class MainWindow(QMainWindow):
 
     def update_table(self, df):
         cols_to_show = ['ORIGEM', 'STATUS', 'ATIVIDADES', 'RESPONSÁVEL', 'PREVISÃO DE TÉRMINO_FORMATADA', 'DIAS ÚTEIS', 'TEMPO TOTAL', 'OBSERVAÇÃO']
-        df_display = df[[col for col in cols_to_show if col in df.columns]].copy()
+        df_display = df[[col for col in cols_to_show if col in df.columns]]
         
         self.pandas_model = PandasModel(df_display)
         self.table_view.setModel(self.pandas_model)
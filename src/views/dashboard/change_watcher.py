@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QTimer, QFileSystemWatcher, Signal
+
+
+# Verificação periódica: o QFileSystemWatcher não é confiável em pastas de rede
+CHANGE_POLL_INTERVAL_MS = 5000
+
+# Espera após o último aviso de arquivo alterado (uma carga grava o arquivo várias vezes seguidas)
+CHANGE_SETTLE_MS = 500
+
+
+class DatabaseChangeWatcher(QObject):
+    """
+    Detecta alterações no banco feitas fora desta janela (carga do ETL, outro revisor) e
+    emite `changes_detected` só com o que mudou desde a última versão vista (ver
+    DashboardDB.get_changes_since). As gravações da própria janela só avançam a versão vista.
+
+    A verificação é disparada pelo QFileSystemWatcher no arquivo do banco (e no -wal, no
+    SQLite) e, como reserva, por um timer. A consulta roda no DashboardDataService.
+    """
+    changes_detected = Signal(object)
+
+    def __init__(self, db_model, data_service, poll_interval=CHANGE_POLL_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.db = db_model
+        self.data_service = data_service
+        self._version = None
+
+        db_path = Path(db_model.db_path)
+        self._paths = [str(db_path), str(db_path) + "-wal"]
+        self._fs_watcher = QFileSystemWatcher(self)
+        self._fs_watcher.fileChanged.connect(self._on_file_changed)
+
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(CHANGE_SETTLE_MS)
+        self._settle_timer.timeout.connect(self.check_now)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(poll_interval)
+        self._poll_timer.timeout.connect(self.check_now)
+
+    def start(self):
+        """Registra a versão atual como referência e passa a acompanhar o banco."""
+        self.data_service.request("change_version", self.db.get_change_version, callback=self._on_baseline)
+        self._watch_files()
+        self._poll_timer.start()
+
+    def stop(self):
+        self._poll_timer.stop()
+        self._settle_timer.stop()
+        self.data_service.cancel("changes")
+
+    def check_now(self):
+        # Sem referência ainda, ou verificação anterior em andamento: a próxima cobre esta
+        if self._version is None or self.data_service.is_pending("changes"):
+            return
+        self.data_service.request("changes", self.db.get_changes_since, self._version, callback=self._on_changes)
+
+    def _watch_files(self):
+        # Arquivos substituídos (ou o -wal criado depois) saem da lista do watcher: adiciona de novo
+        missing = [path for path in self._paths if Path(path).exists() and path not in self._fs_watcher.files()]
+        if missing:
+            self._fs_watcher.addPaths(missing)
+
+    def _on_file_changed(self, path):
+        self._watch_files()
+        self._settle_timer.start()
+
+    def _on_baseline(self, version):
+        self._version = version
+
+    def _on_changes(self, changes):
+        if changes is None:
+            return
+        self._version = changes['version']
+        if changes['full_reload'] or changes['rows'] or changes['aggregates_changed']:
+            self.changes_detected.emit(changes)
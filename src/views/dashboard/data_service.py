@@ -0,0 +1,123 @@
+import itertools
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+# Threads de consulta em segundo plano. Cada thread tem sua própria conexão persistente no
+# DashboardDB; poucas threads bastam (o gargalo é o disco/rede, não a CPU) e evitam abrir
+# muitas conexões simultâneas no Access.
+MAX_QUERY_THREADS = 2
+
+
+class _QueryTaskSignals(QObject):
+    finished = Signal(str, int, object) # canal, token, resultado
+    failed = Signal(str, int, str) # canal, token, detalhes do erro
+
+
+class _QueryTask(QRunnable):
+    def __init__(self, channel, token, is_current, func, args, kwargs):
+        super().__init__()
+        self.signals = _QueryTaskSignals()
+        self.channel = channel
+        self.token = token
+        self.is_current = is_current
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        # Pedido já substituído enquanto esperava na fila: nem chega a consultar o banco
+        if not self.is_current(self.channel, self.token):
+            self.signals.finished.emit(self.channel, self.token, None)
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.channel, self.token, f"{e}\n{traceback.format_exc()}")
+            return
+        self.signals.finished.emit(self.channel, self.token, result)
+
+
+class DashboardDataService(QObject):
+    """
+    Executa as chamadas ao DashboardDB fora da thread da interface.
+
+    Cada pedido pertence a um canal (ex.: "points", "snapshot"). Um pedido novo num canal
+    substitui o anterior: se o anterior ainda estiver na fila ele não é executado, e se já
+    estiver rodando o resultado dele é descartado. O callback do pedido vigente é chamado
+    na thread da interface, então pode atualizar os widgets diretamente.
+    """
+    busy_changed = Signal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(MAX_QUERY_THREADS)
+        self._pool.setExpiryTimeout(-1) # threads fixas: cada conexão por thread é aberta uma única vez
+        self._tokens = itertools.count(1)
+        self._current = {} # canal -> token do pedido vigente
+        self._pending = {} # (canal, token) -> (sinais da tarefa, callback, error_callback)
+
+    def request(self, channel, func, *args, callback=None, error_callback=None, **kwargs):
+        """
+        Agenda `func(*args, **kwargs)` em segundo plano, substituindo o pedido anterior do canal.
+        Com `channel=None` o pedido tem canal próprio e nunca é substituído (ex.: gravações).
+        """
+        token = next(self._tokens)
+        if channel is None:
+            channel = f"#{token}"
+        self._current[channel] = token
+        task = _QueryTask(channel, token, self._is_current, func, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        was_busy = self.is_busy
+        self._pending[(channel, token)] = (task.signals, callback, error_callback)
+        self._pool.start(task)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return token
+
+    def cancel(self, channel):
+        """Descarta o pedido vigente do canal (o resultado, se vier, é ignorado)."""
+        self._current.pop(channel, None)
+
+    def is_pending(self, channel):
+        return channel in self._current
+
+    @property
+    def is_busy(self):
+        return bool(self._pending)
+
+    def shutdown(self):
+        """Cancela o que está na fila e espera as consultas em andamento (antes de fechar o banco)."""
+        self._current.clear()
+        self._pool.clear()
+        self._pool.waitForDone()
+        self._pending.clear()
+
+    def _is_current(self, channel, token):
+        return self._current.get(channel) == token
+
+    def _take(self, channel, token):
+        entry = self._pending.pop((channel, token), None)
+        if entry is not None and not self._pending:
+            self.busy_changed.emit(False)
+        if entry is None or not self._is_current(channel, token):
+            return None
+        del self._current[channel]
+        return entry
+
+    def _on_finished(self, channel, token, result):
+        entry = self._take(channel, token)
+        if entry and entry[1]:
+            entry[1](result)
+
+    def _on_failed(self, channel, token, details):
+        entry = self._take(channel, token)
+        if entry is None:
+            return
+        if entry[2]:
+            entry[2](details)
+        else:
+            print(f"Erro na consulta em segundo plano ({channel}): {details}")
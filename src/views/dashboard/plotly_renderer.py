@@ -0,0 +1,108 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+
+from PySide6.QtCore import QUrl
+from PySide6.QtWebEngineWidgets import QWebEngineView
+
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="plotly.min.js"></script>
+<style>
+    html, body {{ margin: 0; height: 100%; background: {background}; }}
+    #charts {{ display: grid; grid-template-columns: repeat({columns}, 1fr); gap: 10px; height: 100%; }}
+    #charts > div {{ min-height: {min_height}px; }}
+    .wide {{ grid-column: 1 / -1; }}
+</style>
+</head>
+<body>
+<div id="charts">{divs}</div>
+<script>
+    // Plotly.react atualiza o gráfico existente (só os traces que mudaram) em vez de recriá-lo
+    function renderChart(id, figure, config) {{
+        Plotly.react(id, figure.data || [], figure.layout || {{}}, config);
+    }}
+</script>
+</body>
+</html>
+"""
+
+_shared_js_dir = None
+
+
+def _plotly_js_dir():
+    """
+    Pasta com o plotly.min.js servido às páginas: a do próprio pacote plotly, ou, se ela
+    não existir (instalações empacotadas), uma cópia única por processo numa pasta
+    temporária removida ao sair.
+    """
+    global _shared_js_dir
+    if _shared_js_dir:
+        return _shared_js_dir
+    import plotly
+    package_dir = os.path.join(os.path.dirname(plotly.__file__), 'package_data')
+    if os.path.exists(os.path.join(package_dir, 'plotly.min.js')):
+        _shared_js_dir = package_dir
+        return _shared_js_dir
+
+    from plotly.offline import get_plotlyjs
+    temp_dir = tempfile.mkdtemp(prefix='must_plotly_')
+    with open(os.path.join(temp_dir, 'plotly.min.js'), 'w', encoding='utf-8') as js_file:
+        js_file.write(get_plotlyjs())
+    atexit.register(shutil.rmtree, temp_dir, True)
+    _shared_js_dir = temp_dir
+    return _shared_js_dir
+
+
+class PlotlyChartView(QWebEngineView):
+    """
+    Uma única view web com vários gráficos Plotly.
+
+    A página é montada uma vez, carregando o plotly.js local compartilhado (sem gravar
+    HTML em disco); os gráficos chegam depois como JSON via render_charts(), que usa
+    Plotly.react e portanto atualiza os traces no lugar quando os dados mudam.
+
+    Args:
+        chart_ids: Ids dos gráficos, na ordem do grid.
+        wide_ids: Gráficos que ocupam a linha inteira.
+    """
+
+    def __init__(self, chart_ids, wide_ids=(), columns=2, min_height=400, background='#1F2937',
+                 config=None, parent=None):
+        super().__init__(parent)
+        self._ready = False
+        self._queued = {} # figuras recebidas antes da página terminar de carregar
+        self._config = config or {'displayModeBar': False, 'responsive': True}
+        divs = "".join(f'<div id="{chart_id}"' + (' class="wide"' if chart_id in wide_ids else '') + '></div>'
+                       for chart_id in chart_ids)
+        html = _PAGE_TEMPLATE.format(background=background, columns=columns, min_height=min_height, divs=divs)
+        self.loadFinished.connect(self._on_load_finished)
+        self.setHtml(html, QUrl.fromLocalFile(_plotly_js_dir() + os.sep))
+
+    def render_charts(self, figures):
+        """Desenha (ou atualiza) os gráficos: {chart_id: figura plotly}."""
+        payload = {chart_id: fig.to_json() for chart_id, fig in figures.items() if fig is not None}
+        if not self._ready:
+            self._queued.update(payload)
+            return
+        self._run(payload)
+
+    def _run(self, payload):
+        config = json.dumps(self._config)
+        script = "".join(f"renderChart({json.dumps(chart_id)}, {figure_json}, {config});"
+                         for chart_id, figure_json in payload.items())
+        if script:
+            self.page().runJavaScript(script)
+
+    def _on_load_finished(self, ok):
+        if not ok:
+            print("Aviso: falha ao carregar a página dos gráficos.")
+            return
+        self._ready = True
+        queued, self._queued = self._queued, {}
+        self._run(queued)
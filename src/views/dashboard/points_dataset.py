@@ -0,0 +1,100 @@
+import bisect
+
+from src.views.dashboard.points_table import has_remark
+
+
+# Acima deste número de pontos o dataset não é carregado em memória e os filtros
+# continuam indo ao banco (paginados).
+CLIENT_FILTER_MAX_POINTS = 50000
+
+# Espera após a última tecla (ou troca de combo) antes de aplicar os filtros
+FILTER_DEBOUNCE_MS = 300
+
+_NO_FILTER_VALUES = (None, "", "Todas", "Todos")
+
+
+class PointsDataset:
+    """
+    Todos os pontos de conexão em memória, em formato colunar, para filtrar sem consultar o banco.
+
+    Empresa, tensão e ano ficam indexados (valor -> linhas, em ordem), o status vira duas
+    listas de booleanos e a busca usa uma chave minúscula pré-calculada com Cód ONS e
+    ressalva. filter() aceita o mesmo dicionário de filtros do DashboardDB e devolve as
+    linhas na mesma ordem do banco (empresa, Cód ONS).
+    """
+
+    def __init__(self, rows, years_by_point):
+        self.rows = rows
+        self._search_keys = []
+        self._has_remark = []
+        self._approved = []
+        self._row_by_cod_ons = {}
+        self._rows_by_company = {}
+        self._rows_by_tension = {}
+        self._rows_by_year = {}
+        for r, row in enumerate(rows):
+            self._search_keys.append(f"{row['cod_ons']}\n{row.get('anotacao_geral') or ''}".casefold())
+            self._has_remark.append(has_remark(row.get('anotacao_geral')))
+            self._approved.append(bool(row.get('aprovado_por')))
+            self._row_by_cod_ons[row['cod_ons']] = r
+            self._rows_by_company.setdefault(row['nome_empresa'], []).append(r)
+            self._rows_by_tension.setdefault(str(row.get('tensao_kv')), []).append(r)
+            for year in years_by_point.get(row.get('id_conexao'), ()):
+                self._rows_by_year.setdefault(str(year), []).append(r)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def filter(self, filters=None):
+        filters = {name: value.strip() if isinstance(value, str) else value
+                   for name, value in (filters or {}).items() if value not in _NO_FILTER_VALUES}
+
+        # Parte do menor índice disponível e testa o restante linha a linha
+        candidates = None
+        for name, index in (('company', self._rows_by_company), ('tension', self._rows_by_tension),
+                            ('year', self._rows_by_year)):
+            if name in filters:
+                rows = index.get(str(filters[name]), [])
+                candidates = rows if candidates is None or len(rows) < len(candidates) else candidates
+        if candidates is None:
+            candidates = range(len(self.rows))
+
+        checks = []
+        if 'company' in filters:
+            checks.append(lambda r, value=filters['company']: self.rows[r]['nome_empresa'] == value)
+        if 'tension' in filters:
+            checks.append(lambda r, value=str(filters['tension']): str(self.rows[r].get('tensao_kv')) == value)
+        if 'year' in filters:
+            year_rows = set(self._rows_by_year.get(str(filters['year']), []))
+            checks.append(year_rows.__contains__)
+        if filters.get('status') == "Com Ressalva":
+            checks.append(self._has_remark.__getitem__)
+        elif filters.get('status') == "Aprovado":
+            checks.append(self._approved.__getitem__)
+        if 'search' in filters and filters['search']:
+            term = filters['search'].casefold()
+            checks.append(lambda r: term in self._search_keys[r])
+
+        return [self.rows[r] for r in candidates if all(check(r) for check in checks)]
+
+    def update_rows(self, rows):
+        """Aplica nos pontos em memória os campos alterados (aprovação, ressalva, empresa, tensão)."""
+        for row in rows:
+            r = self._row_by_cod_ons.get(row['cod_ons'])
+            if r is None:
+                continue
+            current = self.rows[r]
+            for field, index in (('nome_empresa', self._rows_by_company), ('tensao_kv', self._rows_by_tension)):
+                if field in row and str(row[field]) != str(current.get(field)):
+                    self._move_in_index(index, r, current.get(field), row[field], as_str=field == 'tensao_kv')
+            current.update(row)
+            self._search_keys[r] = f"{current['cod_ons']}\n{current.get('anotacao_geral') or ''}".casefold()
+            self._has_remark[r] = has_remark(current.get('anotacao_geral'))
+            self._approved[r] = bool(current.get('aprovado_por'))
+
+    @staticmethod
+    def _move_in_index(index, r, old_value, new_value, as_str=False):
+        old_key, new_key = (str(old_value), str(new_value)) if as_str else (old_value, new_value)
+        if r in index.get(old_key, ()):
+            index[old_key].remove(r)
+        bisect.insort(index.setdefault(new_key, []), r) # mantém as linhas na ordem do banco
@@ -0,0 +1,349 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QEvent, QRectF, Signal
+from PySide6.QtGui import QColor, QPainter, QFont
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+
+
+# Colunas da tabela de pontos de conexão
+COL_COMPANY, COL_COD_ONS, COL_TENSION, COL_REMARK, COL_APPROVAL, COL_PDF = range(6)
+HEADERS = ["Empresa", "Cód ONS", "Tensão (kV)", "Ressalva?", "Ação/Aprovado Por", "Arquivo PDF"]
+
+# Colunas guardadas pelo modelo, uma lista por coluna (na ordem das linhas)
+_FIELDS = ('id_conexao', 'nome_empresa', 'cod_ons', 'tensao_kv', 'has_remark', 'aprovado_por', 'data_aprovacao', 'arquivo_referencia')
+
+
+def has_remark(annotation):
+    return bool(annotation) and str(annotation).strip().lower() not in ('', 'nan')
+
+
+def _numeric_key(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return -1.0
+
+
+class ConnectionPointsModel(QAbstractTableModel):
+    """
+    Modelo da tabela de pontos de conexão sobre dados colunares (uma lista por campo).
+
+    Nenhum widget é criado por linha: os botões "Sim"/"Aprovar" e o link são pintados pelo
+    PointActionDelegate. As páginas seguintes são pedidas sob demanda pelo fetchMore da view,
+    que emite `fetch_requested`; quem atende chama append_rows() com a página e o novo cursor.
+    """
+    fetch_requested = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = {field: [] for field in _FIELDS}
+        self._row_by_cod_ons = {}
+        self._next_cursor = None
+        self._fetching = False
+
+    # --- Carga dos dados ---
+
+    def set_rows(self, rows, next_cursor=None):
+        self.beginResetModel()
+        self._columns = {field: [] for field in _FIELDS}
+        self._row_by_cod_ons = {}
+        self._extend(rows)
+        self._next_cursor = next_cursor
+        self._fetching = False
+        self.endResetModel()
+
+    def append_rows(self, rows, next_cursor=None):
+        self._fetching = False
+        self._next_cursor = next_cursor
+        if not rows:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._extend(rows)
+        self.endInsertRows()
+
+    def _extend(self, rows):
+        columns = self._columns
+        first = len(columns['cod_ons'])
+        for offset, row in enumerate(rows):
+            for field, value in self._row_values(row, full=True).items():
+                columns[field].append(value)
+            self._row_by_cod_ons[row['cod_ons']] = first + offset
+
+    @staticmethod
+    def _row_values(row, full=False):
+        """Valores das colunas do modelo presentes em `row` (todas, com padrão, se full=True)."""
+        values = {}
+        if full or 'nome_empresa' in row:
+            values['nome_empresa'] = row['nome_empresa']
+        if full:
+            values['id_conexao'] = row.get('id_conexao')
+            values['cod_ons'] = row['cod_ons']
+        if full or 'tensao_kv' in row:
+            values['tensao_kv'] = row.get('tensao_kv')
+        if full or 'anotacao_geral' in row:
+            values['has_remark'] = has_remark(row.get('anotacao_geral'))
+        if full or 'aprovado_por' in row:
+            values['aprovado_por'] = row.get('aprovado_por') or None
+        if full or 'data_aprovacao' in row:
+            values['data_aprovacao'] = row.get('data_aprovacao')
+        if full or 'arquivo_referencia' in row:
+            values['arquivo_referencia'] = row.get('arquivo_referencia', '')
+        return values
+
+    def update_rows(self, rows):
+        """Aplica nas linhas já carregadas os campos alterados dos pontos informados (aprovação, ressalva...)."""
+        for row in rows:
+            r = self._row_by_cod_ons.get(row['cod_ons'])
+            if r is None:
+                continue
+            for field, value in self._row_values(row).items():
+                self._columns[field][r] = value
+            self.dataChanged.emit(self.index(r, COL_COMPANY), self.index(r, COL_PDF))
+
+    @property
+    def next_cursor(self):
+        return self._next_cursor
+
+    # --- Acesso por linha ---
+
+    def cod_ons(self, row):
+        return self._columns['cod_ons'][row]
+
+    def id_conexao(self, row):
+        return self._columns['id_conexao'][row]
+
+    def is_pending(self, row):
+        return not self._columns['aprovado_por'][row]
+
+    def has_remark(self, row):
+        return self._columns['has_remark'][row]
+
+    def link(self, row):
+        return self._columns['arquivo_referencia'][row]
+
+    def sort_keys(self, column):
+        """Chave de ordenação de cada linha na coluna (tensão numérica, textos sem diferenciar maiúsculas)."""
+        columns = self._columns
+        if column == COL_TENSION:
+            return [_numeric_key(value) for value in columns['tensao_kv']]
+        if column == COL_REMARK:
+            return columns['has_remark']
+        if column == COL_APPROVAL:
+            return [(value or "").casefold() for value in columns['aprovado_por']]
+        if column == COL_PDF:
+            return [bool(value) for value in columns['arquivo_referencia']]
+        field = 'nome_empresa' if column == COL_COMPANY else 'cod_ons'
+        return [str(value).casefold() for value in columns[field]]
+
+    # --- Interface do QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns['cod_ons'])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+        columns = self._columns
+        if role == Qt.ItemDataRole.DisplayRole:
+            if c == COL_COMPANY:
+                return columns['nome_empresa'][r]
+            if c == COL_COD_ONS:
+                return columns['cod_ons'][r]
+            if c == COL_TENSION:
+                tension = columns['tensao_kv'][r]
+                return 'N/D' if tension is None else str(tension)
+            if c == COL_REMARK:
+                return "Sim" if columns['has_remark'][r] else "Não"
+            if c == COL_APPROVAL:
+                approver = columns['aprovado_por'][r]
+                return f"{approver} em {columns['data_aprovacao'][r]}" if approver else "Aprovar"
+            if c == COL_PDF:
+                return "Abrir Link" if columns['arquivo_referencia'][r] else "N/D"
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if c == COL_REMARK and not columns['has_remark'][r]:
+                return QColor(Qt.GlobalColor.green)
+            if c == COL_PDF and columns['arquivo_referencia'][r]:
+                return QColor(Qt.GlobalColor.cyan)
+        elif role == Qt.ItemDataRole.UserRole and c == COL_PDF:
+            return columns['arquivo_referencia'][r]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._next_cursor is not None and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetching = True
+            self.fetch_requested.emit()
+
+
+class PointsSortProxyModel(QAbstractProxyModel):
+    """
+    Ordenação das linhas carregadas por meio de uma permutação das linhas de origem.
+
+    O QSortFilterProxyModel compara linha a linha chamando data() em Python, o que leva
+    segundos com 100 mil pontos; aqui as chaves da coluna vêm prontas do modelo
+    (sort_keys) e a permutação sai de um único sorted(). Sem ordenação (coluna -1) a
+    ordem é a do banco. O modelo de origem só acrescenta linhas no fim (páginas).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._to_source = [] # linha do proxy -> linha de origem
+        self._from_source = [] # linha de origem -> linha do proxy
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_source_reset)
+        model.rowsAboutToBeInserted.connect(self._on_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.dataChanged.connect(self._on_data_changed)
+        self._rebuild()
+        self.endResetModel()
+
+    def _rebuild(self):
+        source = self.sourceModel()
+        rows = range(source.rowCount()) if source is not None else range(0)
+        if self._sort_column < 0:
+            self._to_source = list(rows)
+        else:
+            keys = source.sort_keys(self._sort_column)
+            self._to_source = sorted(rows, key=keys.__getitem__,
+                                     reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+        self._from_source = [0] * len(self._to_source)
+        for proxy_row, source_row in enumerate(self._to_source):
+            self._from_source[source_row] = proxy_row
+
+    def _resort(self):
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        positions = [(self._to_source[index.row()], index.column()) for index in persistent]
+        self._rebuild()
+        self.changePersistentIndexList(
+            persistent, [self.index(self._from_source[row], column) for row, column in positions])
+        self.layoutChanged.emit()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        self._resort()
+
+    # --- Sinais do modelo de origem ---
+
+    def _on_source_reset(self):
+        self._rebuild()
+        self.endResetModel()
+
+    def _on_rows_about_to_be_inserted(self, parent, first, last):
+        count = len(self._to_source)
+        self.beginInsertRows(QModelIndex(), count, count + last - first)
+
+    def _on_rows_inserted(self, parent, first, last):
+        # A página nova entra no fim; com ordenação ativa, é reposicionada em seguida
+        for source_row in range(first, last + 1):
+            self._from_source.append(len(self._to_source))
+            self._to_source.append(source_row)
+        self.endInsertRows()
+        if self._sort_column >= 0:
+            self._resort()
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_row = self._from_source[source_row]
+            self.dataChanged.emit(self.index(proxy_row, top_left.column()),
+                                  self.index(proxy_row, bottom_right.column()))
+        if top_left.column() <= self._sort_column <= bottom_right.column():
+            self._resort()
+
+    # --- Interface do QAbstractProxyModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._to_source)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None: # QObject.parent()
+            return super().parent()
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._to_source)
+
+    def columnCount(self, parent=QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self._to_source[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.index(self._from_source[source_index.row()], source_index.column())
+
+
+class PointActionDelegate(QStyledItemDelegate):
+    """
+    Pinta os botões "Sim" (ressalva) e "Aprovar" direto na célula, sem criar widgets,
+    e emite `action_clicked(coluna, linha_no_modelo_de_origem)` quando um deles é clicado.
+    """
+    action_clicked = Signal(int, int)
+
+    REMARK_COLORS = (QColor("#FBBF24"), QColor("#78350F"))
+    APPROVE_COLORS = (QColor("#374151"), QColor("#F9FAFB"))
+
+    def _source(self, index):
+        model = index.model()
+        if isinstance(model, QAbstractProxyModel):
+            return model.sourceModel(), model.mapToSource(index).row()
+        return model, index.row()
+
+    def _button_colors(self, index):
+        model, row = self._source(index)
+        if index.column() == COL_REMARK and model.has_remark(row):
+            return self.REMARK_COLORS
+        if index.column() == COL_APPROVAL and model.is_pending(row):
+            return self.APPROVE_COLORS
+        return None
+
+    def paint(self, painter, option, index):
+        colors = self._button_colors(index)
+        if colors is None:
+            super().paint(painter, option, index)
+            return
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        background, foreground = colors
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        button_rect = QRectF(option.rect.adjusted(4, 3, -4, -3))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(background)
+        painter.drawRoundedRect(button_rect, 4, 4)
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(foreground)
+        painter.drawText(button_rect, Qt.AlignmentFlag.AlignCenter, index.data(Qt.ItemDataRole.DisplayRole))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton
+                and self._button_colors(index) is not None and option.rect.contains(event.position().toPoint())):
+            self.action_clicked.emit(index.column(), self._source(index)[1])
+            return True
+        return super().editorEvent(event, model, option, index)
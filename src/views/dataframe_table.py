@@ -0,0 +1,214 @@
+"""
+Modelo de tabela Qt para DataFrames do pandas com dezenas de milhares de linhas.
+
+O modelo antigo chamava `str(df.iloc[linha, coluna])` a cada pintura de cada célula, e o
+acesso escalar do iloc é lento: a rolagem de uma tabela consolidada de 20 mil linhas
+travava. Aqui cada coluna é convertida uma única vez para um array numpy de objetos e o
+texto exibido é formatado coluna a coluna na primeira vez em que é pedido e guardado;
+data() passa a ser uma indexação de lista.
+
+Ordenação e filtro ficam no DataFrameProxyModel, que guarda só uma permutação das linhas
+(o DataFrame não é copiado nem reordenado).
+"""
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex
+
+
+class DataFrameModel(QAbstractTableModel):
+    """
+    Modelo somente leitura sobre um DataFrame. `dataframe` é o DataFrame original.
+
+    Subclasses que querem cores/fontes por valor usam raw_value(), que lê do array da
+    coluna, em vez do DataFrame.
+    """
+
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self._data = data
+        self._values = [data.iloc[:, col].to_numpy(dtype=object) for col in range(data.shape[1])]
+        self._headers = [str(column) for column in data.columns]
+        self._display = [None] * len(self._values) # textos formatados, por coluna (sob demanda)
+        self._folded = [None] * len(self._values) # textos em minúsculas, para o filtro
+        self._row_labels = None
+
+    @property
+    def dataframe(self):
+        return self._data
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._data.shape[0]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._values)
+
+    def raw_value(self, row, col):
+        return self._values[col][row]
+
+    def display_column(self, col):
+        """Textos exibidos da coluna inteira, formatados uma única vez."""
+        texts = self._display[col]
+        if texts is None:
+            texts = self._display[col] = [self.format_value(value) for value in self._values[col]]
+        return texts
+
+    def folded_column(self, col):
+        texts = self._folded[col]
+        if texts is None:
+            texts = self._folded[col] = [text.casefold() for text in self.display_column(col)]
+        return texts
+
+    def format_value(self, value):
+        return str(value)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role == Qt.ItemDataRole.DisplayRole:
+            return self.display_column(index.column())[index.row()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        if self._row_labels is None:
+            self._row_labels = [str(label) for label in self._data.index]
+        return self._row_labels[section]
+
+    def sort_keys(self, col):
+        """Chaves de ordenação da coluna: os valores numéricos/datas, ou o texto exibido."""
+        series = self._data.iloc[:, col]
+        if series.dtype.kind in 'biufmM':
+            return series.to_numpy()
+        return np.array(self.folded_column(col), dtype=object)
+
+    def missing_mask(self, col):
+        """Células vazias (NaN/None/NaT) da coluna, que ficam no fim em qualquer ordenação."""
+        return self._data.iloc[:, col].isna().to_numpy()
+
+
+class DataFrameProxyModel(QAbstractProxyModel):
+    """
+    Ordenação e filtro de um DataFrameModel por meio de uma permutação das linhas.
+
+    Como no PointsSortProxyModel do dashboard, o QSortFilterProxyModel chamaria data() em
+    Python a cada comparação; aqui a ordem sai de um argsort sobre as chaves da coluna e o
+    filtro de uma passada sobre os textos já formatados.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._filter_text = ""
+        self._filter_column = -1
+        self._to_source = np.arange(0) # linha do proxy -> linha de origem
+        self._from_source = np.arange(0) # linha de origem -> linha do proxy (-1 se filtrada)
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_source_reset)
+        self._rebuild()
+        self.endResetModel()
+
+    def source_rows(self):
+        """Linhas de origem visíveis, na ordem exibida (ex.: para exportar o que está na tela)."""
+        return self._to_source
+
+    def _rebuild(self):
+        source = self.sourceModel()
+        row_count = source.rowCount() if source is not None else 0
+        rows = np.arange(row_count)
+        if source is not None and self._filter_text:
+            columns = range(source.columnCount()) if self._filter_column < 0 else [self._filter_column]
+            mask = np.zeros(row_count, dtype=bool)
+            for col in columns:
+                mask |= np.fromiter((self._filter_text in text for text in source.folded_column(col)),
+                                    dtype=bool, count=row_count)
+            rows = rows[mask]
+        if source is not None and self._sort_column >= 0 and len(rows):
+            keys = source.sort_keys(self._sort_column)[rows]
+            try:
+                order = np.argsort(keys, kind='stable')
+            except TypeError: # tipos misturados na coluna: ordena pelo texto
+                order = np.argsort(np.array(source.folded_column(self._sort_column), dtype=object)[rows], kind='stable')
+            if self._sort_order == Qt.SortOrder.DescendingOrder:
+                order = order[::-1]
+            missing = source.missing_mask(self._sort_column)[rows][order]
+            if missing.any():
+                order = np.concatenate([order[~missing], order[missing]])
+            rows = rows[order]
+        self._to_source = rows
+        self._from_source = np.full(row_count, -1)
+        self._from_source[rows] = np.arange(len(rows))
+
+    def _relayout(self):
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        positions = [(int(self._to_source[index.row()]), index.column()) for index in persistent]
+        self._rebuild()
+        self.changePersistentIndexList(
+            persistent, [self.index(int(self._from_source[row]), column) for row, column in positions])
+        self.layoutChanged.emit()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        self._relayout()
+
+    def set_filter_text(self, text, column=-1):
+        """Mantém só as linhas com `text` (sem diferenciar maiúsculas) na coluna, ou em qualquer uma (-1)."""
+        text = text.strip().casefold()
+        if (text, column) == (self._filter_text, self._filter_column):
+            return
+        self._filter_text, self._filter_column = text, column
+        self.beginResetModel()
+        self._rebuild()
+        self.endResetModel()
+
+    def _on_source_reset(self):
+        self._rebuild()
+        self.endResetModel()
+
+    # --- Interface do QAbstractProxyModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._to_source)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None: # QObject.parent()
+            return super().parent()
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._to_source)
+
+    def columnCount(self, parent=QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        # Atalho para o texto: evita a ida e volta mapToSource/index do QAbstractProxyModel
+        if index.isValid() and role == Qt.ItemDataRole.DisplayRole:
+            return self.sourceModel().display_column(index.column())[self._to_source[index.row()]]
+        return super().data(index, role)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        source = self.sourceModel()
+        if source is None:
+            return None
+        if orientation == Qt.Orientation.Vertical and 0 <= section < len(self._to_source):
+            section = int(self._to_source[section])
+        return source.headerData(section, orientation, role)
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self._to_source[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or self._from_source[source_index.row()] < 0:
+            return QModelIndex()
+        return self.index(int(self._from_source[source_index.row()]), source_index.column())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do pipeline (services/pipeline_runner.py e run.build_must_pipeline).
+Executar a partir da raiz do projeto: python -m pytest -q tests
+"""
+import os
+
+from PyPDF2 import PdfWriter
+
+import run
+from services.pipeline_runner import Pipeline, Stage, RAN, UP_TO_DATE
+from services.task_scheduler import FAILED, CANCELLED
+
+
+def _write_blank_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=595, height=842)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def test_pdf_without_annotations_is_not_a_failure(tmp_path):
+    _write_blank_pdf(tmp_path / "CEMIG_vazio.pdf")
+    pipeline = run.build_must_pipeline(tmp_path, ["CEMIG_vazio.pdf"], ["all"])
+
+    report = pipeline.run(from_stage="extract_text", to_stage="extract_text", on_log=lambda line: None)
+
+    statuses = {stage_run.stage.name: stage_run.status for stage_run in report.runs}
+    assert statuses["extract_text"] == RAN
+    assert report.ok
+    assert not (tmp_path / "anotacoes_extraidas" / "saida_anotacoes_CEMIG_vazio.xlsx").exists()
+
+    # Sem planilha gerada, a execução registrada é a referência: a etapa fica em dia
+    plan = {stage_run.stage.name: stage_run for stage_run in pipeline.plan(to_stage="extract_text")}
+    assert plan["extract_text"].status == UP_TO_DATE
+
+    # ...até o PDF mudar
+    later = os.path.getmtime(tmp_path / "CEMIG_vazio.pdf") + 3600
+    os.utime(tmp_path / "CEMIG_vazio.pdf", (later, later))
+    plan = {stage_run.stage.name: stage_run for stage_run in pipeline.plan(to_stage="extract_text")}
+    assert plan["extract_text"].will_run
+
+
+def test_missing_required_output_fails_and_cancels_dependents(tmp_path):
+    folder = tmp_path / "saidas"
+    pipeline = Pipeline([
+        Stage("optional", os.makedirs, args=(str(folder),), kwargs={'exist_ok': True},
+              optional_outputs=[folder / "talvez.xlsx"]),
+        Stage("required", os.makedirs, args=(str(folder),), kwargs={'exist_ok': True},
+              outputs=[folder / "sempre.xlsx"], depends_on=("optional",)),
+        Stage("downstream", os.makedirs, args=(str(folder),), kwargs={'exist_ok': True},
+              outputs=[folder], depends_on=("required",)),
+    ], state_path=tmp_path / run.PIPELINE_STATE_FILE)
+
+    report = pipeline.run(on_log=lambda line: None)
+
+    statuses = {stage_run.stage.name: stage_run.status for stage_run in report.runs}
+    assert statuses == {"optional": RAN, "required": FAILED, "downstream": CANCELLED}
+    assert not report.ok
+
+
+def test_stage_with_only_optional_outputs_needs_a_recorded_run(tmp_path):
+    source = tmp_path / "entrada.pdf"
+    source.write_bytes(b"%PDF")
+    pipeline = Pipeline([Stage("extract", os.makedirs, args=(str(tmp_path),), inputs=[source],
+                               optional_outputs=[tmp_path / "saida.xlsx"])],
+                        state_path=tmp_path / run.PIPELINE_STATE_FILE)
+
+    assert pipeline.plan()[0].will_run
+    pipeline.record("extract", 0.0)
+    assert pipeline.plan()[0].status == UP_TO_DATE
+    assert pipeline.plan(from_stage="extract")[0].will_run